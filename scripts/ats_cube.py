@@ -0,0 +1,66 @@
+"""Build the ATS cube from the games_wide datasets and query it.
+
+The cube (data/processed/ats_cube_<season>.parquet) holds ATS and over/under
+counts per season, week, team, conference, home/away side, favorite/underdog
+role and neutral site; rebuilding some seasons replaces only their cells.
+
+Usage:
+  python scripts/ats_cube.py build --season regular
+  python scripts/ats_cube.py query --team Vanderbilt --side away --role underdog --since 2019
+"""
+import argparse
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from who_covers.ats import GAME_COLUMNS, ats_record, cube_path, update_cube
+from team_form import wide_file, wide_years
+
+
+def update_ats_cube(years, season):
+    frames = []
+    for yr in years:
+        path = wide_file(yr, season)
+        if path is None:
+            print(f"skipping {yr}: no games_wide_{yr}_{season}.parquet")
+            continue
+        names = pq.read_schema(path).names
+        frames.append(pd.read_parquet(path, columns=[c for c in GAME_COLUMNS if c in names]))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return None
+    cube = update_cube(pd.concat(frames, ignore_index=True), season)
+    print(f"Saved ATS cube -> {cube_path(season)} ({len(cube)} cells, {int(cube['games'].sum())} team-games)")
+    return cube
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="rebuild the cube cells of the given seasons")
+    p.add_argument("--year", type=int, nargs="+", help="seasons to rebuild (default: every built season)")
+    p = sub.add_parser("query", help="ATS and O/U record of the matching cells")
+    p.add_argument("--team")
+    p.add_argument("--conference")
+    p.add_argument("--side", choices=["home", "away"])
+    p.add_argument("--role", choices=["favorite", "underdog", "pick"])
+    p.add_argument("--week", type=int)
+    p.add_argument("--since", type=int, help="first season (inclusive)")
+    p.add_argument("--until", type=int, help="last season (inclusive)")
+    for p in sub.choices.values():
+        p.add_argument("--season", default="regular", choices=["regular", "postseason", "both"])
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        update_ats_cube(args.year or wide_years(args.season), args.season)
+        return
+    cube = pd.read_parquet(cube_path(args.season))
+    rec = ats_record(cube, team=args.team, since=args.since, until=args.until, conference=args.conference,
+                     side=args.side, role=args.role, week=args.week)
+    print(f"ATS {rec['cover']:.0f}-{rec['ats_loss']:.0f}-{rec['ats_push']:.0f} ({rec['cover_pct']:.1%})  "
+          f"O/U {rec['over']:.0f}-{rec['under']:.0f}-{rec['ou_push']:.0f} ({rec['over_pct']:.1%})  "
+          f"in {rec['games']:.0f} games")
+
+
+if __name__ == "__main__":
+    main()
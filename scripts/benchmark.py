@@ -0,0 +1,380 @@
+"""Benchmarks for pipeline stages on a synthetic full season.
+
+Each subcommand times the current implementation against the code path it
+replaced, on generated data shaped like one FBS season (~850 games).
+
+Usage: python scripts/benchmark.py lines --games 850
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from who_covers.ats import GAME_COLUMNS, ats_cube, ats_record
+from who_covers.build import tag_side, team_sides
+from who_covers.export import FORMATS, export
+from who_covers.flatten_advanced import advanced_paths, flatten_advanced_team_game_stats
+from who_covers.flatten_basic import flatten_basic_team_game_stats, pivot_basic
+from who_covers.io import PROCESSED
+from who_covers.lines import consolidate_lines, provider_rows
+from who_covers.schema import apply_schema, memory_report
+
+BASIC_STATS = ["firstDowns", "totalYards", "netPassingYards", "rushingYards", "rushingAttempts", "rushingTDs",
+               "passingTDs", "yardsPerPass", "yardsPerRushAttempt", "turnovers", "fumblesLost", "interceptions",
+               "sacks", "tackles", "tacklesForLoss", "qbHurries", "passesDeflected", "defensiveTDs",
+               "kickingPoints", "totalFumbles", "fumblesRecovered", "passesIntercepted", "puntReturns",
+               "puntReturnYards", "kickReturns", "kickReturnYards"]
+COMPOUND_STATS = {
+    "completionAttempts": lambda r: f"{r.randint(10, 30)}-{r.randint(30, 45)}",
+    "totalPenaltiesYards": lambda r: f"{r.randint(2, 12)}-{r.randint(10, 110)}",
+    "thirdDownEff": lambda r: f"{r.randint(2, 9)}-{r.randint(10, 18)}",
+    "fourthDownEff": lambda r: f"{r.randint(0, 2)}-{r.randint(0, 4)}",
+    "possessionTime": lambda r: f"{r.randint(22, 38)}:{r.randint(0, 59):02d}",
+}
+PROVIDERS = ["Bovada", "DraftKings", "ESPN Bet", "William Hill (New Jersey)", "teamrankings", "numberfire"]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def report(name, before, after):
+    print(f"{name:<28}{before:>12.4f}s{after:>12.4f}s{before / after:>10.1f}x")
+
+
+def header():
+    print(f"{'stage':<28}{'before':>13}{'after':>13}{'speedup':>11}")
+
+
+# --- lines ------------------------------------------------------------------
+
+def synthetic_lines(n_games, seed=0):
+    r = random.Random(seed)
+    recs = []
+    for gid in range(1, n_games + 1):
+        base = r.choice([-14.5, -7.0, -3.0, -1.5, 2.5, 6.5, 10.0])
+        total = round(r.uniform(40, 70), 1)
+        books = [SimpleNamespace(provider=p, spread=base + r.choice([-0.5, 0, 0.5]), spread_open=base,
+                                 over_under=total + r.choice([-1, 0, 1]), over_under_open=total)
+                 for p in r.sample(PROVIDERS, r.randint(1, 5))]
+        recs.append(SimpleNamespace(id=gid, lines=books))
+    return recs
+
+
+def legacy_lines(lines, games_ids, out):
+    """The pre-consolidator fetch_lines loop: aggregate and write once per game."""
+    rows = []
+    for l in lines:
+        gid = int(l.id)
+        if gid not in games_ids:
+            continue
+        spread_val = total_val = provider = None
+        for bk in l.lines:
+            s, t = getattr(bk, "spread", None), getattr(bk, "over_under", None)
+            if s is not None and spread_val is None:
+                spread_val, provider = float(s), bk.provider
+            if t is not None and total_val is None:
+                total_val, provider = float(t), bk.provider
+            rows.append({"game_id": gid, "spread": spread_val, "total": total_val,
+                         "provider": provider, "last_updated": None})
+
+        df = pd.DataFrame(rows)
+
+        def med_or_none(s):
+            s2 = s.dropna()
+            return float(s2.median()) if not s2.empty else None
+
+        grouped = df.groupby('game_id').agg(
+            spread_consensus=('spread', med_or_none),
+            total_consensus=('total', med_or_none),
+            num_providers=('provider', lambda x: int(sum(1 for v in x if v))),
+            providers_list=('provider', lambda x: ','.join(sorted(set([v for v in x if v])))),
+            last_updated=('last_updated', lambda x: max([v for v in x if v is not None]) if any(v is not None for v in x) else None)
+        ).reset_index()
+        grouped.to_parquet(out, index=False)
+
+
+def bench_lines(args):
+    lines = synthetic_lines(args.games)
+    games_ids = set(range(1, args.games + 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "lines.parquet"
+
+        def current():
+            consolidate_lines(provider_rows(lines, games_ids)).to_parquet(out, index=False)
+
+        report("lines consolidation", timed(lambda: legacy_lines(lines, games_ids, out), args.repeat),
+               timed(current, args.repeat))
+
+
+# --- basic stats ------------------------------------------------------------
+
+def synthetic_team_stats(n_games, seed=0):
+    """``get_game_team_stats`` payloads (cfbd models) for one season."""
+    from cfbd import GameTeamStats
+
+    r = random.Random(seed)
+    recs = []
+    for gid in range(1, n_games + 1):
+        teams = []
+        for side in ("home", "away"):
+            stats = [{"category": n, "stat": str(r.randint(0, 400))} for n in BASIC_STATS]
+            stats += [{"category": n, "stat": f(r)} for n, f in COMPOUND_STATS.items()]
+            teams.append({"teamId": r.randint(1, 130), "team": f"Team{r.randint(1, 130)}",
+                          "conference": r.choice(["SEC", "ACC", "Big Ten", None]), "homeAway": side,
+                          "points": r.randint(0, 60), "stats": stats})
+        recs.append(GameTeamStats.from_dict({"id": gid, "teams": teams}))
+    return recs
+
+
+def legacy_flatten_basic(records):
+    """The pre-columnar flattener: one dict and one pd.to_numeric call per stat."""
+    out = []
+    for row in records:
+        if hasattr(row, "id") and (hasattr(row, "teams") or (hasattr(row, "to_dict") and "teams" in row.to_dict())):
+            game_id = getattr(row, "id")
+            teams = row.to_dict().get("teams") if hasattr(row, "to_dict") else getattr(row, "teams", [])
+            for t in teams:
+                team = t.get("team") or t.get("teamName")
+                conf = t.get("conference")
+                for stat in t.get("stats", []) or []:
+                    name = stat.get("category") or stat.get("stat_name") or stat.get("stat")
+                    val = stat.get("stat") or stat.get("stat_value")
+                    if name is None:
+                        continue
+                    out.append({"game_id": game_id, "team": team, "team_conference": conf,
+                                "stat_name": name, "value": pd.to_numeric(val, errors="coerce")})
+    return pd.DataFrame(out)
+
+
+def bench_flatten_basic(args):
+    recs = synthetic_team_stats(args.games)
+    report("flatten basic stats", timed(lambda: legacy_flatten_basic(recs), args.repeat),
+           timed(lambda: flatten_basic_team_game_stats(recs), args.repeat))
+
+
+def bench_pivot_basic(args):
+    # several seasons of long stats, with game ids kept distinct across seasons
+    long_df = pd.concat([flatten_basic_team_game_stats(synthetic_team_stats(args.games, seed=s)).assign(
+        game_id=lambda d, s=s: d["game_id"] + s * args.games) for s in range(args.seasons)], ignore_index=True)
+    report("pivot basic stats", timed(lambda: pivot_basic(long_df, method="table"), args.repeat),
+           timed(lambda: pivot_basic(long_df, method="array"), args.repeat))
+
+
+# --- advanced stats ---------------------------------------------------------
+
+def synthetic_advanced_stats(n_games, seed=0):
+    """``get_advanced_game_stats`` payloads (cfbd models) for one season."""
+    from cfbd import AdvancedGameStat
+
+    r = random.Random(seed)
+    recs = []
+    for gid in range(1, n_games + 1):
+        for team, opp in (("Home", "Away"), ("Away", "Home")):
+            d = {"gameId": gid, "season": 2024, "seasonType": "regular", "week": 1 + gid % 14,
+                 "team": f"{team}{gid}", "opponent": f"{opp}{gid}"}
+            for col, steps in advanced_paths():
+                node = d
+                for attr, alias in steps[:-1]:
+                    node = node.setdefault(alias, {})
+                # counts are ints in the payload, rates floats
+                leaf = steps[-1][1]
+                node[leaf] = r.randint(0, 500) if leaf.endswith("Total") or leaf in ("drives", "plays") \
+                    else round(r.uniform(-1, 2), 3)
+            recs.append(AdvancedGameStat.from_dict(d))
+    return recs
+
+
+def legacy_flatten_advanced(records):
+    """The row-dict flattener: to_dict() per side, then a to_numeric pass per column."""
+    rows = []
+    for a in records:
+        row = {"game_id": a.game_id, "team": a.team}
+        for attr, ns in (("offense", "off"), ("defense", "def"), ("special_teams", "st")):
+            obj = getattr(a, attr, None)
+            d = obj.to_dict() if obj is not None and hasattr(obj, "to_dict") else {}
+            for k, v in d.items():
+                if isinstance(v, dict):
+                    for kk, vv in v.items():
+                        row[f"{ns}_{k}_{kk}"] = vv
+                else:
+                    row[f"{ns}_{k}"] = v
+        rows.append(row)
+    df = pd.DataFrame(rows).drop_duplicates(subset=["game_id", "team"])
+    for c in df.columns:
+        if c in ("game_id", "team"):
+            continue
+        try:
+            df[c] = pd.to_numeric(df[c])
+        except Exception:
+            pass
+    return df
+
+
+def bench_flatten_advanced(args):
+    recs = synthetic_advanced_stats(args.games)
+    report("flatten advanced stats", timed(lambda: legacy_flatten_advanced(recs), args.repeat),
+           timed(lambda: flatten_advanced_team_game_stats(recs), args.repeat))
+
+
+# --- side assignment --------------------------------------------------------
+
+def legacy_tag_sides(games, df, key="team"):
+    """The pre-join side assignment: an iterrows dict, then a row-wise apply."""
+    m = {}
+    for _, r in games[["game_id", f"home_{key}", f"away_{key}"]].iterrows():
+        m[(r.game_id, r[f"home_{key}"])] = "home"
+        m[(r.game_id, r[f"away_{key}"])] = "away"
+    df = df.copy()
+    df["side"] = df.apply(lambda r: m.get((r["game_id"], r[key])), axis=1)
+    return df
+
+
+def bench_sides(args):
+    basic = flatten_basic_team_game_stats(synthetic_team_stats(args.games))
+    wide = pivot_basic(basic)
+    # the synthetic payload lists the home team first
+    first = basic.drop_duplicates("game_id")[["game_id", "team", "team_id"]]
+    second = basic.drop_duplicates("game_id", keep="last")[["game_id", "team", "team_id"]]
+    games = first.rename(columns={"team": "home_team", "team_id": "home_team_id"}).merge(
+        second.rename(columns={"team": "away_team", "team_id": "away_team_id"}), on="game_id")
+    for key in ("team", "team_id"):
+        pd.testing.assert_frame_equal(legacy_tag_sides(games, wide, key),
+                                      tag_side(wide, team_sides(games, key), key))
+    report("side assignment", timed(lambda: legacy_tag_sides(games, wide, "team_id"), args.repeat),
+           timed(lambda: tag_side(wide, team_sides(games, "team_id"), "team_id"), args.repeat))
+
+
+# --- dtypes -----------------------------------------------------------------
+
+def bench_dtypes(args):
+    """Memory of a full multi-season games_wide load before and after the compact schema."""
+    files = sorted(Path(args.path).glob("games_wide_*.parquet"))
+    before = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    after = apply_schema(before, "games_wide")
+    print(f"{len(files)} seasons, {len(before)} rows x {before.shape[1]} columns from {args.path}")
+    print(memory_report(before, after).to_string())
+
+
+# --- export -----------------------------------------------------------------
+
+LEGACY_WRITERS = {
+    "parquet": lambda df, path: df.to_parquet(path, index=False),
+    "csv": lambda df, path: df.to_csv(path, index=False),
+    "csv.gz": lambda df, path: df.to_csv(path, index=False, compression="gzip"),
+}
+
+
+def bench_export(args):
+    """Write time and file size of one season's games_wide per export format."""
+    path = Path(args.path) if args.path else sorted((PROCESSED / "game").glob("games_wide_*.parquet"))[-1]
+    df = apply_schema(pd.read_parquet(path), "games_wide")
+    print(f"{path.name}: {len(df)} rows x {df.shape[1]} columns")
+    print(f"{'format':<12}{'pandas':>12}{'engine':>12}{'speedup':>10}{'MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        stem = Path(tmp) / "games_wide"
+        for fmt in args.formats:
+            legacy = LEGACY_WRITERS.get(fmt)
+            before = timed(lambda: legacy(df, Path(tmp) / f"legacy.{fmt}"), args.repeat) if legacy else None
+            after = timed(lambda: export(df, stem, [fmt], args.level, args.threads), args.repeat)
+            size = stem.with_name(f"games_wide.{fmt}").stat().st_size / 2**20
+            cols = f"{before:>11.4f}s{after:>11.4f}s{before / after:>9.1f}x" if before else f"{'-':>12}{after:>11.4f}s{'-':>10}"
+            print(f"{fmt:<12}{cols}{size:>10.2f}")
+
+
+# --- ats ----------------------------------------------------------------------
+
+def legacy_ats_record(games, team, side, role, since):
+    """One query as a full-dataset groupby: every team's results by side and role, then one lookup."""
+    rows = []
+    for s, sign in (("home", 1), ("away", -1)):
+        line = sign * games["spread"]
+        rows.append(pd.DataFrame({
+            "season": games["season"], "team": games[f"{s}_team_x"].astype(str), "side": s,
+            "role": np.select([line < 0, line > 0], ["favorite", "underdog"], "pick"),
+            "margin": sign * (games["home_points"] - games["away_points"] + games["spread"]),
+            "has_line": games["spread"].notna(),
+        }))
+    rows = pd.concat(rows, ignore_index=True)
+    rows = rows[(rows["season"] >= since) & rows["has_line"]]
+    rec = rows.assign(cover=rows["margin"] > 0, loss=rows["margin"] < 0) \
+        .groupby(["team", "side", "role"])[["cover", "loss"]].sum()
+    return rec.loc[(team, side, role)] if (team, side, role) in rec.index else pd.Series({"cover": 0, "loss": 0})
+
+
+def bench_ats(args):
+    """A record query over every tracked season: groupby over the games vs ATS cube lookup."""
+    files = sorted(Path(args.path).glob("games_wide_*.parquet"))
+    games = pd.concat([pd.read_parquet(f, columns=GAME_COLUMNS) for f in files], ignore_index=True)
+    cube = ats_cube(games)
+    query = dict(team=args.team, side="away", role="underdog", since=args.since)
+    legacy, rec = legacy_ats_record(games, **query), ats_record(cube, **query)
+    assert (legacy["cover"], legacy["loss"]) == (rec["cover"], rec["ats_loss"])
+    report("ATS record query", timed(lambda: legacy_ats_record(games, **query), args.repeat),
+           timed(lambda: ats_record(cube, **query), args.repeat))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("lines", help="consensus lines for one season: per-game loop vs single pass")
+    p.add_argument("--games", type=int, default=850)
+    # the legacy path is quadratic (minutes per run), so time it once by default
+    p.set_defaults(func=bench_lines, repeat=1)
+
+    p = sub.add_parser("flatten-basic", help="long basic stats for one season: per-value dicts vs columns")
+    p.add_argument("--games", type=int, default=850)
+    p.set_defaults(func=bench_flatten_basic)
+
+    p = sub.add_parser("pivot-basic", help="wide basic stats for several seasons: pivot_table vs array scatter")
+    p.add_argument("--games", type=int, default=850)
+    p.add_argument("--seasons", type=int, default=4)
+    p.set_defaults(func=bench_pivot_basic)
+
+    p = sub.add_parser("flatten-advanced", help="advanced stats for one season: row dicts vs schema paths")
+    p.add_argument("--games", type=int, default=850)
+    p.set_defaults(func=bench_flatten_advanced)
+
+    p = sub.add_parser("sides", help="home/away tagging of one season's team rows: iterrows/apply vs keyed join")
+    p.add_argument("--games", type=int, default=850)
+    p.set_defaults(func=bench_sides)
+
+    p = sub.add_parser("dtypes", help="memory of all processed games_wide seasons: float64/object vs compact schema")
+    p.add_argument("--path", default=str(PROCESSED / "game"))
+    p.set_defaults(func=bench_dtypes, timing=False)
+
+    p = sub.add_parser("export", help="one season's games_wide per export format: pandas writers vs export engine")
+    p.add_argument("--path", default=None, help="games_wide parquet (default: latest season in data/processed/game)")
+    p.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    p.add_argument("--level", type=int, default=None)
+    p.add_argument("--threads", type=int, default=None)
+    p.set_defaults(func=bench_export, timing=False)
+
+    p = sub.add_parser("ats", help="a team's road-underdog ATS record: groupby over all games vs ATS cube")
+    p.add_argument("--path", default=str(PROCESSED / "game"))
+    p.add_argument("--team", default="Vanderbilt")
+    p.add_argument("--since", type=int, default=2019)
+    p.set_defaults(func=bench_ats)
+
+    for p in sub.choices.values():
+        # an argument's own default would override set_defaults(repeat=...)
+        p.add_argument("--repeat", type=int, default=p.get_default("repeat") or 3)
+    args = ap.parse_args()
+    if getattr(args, "timing", True):
+        header()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,20 @@
 import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from who_covers.io import raw_path, processed_path, save_parquet, save_csv
+from who_covers.ats import add_ats
+from who_covers.build import SeasonBuild, game_digests, materialize, record_build
+from who_covers.export import FORMATS, export
+from who_covers.io import processed_path, write_partitioned
+from who_covers.schema import align_frames, apply_schema
 
-def _side_map(g):
-    m = {}
-    for _, r in g[["game_id", "home_team", "away_team"]].iterrows():
-        m[(r.game_id, r.home_team)] = "home"
-        m[(r.game_id, r.away_team)] = "away"
-    return m
-
-def _prefix_side(df_teamwide: pd.DataFrame, which: str) -> pd.DataFrame:
-    sub = df_teamwide[df_teamwide["side"] == which].drop(columns=["side"]).copy()
-    sub = sub.rename(columns={"team": f"{which}_team"})
-    value_cols = [c for c in sub.columns if c not in ("game_id", f"{which}_team")]
-    return sub.rename(columns={c: f"{which}_{c}" for c in value_cols})
-
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--year", type=int, required=True)
-    ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
-    ap.add_argument("--with-lines", action="store_true")
-    # optional: write a gzipped CSV alongside the parquet output
-    ap.add_argument("--csv-gz", dest="csv_gz", action="store_true",
-                    help="also save a gzipped CSV alongside the parquet output")
-    args = ap.parse_args()
-
-    games = pd.read_parquet(raw_path(f"games_{args.year}_{args.season}.parquet"))
-    basic = pd.read_parquet(raw_path(f"basic_{args.year}_{args.season}.parquet"))
-    adv   = pd.read_parquet(raw_path(f"advanced_{args.year}_{args.season}.parquet"))
-
-    side_map = _side_map(games)
-    basic["side"] = basic.apply(lambda r: side_map.get((r["game_id"], r["team"])), axis=1)
-    adv["side"]   = adv.apply(lambda r: side_map.get((r["game_id"], r["team"])), axis=1)
-
-    basic_home = _prefix_side(basic, "home")
-    basic_away = _prefix_side(basic, "away")
-    adv_home   = _prefix_side(adv, "home")
-    adv_away   = _prefix_side(adv, "away")
-
-    basic_merged = basic_home.merge(basic_away, on="game_id", how="outer")
-    adv_merged   = adv_home.merge(adv_away, on="game_id", how="outer")
-
-    base_cols = [
-        "game_id","season","season_type","week","start_date",
-        "home_team","away_team","home_points","away_points",
-        "home_conference","away_conference","conference_game","neutral_site","venue"
-    ]
-    base = games[base_cols].copy()
-
-    df = (base
-          .merge(basic_merged, on="game_id", how="left")
-          .merge(adv_merged,   on="game_id", how="left"))
-
-    if args.with_lines:
-        try:
-            lines = pd.read_parquet(raw_path(f"lines_{args.year}_{args.season}.parquet"))
-            df = df.merge(lines[["game_id","spread","total"]], on="game_id", how="left")
-        except FileNotFoundError:
-            pass
-
-    for c in df.columns:
-        if c.startswith(("home_", "away_", "spread", "total")):
-            df[c] = pd.to_numeric(df[c], errors="ignore")
+from yearly_game_summary import materialize_game_level
+from yearly_summary import materialize_team_level
 
+def add_outcomes(df):
+    """Row-wise derived columns: point_diff, the favorite side and the ATS and over/under results."""
     df["point_diff"] = df["home_points"] - df["away_points"]
     # Safely compute favorite: guard if 'spread' column is missing or non-numeric
     if "spread" in df.columns:
@@ -80,18 +31,141 @@ def main():
             df.loc[mask, "favorite"] = np.where(spread[mask] < 0, "home", "away")
     else:
         df["favorite"] = pd.NA
+    return add_ats(df)
+
+def wide_path(year, season):
+    return processed_path(f"games_wide_{year}_{season}.parquet")
+
+def wide_params(with_lines):
+    """Build options recorded with the wide frame's state (a change forces a full rebuild)."""
+    return f"with_lines={bool(with_lines)}"
+
+def build_frame(year, season, with_lines=False, also=()):
+    """The full wide games frame for one season and the input digests it was built from.
+
+    ``also`` names further products ("team", "game") to rebuild from the same
+    team-game frame, so they cost no extra read or stats merge.
+    """
+    build = SeasonBuild(year, season)
+    df = add_outcomes(build.wide(with_lines))
+    if "team" in also:
+        materialize_team_level(build, year, full=True)
+    if "game" in also:
+        materialize_game_level(build, year, full=True)
+    # compact registry dtypes (categorical names, float32 rates, Int16 counts), kept by parquet
+    return apply_schema(df, "games_wide"), game_digests(build.inputs)
+
+def save_year(df, year, season, exports=(), changed=None, level=None):
+    """Write one season's wide frame: parquet, its lake partitions and any ``exports`` formats.
+
+    With ``changed`` game ids only the lake partitions of their weeks (before and
+    after the update) are rewritten.
+    """
+    out_parq = wide_path(year, season)
+    weeks = None
+    if changed is not None and out_parq.exists() and "week" in df.columns:
+        old = pd.read_parquet(out_parq, columns=["game_id", "week"])
+        weeks = pd.concat([old.loc[old["game_id"].isin(changed), "week"],
+                           df.loc[df["game_id"].isin(changed), "week"]])
+        weeks = None if weeks.isna().any() else sorted(set(weeks.astype(int)))
+    paths = export(df, out_parq.with_suffix(""), ["parquet", *exports], level)
+    if weeks is None:
+        write_partitioned(df, "games_wide", year, season, layer="processed")
+    else:
+        for wk in weeks:
+            write_partitioned(df[df["week"] == wk], "games_wide", year, season, week=wk, layer="processed")
+
+    for fmt, path in paths.items():
+        print(f"Saved {fmt} -> {path}")
+    print(f"Rows: {len(df)}, Cols: {df.shape[1]}")
+    return df
+
+def build_year(year, season, with_lines=False, exports=(), also=(), full=False, level=None):
+    """Bring one season's wide frame (and ``also`` products) up to date.
+
+    Only games whose raw rows changed since the last build are recomputed and
+    upserted, unless ``full`` or there is no previous build.
+    """
+    build = SeasonBuild(year, season)
+    df, changed = materialize(build, wide_path(year, season),
+                              project=lambda b: add_outcomes(b.wide(with_lines)),
+                              save=lambda d, ids: save_year(d, year, season, exports, ids, level),
+                              finalize=lambda d: apply_schema(d, "games_wide"), full=full,
+                              params=wide_params(with_lines))
+    if changed is not None:
+        print(f"{year} {season}: {len(changed)} changed games" if changed else f"{year} {season}: up to date")
+    stem = wide_path(year, season).with_suffix("")
+    missing = [fmt for fmt in exports if not stem.with_name(f"{stem.name}.{fmt}").exists()]
+    if changed == set() and missing:
+        for fmt, path in export(df, stem, missing, level).items():
+            print(f"Saved {fmt} -> {path}")
+    if "team" in also:
+        materialize_team_level(build, year, full)
+    if "game" in also:
+        materialize_game_level(build, year, full)
+    return df
+
+def build_years(years, season, with_lines=False, exports=(), workers=None, consolidate=False, also=(),
+                level=None):
+    """Build several seasons in full at once on a process pool.
+
+    Seasons are built in parallel, then given one column set and one dtype per
+    column (their stat columns differ) before each is written to its per-season
+    files and to the season's partitions of the processed ``games_wide``
+    dataset. With ``consolidate`` all seasons are also saved as one
+    ``games_wide_<season>.parquet`` (plus ``exports``). Returns ``({year: frame}, {year: error})``;
+    a season that fails to build does not stop the others.
+    """
+    years = sorted(set(years))
+    frames, digests, errors = {}, {}, {}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(years)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {yr: pool.submit(build_frame, yr, season, with_lines, also) for yr in years}
+        for yr, fut in futures.items():
+            try:
+                frames[yr], digests[yr] = fut.result()
+            except Exception as e:
+                errors[yr] = e
+                print(f"{yr} build failed: {e!r}")
+    frames = dict(zip(frames, align_frames(frames.values(), "games_wide")))
+    for yr, df in frames.items():
+        save_year(df, yr, season, exports, level=level)
+        record_build(wide_path(yr, season), digests[yr], wide_params(with_lines))
+    if consolidate and frames:
+        out = export(pd.concat(frames.values(), ignore_index=True), processed_path(f"games_wide_{season}"),
+                     ["parquet", *exports], level)
+        print(f"Saved consolidated dataset -> {', '.join(map(str, out.values()))} ({len(frames)} seasons)")
+    return frames, errors
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, nargs="+", required=True,
+                    help="season(s) to build; several seasons are built in parallel with aligned columns")
+    ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
+    ap.add_argument("--with-lines", action="store_true")
+    # optional side outputs next to the parquet
+    ap.add_argument("--export", nargs="+", default=[], choices=[f for f in FORMATS if f != "parquet"],
+                    help="also write these formats (csv, csv.gz, csv.zst, arrow) next to the parquet output")
+    ap.add_argument("--csv-gz", dest="csv_gz", action="store_true", help="same as --export csv.gz")
+    ap.add_argument("--level", type=int, default=None, help="zstd/gzip compression level of the outputs")
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                    help="seasons to build in parallel (worker processes)")
+    ap.add_argument("--consolidate", action="store_true",
+                    help="also save all seasons as one games_wide_<season>.parquet")
+    ap.add_argument("--also", nargs="+", default=[], choices=["team", "game"],
+                    help="also write the team-level ({year}_stats) and/or game-level ({year}_game_stats) products")
+    ap.add_argument("--full", action="store_true",
+                    help="rebuild the season from scratch instead of upserting the games that changed")
+    args = ap.parse_args()
+    exports = list(dict.fromkeys(args.export + (["csv.gz"] if args.csv_gz else [])))
 
-    out_parq = processed_path(f"games_wide_{args.year}_{args.season}.parquet")
-    save_parquet(df, out_parq)
-
-    if args.csv_gz:
-        out_csv_gz = processed_path(f"games_wide_{args.year}_{args.season}.csv.gz")
-        df.to_csv(out_csv_gz, index=False, compression="gzip")
-        print(f"Saved Dataset -> {out_parq}\nSaved CSV.GZ -> {out_csv_gz}\nRows: {len(df)}, Cols: {df.shape[1]}")
-    else: 
-        out_csv = processed_path(f"games_wide_{args.year}_{args.season}.csv")
-        save_csv(df, out_csv)
-        print(f"Saved dataset -> {out_parq}\nSaved CSV -> {out_csv}\nRows: {len(df)}, Cols: {df.shape[1]}")
+    if len(args.year) == 1 and not args.consolidate:
+        build_year(args.year[0], args.season, args.with_lines, exports, args.also, args.full, args.level)
+        return
+    _, errors = build_years(args.year, args.season, args.with_lines, exports, args.workers, args.consolidate,
+                            args.also, args.level)
+    if errors:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
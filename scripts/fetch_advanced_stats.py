@@ -1,65 +1,82 @@
 import argparse
-from who_covers.cfbd_client import get_apis
-from who_covers.io import raw_path, save_parquet
+from who_covers.cfbd_client import add_cache_args, apis_from_args
+from who_covers.fetch import add_fetch_args, fetcher_from_args
+from who_covers.io import add_refresh_args, max_age_from_args, raw_path, save_partition, years_to_refresh
 from who_covers.flatten_advanced import flatten_advanced_team_game_stats
+from who_covers.teams import attach_team_ids
 import pandas as pd
+from fetch_games import final_game_ids, is_final
 
 
+def save_advanced(yr, season, games, recs):
+    # use the FBS game ids to filter advanced records
+    games_ids = {g.id for g in games}
+
+    def _rec_game_id(r):
+        """Return a record's game id using common attribute names or nested objects."""
+        # common possible attribute names
+        for attr in ("game_id", "gameId", "id"):
+            v = getattr(r, attr, None)
+            if v is not None:
+                return v
+        # try nested object
+        g = getattr(r, "game", None)
+        if g is not None:
+            return getattr(g, "id", None)
+        return None
+
+    # keep only records that match known game ids
+    recs = [r for r in recs if _rec_game_id(r) in games_ids]
+    df = attach_team_ids(flatten_advanced_team_game_stats(recs), games)
+
+    # Ensure at most one row per (game_id, team)
+    if not df.empty and {'game_id', 'team'}.issubset(set(df.columns)):
+        df = df.drop_duplicates(subset=['game_id', 'team'], keep='last')
+
+    # If a games parquet exists for this year/season, restrict to its game_ids to ensure parity
+    games_path = raw_path(f"games_{yr}_{season}.parquet")
+    if games_path.exists():
+        games_df = pd.read_parquet(games_path)
+        games_ids = set(games_df['game_id'].astype(int).unique())
+        if 'game_id' in df.columns:
+            df = df[df['game_id'].astype(int).isin(games_ids)]
+        else:
+            print(f"Advanced stats dataframe has no 'game_id' column; skipping game_id filter for {yr} {season}")
+    else:
+        print(f"Warning: games file not found at {games_path}; not filtering advanced output")
+
+    # complete once every game is final and every final game has stats
+    out = save_partition(df, "advanced", yr, season, expected_ids=final_game_ids(games),
+                         complete=all(is_final(g) for g in games))
+    print(f"Saved advanced team-game stats ({len(df)}) -> {out}")
+    return df
+
+def fetch_advanced_year(apis, fetcher, yr, season, games):
+    recs = fetcher.call(apis["stats"].get_advanced_game_stats, year=yr, season_type=season)
+    return save_advanced(yr, season, games, recs)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--year", type=int, nargs='+', required=True,
                     help="One or more season years (e.g. --year 2016 2017)")
     ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
+    add_fetch_args(ap)
+    add_cache_args(ap)
+    add_refresh_args(ap)
     args = ap.parse_args()
+    years = years_to_refresh("advanced", args.year, args.season, max_age_from_args(args), args.force)
 
-    apis = get_apis()
+    apis = apis_from_args(args)
+    fetcher = fetcher_from_args(args)
+    # Fetch FBS games and advanced stats for every requested year in one concurrent batch.
     # The CFBD StatsApi provides advanced game stats via get_advanced_game_stats
     # (previously attempted to call a non-existent get_advanced_team_game_stats)
-    # Accept multiple years and process each year in turn
-    for yr in args.year:
-        # Fetch FBS games for this year/season and use their ids to filter advanced records
-        games = apis["games"].get_games(year=yr, season_type=args.season, classification="fbs")
-        games_ids = {g.id for g in games}
-
-        recs = apis["stats"].get_advanced_game_stats(year=yr, season_type=args.season)
-
-        def _rec_game_id(r):
-            """Return a record's game id using common attribute names or nested objects."""
-            # common possible attribute names
-            for attr in ("game_id", "gameId", "id"):
-                v = getattr(r, attr, None)
-                if v is not None:
-                    return v
-            # try nested object
-            g = getattr(r, "game", None)
-            if g is not None:
-                return getattr(g, "id", None)
-            return None
-
-        # keep only records that match known game ids
-        recs = [r for r in recs if _rec_game_id(r) in games_ids]
-        df = flatten_advanced_team_game_stats(recs)
-
-        # Ensure at most one row per (game_id, team)
-        if not df.empty and {'game_id', 'team'}.issubset(set(df.columns)):
-            df = df.drop_duplicates(subset=['game_id', 'team'], keep='last')
-
-        # If a games parquet exists for this year/season, restrict to its game_ids to ensure parity
-        games_path = raw_path(f"games_{yr}_{args.season}.parquet")
-        if games_path.exists():
-            games_df = pd.read_parquet(games_path)
-            games_ids = set(games_df['game_id'].astype(int).unique())
-            if 'game_id' in df.columns:
-                df = df[df['game_id'].astype(int).isin(games_ids)]
-            else:
-                print(f"Advanced stats dataframe has no 'game_id' column; skipping game_id filter for {yr} {args.season}")
-        else:
-            print(f"Warning: games file not found at {games_path}; not filtering advanced output")
-
-        out = raw_path(f"advanced_{yr}_{args.season}.parquet")
-        save_parquet(df, out)
-        print(f"Saved advanced team-game stats ({len(df)}) -> {out}")
+    games_by_year = fetcher.map(apis["games"].get_games,
+                                [dict(year=yr, season_type=args.season, classification="fbs") for yr in years])
+    recs_by_year = fetcher.map(apis["stats"].get_advanced_game_stats,
+                               [dict(year=yr, season_type=args.season) for yr in years])
+    for yr, games, recs in zip(years, games_by_year, recs_by_year):
+        save_advanced(yr, args.season, games, recs)
 
 if __name__ == "__main__":
     main()
@@ -1,55 +1,80 @@
 import argparse
-from who_covers.cfbd_client import get_apis
-from who_covers.io import raw_path, save_parquet
+from who_covers.cfbd_client import add_cache_args, apis_from_args
+from who_covers.fetch import add_fetch_args, fetcher_from_args
+from who_covers.io import add_refresh_args, max_age_from_args, raw_path, save_partition, years_to_refresh
 import pandas as pd
 from who_covers.flatten_basic import flatten_basic_team_game_stats, pivot_basic
+from fetch_games import final_game_ids, is_final
+
+def season_weeks(games):
+    return sorted({g.week for g in games if getattr(g, 'week', None) is not None})
+
+def fetch_week_stats(apis, fetcher, jobs):
+    """Fetch per-week team stats for every (year, week) job in one concurrent batch.
+
+    One call per week instead of per game; failed weeks map to their exception.
+    """
+    results = fetcher.map(apis["games"].get_game_team_stats,
+                          [dict(year=yr, week=wk) for yr, wk in jobs], return_exceptions=True)
+    return dict(zip(jobs, results))
+
+def save_basic(yr, season, games, recs_by_week):
+    all_recs = []
+    # Precompute set of FBS game ids for this year/season so we can filter
+    games_ids = {g.id for g in games}
+    for wk in season_weeks(games):
+        recs = recs_by_week[(yr, wk)]
+        if isinstance(recs, Exception):
+            print(f"Warning: failed to fetch team stats for year={yr} week={wk}: {recs}")
+            continue
+        # Filter to only FBS games (some week calls return other classifications)
+        all_recs.extend(r for r in recs if getattr(r, 'id', None) in games_ids)
+    long_df = flatten_basic_team_game_stats(all_recs)
+    wide_df = pivot_basic(long_df)
+
+    # Ensure there's at most one row per (game_id, team)
+    if not wide_df.empty and {'game_id', 'team'}.issubset(set(wide_df.columns)):
+        wide_df = wide_df.drop_duplicates(subset=['game_id', 'team'], keep='last')
+
+    # If a games parquet exists for this year/season, restrict to its game_ids to ensure parity
+    games_path = raw_path(f"games_{yr}_{season}.parquet")
+    if games_path.exists():
+        games_df = pd.read_parquet(games_path)
+        games_ids = set(games_df['game_id'].astype(int).unique())
+        wide_df = wide_df[wide_df['game_id'].astype(int).isin(games_ids)]
+    else:
+        print(f"Warning: games file not found at {games_path}; not filtering basic output")
+
+    # complete once every game is final and every final game has stats
+    out = save_partition(wide_df, "basic", yr, season, expected_ids=final_game_ids(games),
+                         complete=all(is_final(g) for g in games))
+    print(f"Saved basic team-game stats ({len(wide_df)}) -> {out}")
+    return wide_df
+
+def fetch_basic_year(apis, fetcher, yr, season, games):
+    recs_by_week = fetch_week_stats(apis, fetcher, [(yr, wk) for wk in season_weeks(games)])
+    return save_basic(yr, season, games, recs_by_week)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--year", type=int, nargs='+', required=True,
                     help="One or more season years (e.g. --year 2016 2017)")
     ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
+    add_fetch_args(ap)
+    add_cache_args(ap)
+    add_refresh_args(ap)
     args = ap.parse_args()
-    apis = get_apis()
-    # Accept multiple years and process each one
-    for yr in args.year:
-        # Fetch game list (FBS only) and then fetch per-game team stats by game id to satisfy API validation
-        games = apis["games"].get_games(year=yr, season_type=args.season, classification="fbs")
-        # Prefer fetching by week to reduce number of API calls (one call per week instead of per game)
-        weeks = sorted({g.week for g in games if getattr(g, 'week', None) is not None})
-        all_recs = []
-        import time
-        # Precompute set of FBS game ids for this year/season so we can filter
-        games_ids = {g.id for g in games}
-        for wk in weeks:
-            try:
-                recs = apis["games"].get_game_team_stats(year=yr, week=wk)
-                # Filter to only FBS games (some week calls return other classifications)
-                recs = [r for r in recs if getattr(r, 'id', None) in games_ids]
-                all_recs.extend(recs)
-            except Exception as e:
-                print(f"Warning: failed to fetch team stats for year={yr} week={wk}: {e}")
-            # small pause to avoid hitting burst rate limits
-            time.sleep(0.2)
-        long_df = flatten_basic_team_game_stats(all_recs)
-        wide_df = pivot_basic(long_df)
-
-        # Ensure there's at most one row per (game_id, team)
-        if not wide_df.empty and {'game_id', 'team'}.issubset(set(wide_df.columns)):
-            wide_df = wide_df.drop_duplicates(subset=['game_id', 'team'], keep='last')
-
-        # If a games parquet exists for this year/season, restrict to its game_ids to ensure parity
-        games_path = raw_path(f"games_{yr}_{args.season}.parquet")
-        if games_path.exists():
-            games_df = pd.read_parquet(games_path)
-            games_ids = set(games_df['game_id'].astype(int).unique())
-            wide_df = wide_df[wide_df['game_id'].astype(int).isin(games_ids)]
-        else:
-            print(f"Warning: games file not found at {games_path}; not filtering basic output")
-
-        out = raw_path(f"basic_{yr}_{args.season}.parquet")
-        save_parquet(wide_df, out)
-        print(f"Saved basic team-game stats ({len(wide_df)}) -> {out}")
+    years = years_to_refresh("basic", args.year, args.season, max_age_from_args(args), args.force)
+    apis = apis_from_args(args)
+    fetcher = fetcher_from_args(args)
+    # Fetch the FBS game lists for every requested year concurrently
+    games_by_year = fetcher.map(apis["games"].get_games,
+                                [dict(year=yr, season_type=args.season, classification="fbs") for yr in years])
+    jobs = [(yr, wk) for yr, games in zip(years, games_by_year) for wk in season_weeks(games)]
+    recs_by_week = fetch_week_stats(apis, fetcher, jobs)
+
+    for yr, games in zip(years, games_by_year):
+        save_basic(yr, args.season, games, recs_by_week)
 
 if __name__ == "__main__":
     main()
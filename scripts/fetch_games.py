@@ -1,42 +1,63 @@
 import argparse
 import pandas as pd
-from who_covers.cfbd_client import get_apis
-from who_covers.io import raw_path, save_parquet
+from who_covers.cfbd_client import add_cache_args, apis_from_args
+from who_covers.fetch import add_fetch_args, fetcher_from_args
+from who_covers.io import add_refresh_args, max_age_from_args, save_partition, years_to_refresh
+
+def is_final(g):
+    completed = getattr(g, "completed", None)
+    if completed is not None:
+        return bool(completed)
+    return getattr(g, "home_points", None) is not None and getattr(g, "away_points", None) is not None
+
+def final_game_ids(games):
+    return {g.id for g in games if is_final(g)}
+
+def save_games(yr, season, games):
+    rows = []
+    for g in games:
+        rows.append({
+            "game_id": g.id,
+            "season": g.season,
+            "week": g.week,
+            "season_type": g.season_type,
+            "conference_game": getattr(g, "conference_game", None),
+            "neutral_site": getattr(g, "neutral_site", None),
+            "venue": getattr(g, "venue", None),
+            "home_team": getattr(g, "home_team", None),
+            "home_team_id": getattr(g, "home_id", None),
+            "home_points": getattr(g, "home_points", None),
+            "away_team": getattr(g, "away_team", None),
+            "away_team_id": getattr(g, "away_id", None),
+            "away_points": getattr(g, "away_points", None),
+            "home_conference": getattr(g, "home_conference", None),
+            "away_conference": getattr(g, "away_conference", None),
+            "start_date": pd.to_datetime(getattr(g, "start_date", None), errors="coerce"),
+        })
+    df = pd.DataFrame(rows).drop_duplicates(subset=["game_id"]) if rows else pd.DataFrame()
+    # a season's game list is complete once every game is final
+    out = save_partition(df, "games", yr, season, complete=all(is_final(g) for g in games))
+    print(f"Saved {len(df)} games -> {out}")
+    return df
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--year", type=int, nargs='+', required=True,
                     help="One or more years (e.g. --year 2016 2017)")
     ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
+    add_fetch_args(ap)
+    add_cache_args(ap)
+    add_refresh_args(ap)
     args = ap.parse_args()
+    years = years_to_refresh("games", args.year, args.season, max_age_from_args(args), args.force)
 
-    apis = get_apis()
-    for yr in args.year:
-        # Only fetch FBS regular/postseason games to keep datasets consistent
-        games = apis["games"].get_games(year=yr, season_type=args.season, classification="fbs")
-
-        rows = []
-        for g in games:
-            rows.append({
-                "game_id": g.id,
-                "season": g.season,
-                "week": g.week,
-                "season_type": g.season_type,
-                "conference_game": getattr(g, "conference_game", None),
-                "neutral_site": getattr(g, "neutral_site", None),
-                "venue": getattr(g, "venue", None),
-                "home_team": getattr(g, "home_team", None),
-                "home_points": getattr(g, "home_points", None),
-                "away_team": getattr(g, "away_team", None),
-                "away_points": getattr(g, "away_points", None),
-                "home_conference": getattr(g, "home_conference", None),
-                "away_conference": getattr(g, "away_conference", None),
-                "start_date": pd.to_datetime(getattr(g, "start_date", None), errors="coerce"),
-            })
-        df = pd.DataFrame(rows).drop_duplicates(subset=["game_id"]) if rows else pd.DataFrame()
-        out = raw_path(f"games_{yr}_{args.season}.parquet")
-        save_parquet(df, out)
-        print(f"Saved {len(df)} games -> {out}")
+    apis = apis_from_args(args)
+    fetcher = fetcher_from_args(args)
+    # Only fetch FBS regular/postseason games to keep datasets consistent
+    games_by_year = fetcher.map(apis["games"].get_games,
+                                [dict(year=yr, season_type=args.season, classification="fbs") for yr in years])
+    for yr, games in zip(years, games_by_year):
+        save_games(yr, args.season, games)
 
 if __name__ == "__main__":
     main()
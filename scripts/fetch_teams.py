@@ -0,0 +1,36 @@
+"""Refresh the persistent team registry (ids, aliases, conference history) from the teams API.
+
+Usage: python scripts/fetch_teams.py --year 2016 2017 2018
+"""
+import argparse
+
+import pandas as pd
+
+from who_covers.cfbd_client import add_cache_args, apis_from_args
+from who_covers.fetch import add_fetch_args, fetcher_from_args
+from who_covers.teams import load_teams, team_rows, update_team_registry
+
+
+def fetch_teams(apis, fetcher, years):
+    """Fetch every season's team list in one batch and upsert the registry."""
+    teams_by_year = fetcher.map(apis["teams"].get_teams, [dict(year=yr) for yr in years])
+    rows = pd.concat([team_rows(t, yr) for yr, t in zip(years, teams_by_year)], ignore_index=True)
+    update_team_registry(rows)
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, nargs='+', required=True,
+                    help="Seasons whose team lists and conferences to record")
+    add_fetch_args(ap)
+    add_cache_args(ap)
+    args = ap.parse_args()
+
+    rows = fetch_teams(apis_from_args(args), fetcher_from_args(args), args.year)
+    print(f"Recorded {rows['team_id'].nunique()} teams over {len(args.year)} seasons; "
+          f"registry now has {len(load_teams())} teams")
+
+
+if __name__ == "__main__":
+    main()
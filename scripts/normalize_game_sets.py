@@ -1,79 +1,139 @@
+"""Add placeholder rows so every FBS game has a basic and an advanced row for both teams.
+
+Each season's games are melted once into (game_id, team, team_id, conference)
+slots and anti-joined against the basic and advanced tables, on integer team
+ids when both sides carry them. All requested seasons are handled in one pass
+and only the files that gained rows are rewritten.
+
+Usage: python scripts/normalize_game_sets.py --season regular   # every season on disk
+"""
 import argparse
-from pathlib import Path
+import re
+
 import pandas as pd
+import pyarrow.parquet as pq
 
-from who_covers.io import raw_path
+from who_covers.io import RAW, raw_path, save_parquet
 
+KINDS = ("basic", "advanced")
 
-def ensure_pairs(games_df, df, kind):
-    # games_df has columns game_id, home_team, away_team, home_conference, away_conference
-    expected = []
-    for _, r in games_df.iterrows():
-        gid = int(r['game_id'])
-        expected.append((gid, r.get('home_team')))
-        expected.append((gid, r.get('away_team')))
 
-    existing = set()
-    if not df.empty:
-        existing = set((int(x), y) for x, y in zip(df['game_id'], df['team']))
+def team_slots(games_df):
+    """One row per (game, side): game_id, team, team_id (when games carry ids) and team_conference.
 
-    missing = [pair for pair in expected if pair not in existing]
-    if not missing:
-        return df, 0
+    Rows are in game order, home before away; extra columns such as ``year`` are kept.
+    """
+    extra = [c for c in games_df.columns if c == "year"]
+    sides = []
+    for side in ("home", "away"):
+        cols = {"game_id": "game_id", f"{side}_team": "team", f"{side}_team_id": "team_id",
+                f"{side}_conference": "team_conference"}
+        cols = {src: dst for src, dst in cols.items() if src in games_df.columns}
+        sides.append(games_df[extra + list(cols)].rename(columns=cols))
+    slots = pd.concat(sides).sort_index(kind="stable").reset_index(drop=True)
+    slots["game_id"] = slots["game_id"].astype("int64")
+    if "team_id" in slots.columns:
+        slots["team_id"] = slots["team_id"].astype("Int64")
+    return slots
+
+
+def join_key(slots, df):
+    """Integer team_id when every slot and every stats row carry one, else the team name."""
+    if all("team_id" in d.columns and d["team_id"].notna().all() for d in (slots, df)):
+        return "team_id"
+    return "team"
 
-    # Prepare template row keys (use existing columns if any)
-    cols = list(df.columns) if not df.empty else ['game_id', 'team', 'team_conference']
-    rows = []
-    games_map = {(int(r['game_id']), r.get('home_team')): ('home_conference',)
-                 for _, r in games_df.iterrows()}
-    # build conference mapping per (gid, team)
-    conf_map = {}
-    for _, r in games_df.iterrows():
-        gid = int(r['game_id'])
-        conf_map[(gid, r.get('home_team'))] = r.get('home_conference')
-        conf_map[(gid, r.get('away_team'))] = r.get('away_conference')
-
-    for gid, team in missing:
-        row = {c: None for c in cols}
-        row['game_id'] = gid
-        row['team'] = team
-        # if team_conference column exists, populate from games mapping
-        if 'team_conference' in cols:
-            row['team_conference'] = conf_map.get((gid, team))
-        rows.append(row)
-
-    add_df = pd.DataFrame(rows, columns=cols)
+
+def missing_slots(slots, df, key, by=("game_id",)):
+    """Slots with no row in ``df``: an anti-join on ``by`` + ``key``."""
+    on = list(by) + [key]
+    slots = slots.drop_duplicates(on)
     if df.empty:
-        result = add_df
-    else:
-        result = pd.concat([df, add_df], ignore_index=True, sort=False)
-    return result, len(rows)
+        return slots
+    have = df[on].drop_duplicates()
+    if key == "team_id":
+        have = have.astype({"team_id": "Int64"})
+    have = have.astype({"game_id": "int64"})
+    hit = slots.merge(have, on=on, how="left", indicator=True)["_merge"].eq("both").to_numpy()
+    return slots[~hit]
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument('--year', type=int, nargs='+', required=True)
-    ap.add_argument('--season', default='regular', choices=['regular', 'postseason', 'both'])
-    args = ap.parse_args()
+def append_placeholders(df, missing):
+    """``df`` plus one row per missing slot: key and conference columns filled, every stat null."""
+    if df.empty:
+        return missing[[c for c in ("game_id", "team", "team_id", "team_conference") if c in missing.columns]]
+    add = missing[[c for c in missing.columns if c in df.columns]]
+    return pd.concat([df, add], ignore_index=True, sort=False)
 
-    for yr in args.year:
-        games_path = raw_path(f'games_{yr}_{args.season}.parquet')
-        if not games_path.exists():
-            print(f'skipping {yr}: games file not found at {games_path}')
+
+def ensure_pairs(games_df, df, kind=None):
+    """Return ``df`` with a placeholder row appended for every missing (game, team), and the count."""
+    slots = team_slots(games_df)
+    missing = missing_slots(slots, df, join_key(slots, df))
+    if missing.empty:
+        return df, 0
+    return append_placeholders(df, missing), len(missing)
+
+
+def season_years(season):
+    """Years with a games file for ``season`` on disk."""
+    pattern = re.compile(rf"games_(\d{{4}})_{season}\.parquet$")
+    return sorted(int(m.group(1)) for p in RAW.glob(f"games_*_{season}.parquet") if (m := pattern.match(p.name)))
+
+
+def normalize_years(years, season):
+    """Add placeholders for all ``years`` at once; returns {(year, kind): rows added}."""
+    games = {}
+    for yr in years:
+        path = raw_path(f"games_{yr}_{season}.parquet")
+        if not path.exists():
+            print(f"skipping {yr}: games file not found at {path}")
             continue
-        games_df = pd.read_parquet(games_path)
+        games[yr] = pd.read_parquet(path)
+    if not games:
+        return {}
+    slots = team_slots(pd.concat(games, names=["year", None]).reset_index(level=0).reset_index(drop=True))
 
-        for kind in ('basic', 'advanced'):
-            path = raw_path(f'{kind}_{yr}_{args.season}.parquet')
+    added = {}
+    for kind in KINDS:
+        # only the key columns are read for the anti-join
+        frames = {}
+        for yr in games:
+            path = raw_path(f"{kind}_{yr}_{season}.parquet")
             if path.exists():
-                df = pd.read_parquet(path)
+                names = pq.read_schema(path).names
+                frames[yr] = pd.read_parquet(path, columns=[c for c in ("game_id", "team", "team_id") if c in names])
             else:
-                df = pd.DataFrame()
+                frames[yr] = pd.DataFrame()
+        # one anti-join per key type across all seasons (older seasons may lack team ids)
+        missing = []
+        by_key = {}
+        for yr, df in frames.items():
+            by_key.setdefault(join_key(slots[slots["year"] == yr], df), []).append(yr)
+        for key, yrs in by_key.items():
+            stats = [df[["game_id", key]].assign(year=yr) for yr, df in frames.items() if yr in yrs and not df.empty]
+            stats = pd.concat(stats, ignore_index=True) if stats else pd.DataFrame(columns=["year", "game_id", key])
+            missing.append(missing_slots(slots[slots["year"].isin(yrs)], stats, key, by=("year", "game_id")))
+        missing = pd.concat(missing)
+        for yr, df in frames.items():
+            add = missing[missing["year"] == yr].drop(columns="year")
+            if not add.empty:
+                path = raw_path(f"{kind}_{yr}_{season}.parquet")
+                full = pd.read_parquet(path) if path.exists() else df
+                save_parquet(append_placeholders(full, add), path)
+            added[(yr, kind)] = len(add)
+    return added
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--year', type=int, nargs='+', help='seasons to normalize (default: every season on disk)')
+    ap.add_argument('--season', default='regular', choices=['regular', 'postseason', 'both'])
+    args = ap.parse_args()
 
-            df2, added = ensure_pairs(games_df, df, kind)
-            if added:
-                df2.to_parquet(path, index=False)
-            print(f'{yr} {kind}: added {added} placeholder rows')
+    years = args.year or season_years(args.season)
+    for (yr, kind), n in sorted(normalize_years(years, args.season).items()):
+        print(f'{yr} {kind}: added {n} placeholder rows')
 
 
 if __name__ == '__main__':
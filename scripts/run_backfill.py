@@ -1,38 +1,154 @@
+"""Backfill raw data and built datasets for a range of seasons in one process.
+
+The team registry is refreshed once, then each season's fetches run as a task
+graph: fetch_games -> basic/advanced/lines. Tasks share one API client and the
+season's game list; seasons run in parallel on a process pool, and a failing
+season does not stop the others. Finally every season that fetched cleanly is
+built in one multi-season pass (aligned columns, one partitioned games_wide
+dataset plus the consolidated games_wide_<season>.parquet).
+"""
 import argparse
-import subprocess
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from who_covers.cfbd_client import get_apis
+from who_covers.dag import TaskGraph
+from who_covers.export import FORMATS
+from who_covers.fetch import Fetcher, add_fetch_args
+from who_covers.io import add_refresh_args, max_age_from_args, partition_status
+
+from build_dataset import build_years
+from fetch_advanced_stats import fetch_advanced_year
+from fetch_basic_stats import fetch_basic_year
+from fetch_games import save_games
+from fetch_lines import fetch_lines_year
+from fetch_teams import fetch_teams
 
 YEARS = list(range(2016, 2025))  # 2016..2024 inclusive
 
-def sh(cmd):
-    print(">>", " ".join(cmd))
-    res = subprocess.run(cmd)
-    if res.returncode != 0:
-        sys.exit(res.returncode)
+# one pooled API client and rate limiter per worker process, shared by all of its tasks
+_apis = None
+_fetcher = None
+
+
+def _init_worker(offline, concurrency, rate):
+    global _apis, _fetcher
+    _apis = get_apis(cache=True, offline=offline)
+    _fetcher = Fetcher(concurrency=concurrency, rate=rate)
+
+
+def run_season(yr, season, with_lines, max_age=None, force=False):
+    apis, fetcher = _apis, _fetcher
+    datasets = ["games", "basic", "advanced"] + (["lines"] if with_lines else [])
+    # raw partitions the manifest says are missing, incomplete or stale
+    stale = {ds for ds in datasets if force or partition_status(ds, yr, season, max_age=max_age)}
+    if not stale:
+        return {"timings": {}, "errors": {}, "skipped": [], "up_to_date": True}
+
+    def games():
+        # the game list is needed downstream even when its own partition is current;
+        # save_partition leaves an unchanged file alone
+        g = fetcher.call(apis["games"].get_games, year=yr, season_type=season, classification="fbs")
+        save_games(yr, season, g)
+        return g
+
+    def only_if_stale(dataset, fetch):
+        return lambda g: fetch(apis, fetcher, yr, season, g) if dataset in stale else None
+
+    graph = TaskGraph()
+    graph.add("fetch_games", games)
+    graph.add("fetch_basic", only_if_stale("basic", fetch_basic_year), deps=["fetch_games"])
+    graph.add("fetch_advanced", only_if_stale("advanced", fetch_advanced_year), deps=["fetch_games"])
+    if with_lines:
+        graph.add("fetch_lines", only_if_stale("lines", fetch_lines_year), deps=["fetch_games"])
+
+    out = graph.run()
+    # only picklable summaries travel back to the parent process
+    return {
+        "timings": out["timings"],
+        "errors": {k: repr(v) for k, v in out["errors"].items()},
+        "skipped": out["skipped"],
+        "up_to_date": False,
+    }
+
+
+def print_timings(summaries):
+    tasks = ["fetch_games", "fetch_basic", "fetch_advanced", "fetch_lines"]
+    print(f"\n{'year':<6}" + "".join(f"{t:>16}" for t in tasks) + f"{'status':>10}")
+    for yr, s in sorted(summaries.items()):
+        cells = []
+        for t in tasks:
+            if t in s["errors"]:
+                cells.append(f"{'FAILED':>16}")
+            elif t in s["timings"]:
+                cells.append(f"{s['timings'][t]:>15.1f}s")
+            elif t in s["skipped"]:
+                cells.append(f"{'skipped':>16}")
+            else:
+                cells.append(f"{'-':>16}")
+        if s["errors"] or s["skipped"]:
+            status = "FAILED"
+        else:
+            status = "current" if s.get("up_to_date") else "ok"
+        print(f"{yr:<6}" + "".join(cells) + f"{status:>10}")
+
 
 def main():
     ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, nargs='+', default=YEARS,
+                    help="Seasons to backfill (default 2016-2024)")
     ap.add_argument("--season", default="regular", choices=["regular","postseason","both"])
     # include betting lines by default; add --no-lines to disable
     ap.add_argument('--with-lines', dest='with_lines', action='store_true', help='fetch and merge betting lines')
     ap.add_argument('--no-lines', dest='with_lines', action='store_false', help='do not fetch or merge betting lines')
     ap.set_defaults(with_lines=True)
+    ap.add_argument('--offline', action='store_true', help='serve API responses from the on-disk cache only')
+    ap.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                    help='seasons to process in parallel (worker processes)')
+    ap.add_argument('--export', nargs='+', default=[], choices=[f for f in FORMATS if f != 'parquet'],
+                    help='also write the built datasets in these formats (e.g. csv.gz, csv.zst, arrow)')
+    add_fetch_args(ap)
+    add_refresh_args(ap)
     args = ap.parse_args()
+    max_age = max_age_from_args(args)
+
+    # the team registry is shared by every season, so refresh it once up front
+    try:
+        fetch_teams(get_apis(cache=True, offline=args.offline), Fetcher(args.concurrency, args.rate), args.year)
+    except Exception as e:
+        print(f"Team registry refresh failed: {e!r}")
 
-    for yr in YEARS:
-        # fetch
-        sh([sys.executable, "scripts/fetch_games.py", "--year", str(yr), "--season", args.season])
-        sh([sys.executable, "scripts/fetch_basic_stats.py", "--year", str(yr), "--season", args.season])
-        sh([sys.executable, "scripts/fetch_advanced_stats.py", "--year", str(yr), "--season", args.season])
-        if args.with_lines:
-            sh([sys.executable, "scripts/fetch_lines.py", "--year", str(yr), "--season", args.season])
+    workers = max(1, min(args.workers, len(args.year)))
+    # split the request budget so all workers together respect --rate
+    initargs = (args.offline, args.concurrency, args.rate / workers)
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = {yr: pool.submit(run_season, yr, args.season, args.with_lines, max_age, args.force) for yr in args.year}
+        for yr, fut in futures.items():
+            try:
+                summaries[yr] = fut.result()
+            except Exception as e:
+                summaries[yr] = {"timings": {}, "errors": {"worker": repr(e)}, "skipped": [], "up_to_date": False}
+            for task, err in summaries[yr]["errors"].items():
+                print(f"{yr} {task} failed: {err}")
 
-        # build (with gzip)
-        build_cmd = [sys.executable, "scripts/build_dataset.py", "--year", str(yr), "--season", args.season, "--csv-gz"]
-        if args.with_lines:
-            build_cmd.append("--with-lines")
-        sh(build_cmd)
+    # one multi-season build over every season whose raw data is complete
+    fetched = [yr for yr, s in summaries.items() if not (s["errors"] or s["skipped"])]
+    if fetched:
+        t0 = time.perf_counter()
+        _, build_errors = build_years(fetched, args.season, args.with_lines, exports=args.export,
+                                      workers=args.workers, consolidate=True)
+        for yr, err in build_errors.items():
+            summaries[yr]["errors"]["build_dataset"] = repr(err)
+        print(f"Built {len(fetched) - len(build_errors)}/{len(fetched)} seasons in {time.perf_counter() - t0:.1f}s")
 
+    print_timings(summaries)
+    failed = [yr for yr, s in summaries.items() if s["errors"] or s["skipped"]]
+    if failed:
+        print(f"Backfill finished with failures for {failed}.")
+        sys.exit(1)
     print("Backfill complete.")
 
 if __name__ == "__main__":
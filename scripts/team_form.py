@@ -0,0 +1,76 @@
+"""Compute pre-game team form features from the games_wide datasets.
+
+For every team-game: means of the previous 3 and 5 games, an EWMA and the
+season-to-date mean of each stat, counting only games before kickoff. Saves
+data/processed/team_form_<year>_<season>.parquet per season; reruns only
+recompute the teams whose games changed (all of them with --full). Postseason
+form counts the same year's regular-season games as earlier games.
+
+Usage: python scripts/team_form.py --year 2023 2024 --season regular
+"""
+import argparse
+import re
+
+import pandas as pd
+
+from who_covers.features import team_games, update_form
+from who_covers.io import PROCESSED
+
+# seasons built by build_dataset, then the tracked history
+WIDE_DIRS = (PROCESSED, PROCESSED / "game")
+
+
+def wide_file(year, season):
+    for d in WIDE_DIRS:
+        path = d / f"games_wide_{year}_{season}.parquet"
+        if path.exists():
+            return path
+    return None
+
+
+def wide_years(season):
+    pattern = re.compile(rf"games_wide_(\d{{4}})_{season}\.parquet$")
+    return sorted({int(m.group(1)) for d in WIDE_DIRS for p in d.glob(f"games_wide_*_{season}.parquet")
+                   if (m := pattern.match(p.name))})
+
+
+def load_wide(years, season, quiet=False):
+    """The games_wide rows of ``years`` (None when there are none)."""
+    frames = []
+    for yr in years:
+        path = wide_file(yr, season)
+        if path is None:
+            if not quiet:
+                print(f"skipping {yr}: no games_wide_{yr}_{season}.parquet")
+            continue
+        frames.append(pd.read_parquet(path))
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def update_team_form(years, season, full=False):
+    wide = load_wide(years, season)
+    if wide is None:
+        return {}
+    history = None
+    if season == "postseason":
+        # bowl games follow the regular season: its games are the prior ones
+        regular = load_wide(sorted(set(wide["season"].astype(int))), "regular", quiet=True)
+        if regular is None:
+            print("no regular-season games_wide for the postseason form; it starts from no games")
+        else:
+            history = team_games(regular)
+    return update_form(team_games(wide), season, full, history)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, nargs="+", help="seasons to update (default: every built season)")
+    ap.add_argument("--season", default="regular", choices=["regular", "postseason", "both"])
+    ap.add_argument("--full", action="store_true", help="recompute every team instead of the changed ones")
+    args = ap.parse_args()
+    update_team_form(args.year or wide_years(args.season), args.season, args.full)
+
+
+if __name__ == "__main__":
+    main()
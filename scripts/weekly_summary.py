@@ -1,4 +1,10 @@
-"""Create a per-week summary by joining basic, advanced, and lines datasets.
+"""Create per-week summaries by joining basic, advanced, and lines datasets.
+
+All requested weeks of every requested year are summarized in one batch: each
+raw dataset is read in a single partition-pruned scan, basic and advanced are
+merged once on (year, week, game_id, team) and the result is written as the
+week-partitioned ``weekly_summary`` dataset (data/lake/processed). ``week_view``
+reads one week back; --files also writes the per-week parquet files.
 
 Usage: python scripts/weekly_summary.py --year 2025 --start-week 1 --end-week 15
 """
@@ -6,7 +12,9 @@ import argparse
 from pathlib import Path
 import pandas as pd
 
-from who_covers.io import raw_path, processed_path
+from who_covers.io import raw_path, processed_path, read_dataset, write_weeks
+
+KEYS = ["year", "week", "game_id"]
 
 
 def load_if_exists(path: Path):
@@ -15,42 +23,70 @@ def load_if_exists(path: Path):
     return None
 
 
-def summarize_week(year: int, week: int, season: str):
-    basic_p = raw_path(f"basic_{year}_week{week}_{season}.parquet")
-    adv_p = raw_path(f"advanced_{year}_week{week}_{season}.parquet")
-    lines_p = raw_path(f"lines_{year}_week{week}_{season}.parquet")
-
-    basic = load_if_exists(basic_p)
-    adv = load_if_exists(adv_p)
-    lines = load_if_exists(lines_p)
-
+def scan(kind: str, years, weeks, season: str):
+    """All requested weeks of a raw dataset, with year and week columns (None when there are none).
+
+    Weeks missing from the partitioned dataset fall back to their per-week raw files.
+    """
+    df = read_dataset(kind, years=years, season=season, weeks=weeks).drop(columns=["season_type"], errors="ignore")
+    have = set(zip(df["year"], df["week"])) if not df.empty else set()
+    extra = []
+    for yr in years:
+        for wk in weeks:
+            if (yr, wk) not in have:
+                part = load_if_exists(raw_path(f"{kind}_{yr}_week{wk}_{season}.parquet"))
+                if part is not None and not part.empty:
+                    extra.append(part.assign(year=yr, week=wk))
+    frames = [f for f in [df] + extra if not f.empty]
+    if not frames:
+        return None
+    out = pd.concat(frames, ignore_index=True)
+    return out.astype({"year": "int64", "week": "int64"})
+
+
+def summarize_weeks(years, weeks, season: str, files: bool = False):
+    """Summarize every (year, week) in one merge and write the week-partitioned dataset."""
+    years, weeks = sorted(set(years)), sorted(set(weeks))
+    basic, adv, lines = (scan(kind, years, weeks, season) for kind in ("basic", "advanced", "lines"))
     if basic is None and adv is None:
-        print(f"  nothing to summarize for {year} week {week}")
-        return False
+        print(f"  nothing to summarize for {years} weeks {weeks[0]}-{weeks[-1]}")
+        return None
 
-    # Merge basic and advanced on game_id/team
+    # Merge basic and advanced on (year, week, game_id, team)
     if basic is None:
-        merged = adv.copy()
+        merged = adv
     elif adv is None:
-        merged = basic.copy()
+        merged = basic
     else:
         # prefer values from basic when conflicts exist; use outer to preserve any mismatched rows
-        merged = pd.merge(basic, adv, on=["game_id", "team"], how="outer", suffixes=("", "_adv"))
+        merged = pd.merge(basic, adv, on=KEYS + ["team"], how="outer", suffixes=("", "_adv"))
 
-    # Attach lines (game-level) to each team row by merging on game_id
-    if lines is not None and not lines.empty:
-        merged = merged.merge(lines, on="game_id", how="left", suffixes=(None, "_line"))
+    # Attach lines (game-level) to each team row
+    if lines is not None:
+        merged = merged.merge(lines, on=KEYS, how="left", suffixes=(None, "_line"))
 
-    # Normalize column order: game_id, team, then other columns
-    cols = list(merged.columns)
-    ordered = [c for c in ["game_id", "team"] if c in cols] + [c for c in cols if c not in ("game_id", "team")]
-    merged = merged[ordered]
+    # Normalize column order: year, week, game_id, team, then other columns
+    front = [c for c in KEYS + ["team"] if c in merged.columns]
+    merged = merged[front + [c for c in merged.columns if c not in front]]
 
-    out = processed_path(f"weekly_{year}_week{week}_{season}.parquet")
-    out.parent.mkdir(parents=True, exist_ok=True)
-    merged.to_parquet(out, index=False)
-    print(f"  saved weekly summary -> {out} ({len(merged)})")
-    return True
+    paths = write_weeks(merged, "weekly_summary", season, layer="processed")
+    print(f"  saved {len(paths)} weekly summaries ({len(merged)} rows) -> {paths[0].parents[2]}")
+    if files:
+        for (yr, wk), part in merged.groupby(["year", "week"], sort=True):
+            out = processed_path(f"weekly_{yr}_week{wk}_{season}.parquet")
+            part.drop(columns=["year", "week"]).to_parquet(out, index=False)
+            print(f"  saved weekly summary -> {out} ({len(part)})")
+    return merged
+
+
+def week_view(year: int, week: int, season: str):
+    """One week's summary, as the per-week files had it (no partition columns)."""
+    df = read_dataset("weekly_summary", years=[year], season=season, weeks=[week], layer="processed")
+    return df.drop(columns=["season_type", "year", "week"], errors="ignore")
+
+
+def summarize_week(year: int, week: int, season: str):
+    return summarize_weeks([year], [week], season, files=True) is not None
 
 
 def main():
@@ -59,12 +95,12 @@ def main():
     ap.add_argument("--start-week", type=int, default=1)
     ap.add_argument("--end-week", type=int, default=15)
     ap.add_argument("--season", default="regular", choices=["regular", "postseason", "both"])
+    ap.add_argument("--files", action="store_true",
+                    help="also write data/processed/weekly_<year>_week<N>_<season>.parquet per week")
     args = ap.parse_args()
 
-    for yr in args.year:
-        print(f"Processing year {yr} {args.season} weeks {args.start_week}-{args.end_week}")
-        for wk in range(args.start_week, args.end_week + 1):
-            summarize_week(yr, wk, args.season)
+    print(f"Processing years {args.year} {args.season} weeks {args.start_week}-{args.end_week}")
+    summarize_weeks(args.year, range(args.start_week, args.end_week + 1), args.season, args.files)
 
 
 if __name__ == '__main__':
@@ -1,24 +1,55 @@
 """Fetch weekly basic and advanced team stats and save per-week parquet files.
 
+The season files are then compacted from the weekly partitions, so in-season
+updates never refetch a whole season. With --build the processed products are
+then brought up to date incrementally: only the games whose raw rows changed
+are rebuilt and upserted, and only their teams' form is recomputed.
+
 Usage: python scripts/weekly_update.py --year 2025 --start-week 1 --end-week 15
 """
 import argparse
-import time
-import sys
-import pandas as pd
 
-from who_covers.cfbd_client import get_apis
-from who_covers.io import raw_path, save_parquet
+from who_covers.cfbd_client import add_cache_args, apis_from_args
+from who_covers.fetch import add_fetch_args, fetcher_from_args
+from who_covers.io import add_refresh_args, compact_weeks, max_age_from_args, partition_status, save_partition
 from who_covers.flatten_basic import flatten_basic_team_game_stats, pivot_basic
 from who_covers.flatten_advanced import flatten_advanced_team_game_stats
-
-
-def sh_sleep(s):
-    try:
-        time.sleep(s)
-    except KeyboardInterrupt:
-        print('Interrupted')
-        sys.exit(1)
+from who_covers.teams import attach_team_ids
+from who_covers.lines import append_line_history, consolidate_lines, provider_rows
+from ats_cube import update_ats_cube
+from build_dataset import build_year
+from fetch_games import final_game_ids, is_final, save_games
+from team_form import update_team_form
+
+
+def season_index(games):
+    """Index a season's games once: game_id -> week, and the games of each week."""
+    week_of = {}
+    games_by_week = {}
+    for g in games:
+        wk = getattr(g, 'week', None)
+        if wk is None:
+            continue
+        week_of[g.id] = wk
+        games_by_week.setdefault(wk, []).append(g)
+    return week_of, games_by_week
+
+
+def compact_season(yr, season, games):
+    """Rebuild the season raw files from the weekly partitions, reading only changed weeks."""
+    final = all(is_final(g) for g in games)
+    for ds, expected in (("basic", final_game_ids(games)), ("advanced", final_game_ids(games)), ("lines", None)):
+        out = compact_weeks(ds, yr, season, expected_ids=expected, complete=final)
+        if out is not None:
+            print(f"  Compacted {ds} weeks -> {out}")
+
+
+def update_products(yr, season, games):
+    """Upsert this season's changed games into the processed products."""
+    save_games(yr, season, games)
+    build_year(yr, season, with_lines=True, also=("team", "game"))
+    update_team_form([yr], season)
+    update_ats_cube([yr], season)
 
 
 def main():
@@ -28,162 +59,109 @@ def main():
     ap.add_argument("--season", default="regular", choices=["regular", "postseason", "both"])
     ap.add_argument("--start-week", type=int, default=1)
     ap.add_argument("--end-week", type=int, default=15)
-    ap.add_argument("--sleep", type=float, default=0.2, help="Seconds to sleep between API calls")
+    add_fetch_args(ap)
+    add_cache_args(ap)
+    add_refresh_args(ap)
+    ap.add_argument("--build", action="store_true",
+                    help="update games_wide, the team/game-level products, team form and the ATS cube")
     args = ap.parse_args()
+    max_age = max_age_from_args(args)
 
-    apis = get_apis()
+    apis = apis_from_args(args)
+    fetcher = fetcher_from_args(args)
+    games_by_year = fetcher.map(apis["games"].get_games,
+                                [dict(year=yr, season_type=args.season, classification="fbs") for yr in args.year])
 
-    for yr in args.year:
+    for yr, games in zip(args.year, games_by_year):
         print(f"Starting week fetch for {yr} {args.season}")
+        week_of, games_by_week = season_index(games)
         # derive weeks from FBS games for the year unless user provided explicit range
-        games = apis["games"].get_games(year=yr, season_type=args.season, classification="fbs")
-        weeks = sorted({g.week for g in games if getattr(g, 'week', None) is not None})
+        weeks = sorted(games_by_week)
         start = args.start_week or (weeks[0] if weeks else 1)
         end = args.end_week or (weeks[-1] if weeks else start)
-    games_ids = {g.id for g in games}
-    for wk in range(start, end + 1):
-            print(f"  Fetching week {wk} basic stats for {yr} {args.season}")
-            try:
-                basic_recs = apis["games"].get_game_team_stats(year=yr, week=wk)
-                # filter to only FBS games
-                basic_recs = [r for r in basic_recs if getattr(r, 'id', None) in games_ids]
-            except Exception as e:
-                print(f"Failed to fetch basic stats for week {wk}: {e}")
+        games_ids = {g.id for g in games}
+        final_ids = final_game_ids(games)
+        # only refetch weeks whose partitions are missing, incomplete or stale
+        wks = []
+        for wk in range(start, end + 1):
+            if args.force or any(partition_status(ds, yr, args.season, week=wk, max_age=max_age)
+                                 for ds in ("basic", "advanced", "lines")):
+                wks.append(wk)
+            else:
+                print(f"  Week {wk} is complete; skipping")
+        if not wks:
+            compact_season(yr, args.season, games)
+            if args.build:
+                update_products(yr, args.season, games)
+            continue
+
+        # Fetch every week's basic and advanced stats concurrently (results stay in week order)
+        # plus the season's lines in a single call, partitioned by week in memory
+        print(f"  Fetching weeks {wks} basic stats, advanced stats and betting lines for {yr} {args.season}")
+        basic_by_week = fetcher.map(apis["games"].get_game_team_stats,
+                                    [dict(year=yr, week=wk) for wk in wks], return_exceptions=True)
+        adv_by_week = fetcher.map(apis["stats"].get_advanced_game_stats,
+                                  [dict(year=yr, week=wk, season_type=args.season) for wk in wks],
+                                  return_exceptions=True)
+        lines_ok = True
+        try:
+            season_lines = fetcher.call(apis["betting"].get_lines, year=yr, season_type=args.season)
+        except Exception as e:
+            print(f"Failed to fetch betting lines for {yr}: {e}")
+            season_lines, lines_ok = [], False
+        provider_df = provider_rows(season_lines, {g.id for wk in wks for g in games_by_week.get(wk, [])})
+        if not provider_df.empty:
+            # keep every provider's line in the line history
+            append_line_history(provider_df, yr, args.season, start_dates={g.id: g.start_date for g in games})
+        lines_by_week = dict(list(provider_df.groupby(provider_df["game_id"].map(week_of))))
+
+        for wk, basic_recs, adv_recs in zip(wks, basic_by_week, adv_by_week):
+            week_games = games_by_week.get(wk, [])
+            week_final = all(is_final(g) for g in week_games)
+            week_expected = {g.id for g in week_games} & final_ids
+
+            if isinstance(basic_recs, Exception):
+                print(f"Failed to fetch basic stats for week {wk}: {basic_recs}")
                 basic_recs = []
+            # filter to only FBS games
+            basic_recs = [r for r in basic_recs if getattr(r, 'id', None) in games_ids]
 
             basic_df = flatten_basic_team_game_stats(basic_recs)
             basic_wide = pivot_basic(basic_df) if not basic_df.empty else basic_df
             if not basic_wide.empty and {'game_id', 'team'}.issubset(set(basic_wide.columns)):
                 basic_wide = basic_wide.drop_duplicates(subset=['game_id', 'team'], keep='last')
-            basic_out = raw_path(f"basic_{yr}_week{wk}_{args.season}.parquet")
-            save_parquet(basic_wide, basic_out)
+            basic_out = save_partition(basic_wide, "basic", yr, args.season, week=wk,
+                                       expected_ids=week_expected, complete=week_final)
             print(f"  Saved basic week {wk} -> {basic_out} ({len(basic_wide)})")
-            sh_sleep(args.sleep)
-
-            print(f"  Fetching week {wk} advanced stats for {yr} {args.season}")
-            try:
-                adv_recs = apis["stats"].get_advanced_game_stats(year=yr, week=wk, season_type=args.season)
-                adv_recs = [r for r in adv_recs if getattr(r, 'id', None) in games_ids]
-            except Exception as e:
-                print(f"Failed to fetch advanced stats for week {wk}: {e}")
+
+            adv_ok = not isinstance(adv_recs, Exception)
+            if not adv_ok:
+                print(f"Failed to fetch advanced stats for week {wk}: {adv_recs}")
                 adv_recs = []
+            adv_recs = [r for r in adv_recs if getattr(r, 'game_id', None) in games_ids]
 
-            adv_df = flatten_advanced_team_game_stats(adv_recs) if adv_recs else None
-            if adv_df is not None and not adv_df.empty:
-                if {'game_id', 'team'}.issubset(set(adv_df.columns)):
-                    adv_df = adv_df.drop_duplicates(subset=['game_id', 'team'], keep='last')
-                adv_out = raw_path(f"advanced_{yr}_week{wk}_{args.season}.parquet")
-                save_parquet(adv_df, adv_out)
-                print(f"  Saved advanced week {wk} -> {adv_out} ({len(adv_df)})")
+            # a week without advanced stats or lines is still saved (empty) so the manifest
+            # records it and it is not refetched on every run; a failed fetch stays incomplete
+            adv_df = attach_team_ids(flatten_advanced_team_game_stats(adv_recs), games)
+            if not adv_df.empty:
+                adv_df = adv_df.drop_duplicates(subset=['game_id', 'team'], keep='last')
             else:
                 print(f"  No advanced stats for week {wk}")
+            adv_out = save_partition(adv_df, "advanced", yr, args.season, week=wk,
+                                     expected_ids=week_expected, complete=week_final and adv_ok)
+            print(f"  Saved advanced week {wk} -> {adv_out} ({len(adv_df)})")
 
-            sh_sleep(args.sleep)
-
-            # Fetch betting lines for this week (restricted to FBS games for the week)
-            print(f"  Fetching week {wk} betting lines for {yr} {args.season}")
-            try:
-                # prefer an API call that accepts week if available
-                try:
-                    lines_recs = apis["betting"].get_lines(year=yr, week=wk, season_type=args.season)
-                except TypeError:
-                    # fallback to year-level call and filter by week
-                    lines_recs = apis["betting"].get_lines(year=yr, season_type=args.season)
-            except Exception as e:
-                print(f"Failed to fetch betting lines for week {wk}: {e}")
-                lines_recs = []
-
-            # filter to only the FBS games for this week
-            week_game_ids = {g.id for g in games if getattr(g, 'week', None) == wk}
-            filtered = []
-            for l in (lines_recs or []):
-                gid_raw = getattr(l, 'game_id', getattr(l, 'id', None))
-                try:
-                    gid = int(gid_raw) if gid_raw is not None else None
-                except Exception:
-                    gid = None
-                if gid in week_game_ids:
-                    filtered.append((gid, l))
-
-            # Aggregate provider-level lines into a consensus per game (median spread/total)
-            rows = []
-            def _get_attr(o, *keys):
-                # try attribute access then dict-like access for a sequence of possible keys
-                for k in keys:
-                    try:
-                        v = getattr(o, k)
-                    except Exception:
-                        try:
-                            v = o.get(k)
-                        except Exception:
-                            v = None
-                    if v is not None:
-                        return v
-                return None
-
-            for gid, l in filtered:
-                provider_names = []
-                spreads = []
-                totals = []
-                last_updated = None
-
-                # each 'l' may have an outer lines list (books) or be a single line object
-                books = _get_attr(l, 'lines') or []
-                # if outer books list is empty, attempt to treat l itself as a book-like object
-                if not books:
-                    books = [l]
-
-                for bk in (books or []):
-                    prov = _get_attr(bk, 'provider', 'book', 'source')
-                    if prov is not None:
-                        provider_names.append(str(prov))
-
-                    # some providers embed an inner 'lines' list, others are direct line objects
-                    inner = _get_attr(bk, 'lines') or []
-                    if not inner:
-                        inner = [bk]
-
-                    for ln in (inner or []):
-                        # possible keys for spread/total across different shapes
-                        s = _get_attr(ln, 'spread', 'point_spread', 'pointSpread')
-                        t = _get_attr(ln, 'overUnder', 'over_under', 'total')
-                        u = _get_attr(ln, 'last_updated', 'lastUpdated', 'updated')
-                        try:
-                            if s is not None:
-                                spreads.append(float(s))
-                        except Exception:
-                            pass
-                        try:
-                            if t is not None:
-                                totals.append(float(t))
-                        except Exception:
-                            pass
-                        if u is not None:
-                            last_updated = u
-
-                # compute consensus (median) if we have numeric values
-                if spreads or totals or provider_names:
-                    spread_med = float(pd.Series(spreads).median()) if spreads else None
-                    total_med = float(pd.Series(totals).median()) if totals else None
-                    providers_list = ','.join(sorted(set(provider_names))) if provider_names else None
-                    num_providers = len(set(provider_names)) if provider_names else 0
-                    rows.append({
-                        'game_id': gid,
-                        'spread': spread_med,
-                        'total': total_med,
-                        'num_providers': num_providers,
-                        'providers_list': providers_list,
-                        'last_updated': last_updated,
-                        'provider': 'consensus',
-                    })
-
-            if rows:
-                lines_df = pd.DataFrame(rows).drop_duplicates(subset=['game_id'], keep='last')
-                lines_out = raw_path(f"lines_{yr}_week{wk}_{args.season}.parquet")
-                save_parquet(lines_df, lines_out)
-                print(f"  Saved lines week {wk} -> {lines_out} ({len(lines_df)})")
-            else:
+            # aggregate this week's provider lines into a consensus per game (median spread/total)
+            lines_df = consolidate_lines(lines_by_week.get(wk, provider_df.iloc[0:0]))
+            if lines_df.empty:
                 print(f"  No betting lines for week {wk}")
+            lines_out = save_partition(lines_df, "lines", yr, args.season, week=wk,
+                                       complete=week_final and lines_ok)
+            print(f"  Saved lines week {wk} -> {lines_out} ({len(lines_df)})")
+
+        compact_season(yr, args.season, games)
+        if args.build:
+            update_products(yr, args.season, games)
 
 
 if __name__ == "__main__":
@@ -1 +1 @@
-__all__ = ["cfbd_client", "io", "flatten_basic", "flatten_advanced"]
+__all__ = ["cfbd_client", "io", "flatten_basic", "flatten_advanced", "fetch", "cache", "dag", "lines", "loader", "schema", "teams", "build", "export", "features", "ats"]
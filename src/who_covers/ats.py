@@ -0,0 +1,145 @@
+"""Against-the-spread and over/under results, and the ATS cube.
+
+Spreads are the home team's consensus line (negative: home favored), so the
+home side covers when ``point_diff + spread > 0`` and the game goes over when
+the combined score beats ``total``. Both are computed for all games at once.
+
+The cube sums every team's ATS and O/U results per season, week, team,
+conference, side (home/away), role (favorite/underdog/pick) and neutral site.
+``ats_record`` answers a query by masking the cube's cells instead of
+regrouping the games.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from who_covers.io import processed_path, save_parquet
+
+ATS_RESULTS = ["loss", "push", "cover"]
+OU_RESULTS = ["under", "push", "over"]
+CUBE_KEYS = ["season", "week", "team", "conference", "side", "role", "neutral_site"]
+COUNTS = ["games", "cover", "ats_push", "ats_loss", "over", "ou_push", "under"]
+# games_wide columns the ATS stage reads
+GAME_COLUMNS = ["game_id", "season", "week", "home_team_x", "away_team_x", "home_points", "away_points",
+                "home_conference", "away_conference", "neutral_site", "spread", "total"]
+
+
+def _floats(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _result(margin: np.ndarray, names) -> pd.Categorical:
+    """names[0] below zero, names[1] at zero, names[2] above; missing where the margin is NaN."""
+    codes = np.where(np.isnan(margin), -1, np.sign(np.nan_to_num(margin)) + 1).astype("int8")
+    return pd.Categorical.from_codes(codes, categories=names)
+
+
+def add_ats(df: pd.DataFrame) -> pd.DataFrame:
+    """Add ats_margin and home_ats (home side's cover/push/loss), ou_margin and ou_result (over/push/under)."""
+    diff = _floats(df, "home_points") - _floats(df, "away_points")
+    df["ats_margin"] = diff + _floats(df, "spread")
+    df["home_ats"] = _result(df["ats_margin"].to_numpy(), ATS_RESULTS)
+    df["ou_margin"] = _floats(df, "home_points") + _floats(df, "away_points") - _floats(df, "total")
+    df["ou_result"] = _result(df["ou_margin"].to_numpy(), OU_RESULTS)
+    return df
+
+
+def team_ats(games: pd.DataFrame) -> pd.DataFrame:
+    """One row per team per decided game (a spread and both scores): ``CUBE_KEYS`` plus ats and ou results.
+
+    Upcoming games, which already carry a line, are left out.
+    """
+    decided = ~np.isnan(_floats(games, "spread") + _floats(games, "home_points") + _floats(games, "away_points"))
+    games = games[decided]
+    games = add_ats(games.copy())
+    spread = _floats(games, "spread")
+    neutral = games["neutral_site"].fillna(False).astype(bool).to_numpy() if "neutral_site" in games.columns \
+        else np.zeros(len(games), bool)
+    sides = []
+    for side, sign in (("home", 1), ("away", -1)):
+        team = f"{side}_team_x" if f"{side}_team_x" in games.columns else f"{side}_team"
+        line = sign * spread  # the team's own spread
+        sides.append(pd.DataFrame({
+            "game_id": games["game_id"].to_numpy(),
+            "season": games["season"].to_numpy(dtype="int64"), "week": games["week"].to_numpy(dtype="int64"),
+            "team": games[team].astype(str).to_numpy(),
+            "conference": games[f"{side}_conference"].astype(object).to_numpy(),
+            "side": side,
+            "role": np.select([line < 0, line > 0], ["favorite", "underdog"], "pick"),
+            "neutral_site": neutral,
+            "ats": _result(sign * games["ats_margin"].to_numpy(), ATS_RESULTS),
+            "ou": games["ou_result"].array,
+        }))
+    return pd.concat(sides, ignore_index=True)
+
+
+def ats_cube(games: pd.DataFrame) -> pd.DataFrame:
+    """ATS and O/U counts per ``CUBE_KEYS`` cell of a games_wide frame (decided games with a spread only)."""
+    rows = team_ats(games)
+    ats, ou = rows["ats"].cat.codes.to_numpy(), rows["ou"].cat.codes.to_numpy()
+    counts = pd.DataFrame({
+        "games": np.ones(len(rows), "int32"),
+        "cover": ats == 2, "ats_push": ats == 1, "ats_loss": ats == 0,
+        "over": ou == 2, "ou_push": ou == 1, "under": ou == 0,
+    }).astype("int32")
+    keys = rows[CUBE_KEYS].fillna({"conference": ""})
+    cube = counts.groupby([keys[k] for k in CUBE_KEYS], sort=True).sum().reset_index()
+    for col in ("team", "conference", "side", "role"):
+        cube[col] = cube[col].astype("category")
+    return cube
+
+
+def ats_record(cube: pd.DataFrame, team: str = None, since: int = None, until: int = None, **filters) -> pd.Series:
+    """Summed counts of the cube cells that match, with cover_pct and over_pct (pushes excluded).
+
+    ``since``/``until`` bound the season (inclusive); other keyword filters name a
+    ``CUBE_KEYS`` column, e.g. ``side="away", role="underdog"``.
+    """
+    mask = np.ones(len(cube), bool)
+    if team is not None:
+        filters["team"] = team
+    for col, value in filters.items():
+        if col not in CUBE_KEYS:
+            raise ValueError(f"unknown ATS cube dimension {col!r}; expected one of {CUBE_KEYS}")
+        if value is None:
+            continue
+        values = cube[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # compare codes; a value that is not a category matches nothing
+            cats = values.cat.categories
+            mask &= values.cat.codes.to_numpy() == (cats.get_loc(value) if value in cats else -2)
+        else:
+            mask &= values.to_numpy() == value
+    season = cube["season"].to_numpy()
+    if since is not None:
+        mask &= season >= since
+    if until is not None:
+        mask &= season <= until
+    out = {c: int(cube[c].to_numpy()[mask].sum()) for c in COUNTS}
+    decided, ou_decided = out["cover"] + out["ats_loss"], out["over"] + out["under"]
+    out["cover_pct"] = out["cover"] / decided if decided else np.nan
+    out["over_pct"] = out["over"] / ou_decided if ou_decided else np.nan
+    return pd.Series(out)
+
+
+def cube_path(season: str) -> Path:
+    return processed_path(f"ats_cube_{season}.parquet")
+
+
+def update_cube(games: pd.DataFrame, season: str) -> pd.DataFrame:
+    """Replace the cube cells of the seasons in ``games`` in the stored cube; returns the whole cube."""
+    path = cube_path(season)
+    fresh = ats_cube(games)
+    if path.exists():
+        old = pd.read_parquet(path)
+        old = old[~old["season"].isin(games["season"].astype("int64").unique())]
+        frames = [f.astype({c: object for c in ("team", "conference", "side", "role")})
+                  for f in (old, fresh) if not f.empty]
+        if frames:
+            fresh = pd.concat(frames, ignore_index=True).sort_values(CUBE_KEYS, kind="mergesort")
+            fresh = fresh.reset_index(drop=True).astype({c: "category" for c in ("team", "conference", "side", "role")})
+    save_parquet(fresh, path)
+    return fresh
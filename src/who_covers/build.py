@@ -0,0 +1,321 @@
+"""One build engine for the per-season processed products.
+
+A ``SeasonBuild`` reads a season's raw games/basic/advanced/lines files once and
+materializes the shared team-game frame (basic and advanced stats outer-joined
+on game and team) once. The products are projections of it:
+
+- ``team_level()``: one row per team per game, with game metadata and lines;
+- ``game_level()``: one row per game with home_/away_ team stats;
+- ``wide()``: the games_wide layout built by ``build_dataset``.
+
+``materialize`` keeps a stored product current incrementally: only games whose
+raw rows changed since the product was last built are recomputed and upserted.
+"""
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from who_covers.io import PROCESSED, raw_path
+
+INPUTS = ("games", "basic", "advanced", "lines")
+BUILD_STATE = PROCESSED / "_state"  # per-game input hashes of each product's last build
+# bump when a projection's output changes (new columns, new rules) so stored products are rebuilt
+BUILD_VERSION = 3
+STATE_KEY = b"who_covers.build"
+# each stats table's own team name in the shared team frame
+NAME_COLUMNS = ("team_basic", "team_adv")
+# consensus fields taken from the lines table
+LINE_COLUMNS = ["game_id", "spread", "total", "num_providers", "providers_list", "last_updated", "provider"]
+WIDE_BASE_COLUMNS = [
+    "game_id", "season", "season_type", "week", "start_date",
+    "home_team", "away_team", "home_points", "away_points",
+    "home_conference", "away_conference", "conference_game", "neutral_site", "venue",
+    "home_team_id", "away_team_id",
+]
+
+
+def load_inputs(year: int, season: str) -> dict:
+    """The season's raw frames by name; None for a file that does not exist."""
+    out = {}
+    for name in INPUTS:
+        path = raw_path(f"{name}_{year}_{season}.parquet")
+        out[name] = pd.read_parquet(path) if path.exists() else None
+    return out
+
+
+def select_lines(lines: pd.DataFrame) -> pd.DataFrame:
+    keep = [c for c in LINE_COLUMNS if c in lines.columns]
+    return lines[keep] if keep else lines
+
+
+def team_sides(games: pd.DataFrame, key: str = "team") -> pd.Series:
+    """(game_id, <key>) index -> "home"/"away" for both teams of each game."""
+    n = len(games)
+    idx = pd.MultiIndex.from_arrays([
+        np.concatenate([games["game_id"].to_numpy()] * 2),
+        pd.concat([games[f"home_{key}"], games[f"away_{key}"]], ignore_index=True),
+    ], names=["game_id", key])
+    sides = pd.Series(np.repeat(np.array(["home", "away"], dtype=object), n), index=idx)
+    # a team listed on both sides of a game resolves to "away"
+    return sides[~idx.duplicated(keep="last")]
+
+
+def tag_side(df: pd.DataFrame, sides: pd.Series, key: str = "team") -> pd.DataFrame:
+    """``df`` with a ``side`` column looked up by (game_id, key); None when the team is not in the game."""
+    pos = sides.index.get_indexer(pd.MultiIndex.from_arrays([df["game_id"], df[key]]))
+    # position -1 (no match) picks the trailing None
+    return df.assign(side=np.append(sides.to_numpy(), None)[pos])
+
+
+def side_columns(team: pd.DataFrame, side: str, columns) -> pd.DataFrame:
+    """The ``side`` rows of ``team`` as game_id plus ``<side>_<name>`` for each (column, name) pair."""
+    sub = team[team["side"] == side]
+    return pd.DataFrame({"game_id": sub["game_id"], **{f"{side}_{name}": sub[col] for col, name in columns}})
+
+
+class SeasonBuild:
+    """Raw inputs and the shared team-game frame of one season, each computed once."""
+
+    def __init__(self, year: int, season: str, inputs: dict = None):
+        self.year = year
+        self.season = season
+        self.inputs = load_inputs(year, season) if inputs is None else inputs
+
+    def subset(self, game_ids) -> "SeasonBuild":
+        """A build over only the rows of ``game_ids`` in every input."""
+        ids = list(game_ids)
+        inputs = {name: None if df is None else df[df["game_id"].isin(ids)] for name, df in self.inputs.items()}
+        return SeasonBuild(self.year, self.season, inputs)
+
+    def _require(self, *names):
+        missing = [n for n in names if self.inputs.get(n) is None]
+        if missing:
+            raise FileNotFoundError(f"no raw {', '.join(missing)} for {self.year} {self.season}")
+
+    @cached_property
+    def key(self) -> str:
+        """Team join key: integer ``team_id`` when games and every stats table carry it."""
+        games = self.inputs.get("games")
+        stats = [df for df in (self.inputs.get("basic"), self.inputs.get("advanced")) if df is not None]
+        if games is not None and "home_team_id" in games.columns and all("team_id" in df for df in stats):
+            return "team_id"
+        return "team"
+
+    @cached_property
+    def team(self):
+        """Basic and advanced stats outer-joined on (game_id, key), tagged with ``side``.
+
+        The advanced table's own team name is kept as ``team_adv``; when the key is
+        the name, the basic table's is also kept as ``team_basic``, so a team found
+        in only one table does not name the other table's row.
+        None when the season has neither stats table.
+        """
+        basic, adv = self.inputs.get("basic"), self.inputs.get("advanced")
+        if basic is None and adv is None:
+            return None
+        if basic is None or adv is None:
+            team = (adv if basic is None else basic).copy()
+        else:
+            if self.key == "team":
+                basic, adv = basic.assign(team_basic=basic["team"]), adv.assign(team_adv=adv["team"])
+            team = basic.merge(adv, on=["game_id", self.key], how="outer", suffixes=("", "_adv"))
+        games = self.inputs.get("games")
+        if games is not None and self.key in team.columns:
+            team = tag_side(team, team_sides(games, self.key), self.key)
+        return team
+
+    def _stat_columns(self, name: str) -> list:
+        """(team-frame column, raw column) for the stats that came from raw table ``name``."""
+        cols = [c for c in self.inputs[name].columns if c not in ("game_id", "team", "team_id")]
+        if name == "advanced":
+            return [(f"{c}_adv" if f"{c}_adv" in self.team.columns else c, c) for c in cols]
+        return [(c, c) for c in cols]
+
+    def _with_lines(self, df: pd.DataFrame) -> pd.DataFrame:
+        lines = self.inputs.get("lines")
+        if lines is None or lines.empty:
+            return df
+        return df.merge(select_lines(lines), on="game_id", how="left", suffixes=(None, "_line"))
+
+    @staticmethod
+    def _front(df: pd.DataFrame, front) -> pd.DataFrame:
+        first = [c for c in front if c in df.columns]
+        return df[first + [c for c in df.columns if c not in first]]
+
+    def team_level(self) -> pd.DataFrame:
+        """One row per (game, team) with game metadata and consensus lines.
+
+        Without stats tables this is the games (or lines) table with lines attached.
+        """
+        games, lines = self.inputs.get("games"), self.inputs.get("lines")
+        if self.team is None:
+            if games is None:
+                merged = select_lines(lines) if lines is not None else pd.DataFrame()
+            else:
+                merged = self._with_lines(games)
+        else:
+            merged = self.team.drop(columns=["side", *NAME_COLUMNS], errors="ignore")
+            if games is not None:
+                merged = merged.merge(games, on="game_id", how="left", suffixes=(None, "_game"))
+            if lines is not None:
+                merged = merged.merge(select_lines(lines), on="game_id", how="left", suffixes=(None, "_line"))
+        return self._front(merged, ("game_id", "team", "home_team", "away_team"))
+
+    def game_level(self) -> pd.DataFrame:
+        """One row per game: the games table plus home_/away_ stats and lines."""
+        self._require("games")
+        merged = self.inputs["games"].copy()
+        merged["game_id"] = merged["game_id"].astype(int)
+        team = self.team
+        if team is not None and not team.empty and "side" in team.columns:
+            stats = [(c, c) for c in team.columns
+                     if c not in ("game_id", "team", "team_id", "side", *NAME_COLUMNS)]
+            for side in ("home", "away"):
+                merged = merged.merge(side_columns(team, side, stats), on="game_id", how="left")
+        return self._front(self._with_lines(merged), ("game_id", "home_team", "away_team"))
+
+    def wide(self, with_lines: bool = False) -> pd.DataFrame:
+        """The games_wide frame: game metadata, then each side's basic and advanced stats.
+
+        Both sides come from the shared team frame and are joined once. Column
+        names and order are the historical ones: the games table's names become
+        home_team_x/away_team_x, the basic table's home_team_y/away_team_y and
+        the advanced table's home_team/away_team.
+        """
+        self._require("games", "basic", "advanced")
+        games, team = self.inputs["games"], self.team
+        basic_team = "team_basic" if "team_basic" in team.columns else "team"
+        adv_team = "team_adv" if "team_adv" in team.columns else "team"
+        parts = {
+            "basic": [(basic_team, "team_y")] + self._stat_columns("basic"),
+            "advanced": [(adv_team, "team")] + self._stat_columns("advanced"),
+        }
+        # one frame per side with both tables' stats, then a single join of the two sides
+        home, away = (side_columns(team, side, parts["basic"] + parts["advanced"]) for side in ("home", "away"))
+        stats = home.merge(away, on="game_id", how="outer")
+
+        base = games[[c for c in WIDE_BASE_COLUMNS if c in games.columns]] \
+            .rename(columns={"home_team": "home_team_x", "away_team": "away_team_x"})
+        df = base.merge(stats, on="game_id", how="left")
+        order = list(base.columns)
+        for name in ("basic", "advanced"):
+            for side in ("home", "away"):
+                order += [f"{side}_{out}" for _, out in parts[name]]
+        df = df[order]
+
+        if with_lines and self.inputs.get("lines") is not None:
+            df = df.merge(self.inputs["lines"][["game_id", "spread", "total"]], on="game_id", how="left")
+        return df
+
+
+# --- incremental materialization ---------------------------------------------
+
+def game_digests(inputs: dict) -> pd.DataFrame:
+    """One row per game_id with a hash of its rows in each raw input (0 when it has none).
+
+    Row hashes are summed per game, so the digest does not depend on row order.
+    """
+    cols = {}
+    for name, df in inputs.items():
+        if df is None or df.empty or "game_id" not in df.columns:
+            continue
+        rows = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df["game_id"].to_numpy())
+        cols[name] = rows.groupby(level=0).sum()
+    out = pd.DataFrame(cols).fillna(0).astype("uint64")
+    out.index.name = "game_id"
+    return out.reset_index()
+
+
+def changed_games(digests: pd.DataFrame, previous: pd.DataFrame) -> set:
+    """game_ids that are new, were removed, or whose rows changed in any input."""
+    cols = sorted((set(digests.columns) | set(previous.columns)) - {"game_id"})
+    now = digests.set_index("game_id").reindex(columns=cols, fill_value=0)
+    prev = previous.set_index("game_id").reindex(columns=cols, fill_value=0)
+    ids = now.index.union(prev.index)
+    now, prev = now.reindex(ids, fill_value=0), prev.reindex(ids, fill_value=0)
+    return set(ids[(now != prev).any(axis=1)].astype(int))
+
+
+def _state_path(path: Path) -> Path:
+    return BUILD_STATE / f"{Path(path).stem}.parquet"
+
+
+def fingerprint(params: str = "") -> bytes:
+    """What a product's rows depend on besides its inputs: ``BUILD_VERSION`` and the build ``params``."""
+    return f"v{BUILD_VERSION} {params}".strip().encode()
+
+
+def record_build(path: Path, digests: pd.DataFrame, params: str = ""):
+    """Remember the input digests (and build ``params``) the product at ``path`` was just built from."""
+    BUILD_STATE.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(digests, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), STATE_KEY: fingerprint(params)})
+    pq.write_table(table, _state_path(path))
+
+
+def last_build(path: Path, params: str = ""):
+    """Input digests the product at ``path`` was last built from.
+
+    None if never recorded, or if it was built with other ``params`` or by
+    another ``BUILD_VERSION``: the stored rows cannot be upserted then.
+    """
+    state = _state_path(path)
+    if not state.exists():
+        return None
+    table = pq.read_table(state)
+    if (table.schema.metadata or {}).get(STATE_KEY) != fingerprint(params):
+        return None
+    return table.to_pandas()
+
+
+def order_rows(df: pd.DataFrame, build: SeasonBuild, order) -> pd.DataFrame:
+    """Rows in full-build order: ``"games"`` follows the games table, a list sorts by those columns."""
+    if order == "games":
+        rank = pd.Index(build.inputs["games"]["game_id"]).get_indexer(df["game_id"])
+        return df.iloc[np.argsort(rank, kind="stable")].reset_index(drop=True)
+    return df.sort_values(list(order), kind="mergesort").reset_index(drop=True)
+
+
+def materialize(build: SeasonBuild, path: Path, project, save, finalize=None, order="games", full: bool = False,
+                params: str = ""):
+    """Bring the product stored at ``path`` up to date with the season's raw inputs.
+
+    ``project(build)`` computes the product's rows for a build (full or subset),
+    ``finalize(frame)`` is applied to the whole product (e.g. dtypes) and
+    ``save(frame, changed)`` writes it. When the product and its last build state
+    exist, only the games whose raw rows changed are recomputed and upserted;
+    otherwise, with ``full``, or if the recomputed rows bring a different column
+    set, the season is rebuilt in full (``changed`` is then None). Returns
+    ``(frame, changed)``; nothing is written when no game changed.
+
+    ``params`` names the build options the projection depends on (e.g. lines
+    or not); a product built with other params, or by an older
+    ``BUILD_VERSION``, is rebuilt in full.
+    """
+    path = Path(path)
+    digests = game_digests(build.inputs)
+    frame = changed = None
+    previous = None if full or not path.exists() else last_build(path, params)
+    if previous is not None:
+        changed = changed_games(digests, previous)
+        existing = pd.read_parquet(path)
+        if not changed:
+            return existing, changed
+        part = project(build.subset(changed))
+        if set(part.columns) == set(existing.columns):
+            kept = existing[~existing["game_id"].isin(changed)]
+            frames = [f for f in (kept, part[list(existing.columns)]) if not f.empty]
+            frame = order_rows(pd.concat(frames, ignore_index=True) if frames else existing.iloc[0:0], build, order)
+        else:
+            changed = None
+    if frame is None:
+        frame = project(build)
+    if finalize is not None:
+        frame = finalize(frame)
+    save(frame, changed)
+    record_build(path, digests, params)
+    return frame, changed
@@ -0,0 +1,125 @@
+"""On-disk response cache for the CFBD API objects returned by ``get_apis``.
+
+Responses are keyed by endpoint + call parameters and stored as gzipped JSON.
+A season's responses stop changing once it is over, so an entry fetched after
+``season_end`` is cached forever; any other entry is refetched once it is older
+than ``ttl`` seconds. In offline mode only the cache is consulted and a miss
+raises ``CacheMiss``.
+"""
+import datetime as dt
+import functools
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from who_covers.io import CACHE
+
+DEFAULT_TTL = 6 * 3600
+
+
+class CacheMiss(RuntimeError):
+    """Raised in offline mode when a call has no cached response."""
+
+
+def current_season(today: dt.date = None) -> int:
+    # The season kicks off in late August; January bowl games belong to the previous season
+    today = today or dt.date.today()
+    return today.year if today.month >= 8 else today.year - 1
+
+
+def season_end(year: int) -> dt.datetime:
+    # after the January bowls and the championship game
+    return dt.datetime(int(year) + 1, 2, 1, tzinfo=dt.timezone.utc)
+
+
+def _json_default(o):
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    if hasattr(o, "value"):  # enums such as SeasonType
+        return o.value
+    return str(o)
+
+
+def _encode(result):
+    items = result if isinstance(result, list) else [result]
+    model = None
+    if items and hasattr(items[0], "to_dict"):
+        cls = type(items[0])
+        model = f"{cls.__module__}:{cls.__qualname__}"
+        items = [i.to_dict() for i in items]
+    return {"model": model, "is_list": isinstance(result, list), "items": items}
+
+
+def _decode(payload):
+    items = payload["items"]
+    if payload["model"]:
+        mod, name = payload["model"].split(":")
+        cls = getattr(importlib.import_module(mod), name)
+        items = [cls.from_dict(i) for i in items]
+    return items if payload["is_list"] else items[0]
+
+
+class CachedApi:
+    """Proxy around a cfbd API object that caches every public method call."""
+
+    def __init__(self, api, name: str, cache_dir: Path = CACHE / "api", ttl: float = DEFAULT_TTL,
+                 offline: bool = False):
+        self._api = api
+        self._name = name
+        self._dir = Path(cache_dir) / name
+        self._ttl = ttl
+        self._offline = offline
+
+    def __getattr__(self, attr):
+        target = getattr(self._api, attr)
+        if attr.startswith("_") or not callable(target):
+            return target
+
+        @functools.wraps(target)
+        def cached(**params):
+            return self._call(attr, target, params)
+
+        return cached
+
+    def _path(self, method: str, params: dict) -> Path:
+        key = json.dumps(params, sort_keys=True, default=_json_default)
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self._dir / method / f"{digest}.json.gz"
+
+    def _fresh(self, payload: dict, params: dict) -> bool:
+        year = params.get("year")
+        if year is not None and payload["fetched_at"] >= season_end(year).timestamp():
+            return True
+        if self._ttl is None:
+            return True
+        return time.time() - payload["fetched_at"] < self._ttl
+
+    def _call(self, method: str, target, params: dict):
+        path = self._path(method, params)
+        payload = None
+        if path.exists():
+            with gzip.open(path, "rt") as fh:
+                payload = json.load(fh)
+            if self._offline or self._fresh(payload, params):
+                return _decode(payload["response"])
+        if self._offline:
+            raise CacheMiss(f"no cached response for {self._name}.{method}({params})")
+
+        result = target(**params)
+        payload = {
+            "endpoint": f"{self._name}.{method}",
+            "params": params,
+            "fetched_at": time.time(),
+            "response": _encode(result),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wt") as fh:
+            json.dump(payload, fh, default=_json_default)
+        os.replace(tmp, path)
+        return result
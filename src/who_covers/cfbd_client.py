@@ -2,6 +2,8 @@ import os
 import cfbd
 from cfbd import Configuration, ApiClient
 
+from who_covers.cache import CachedApi, DEFAULT_TTL
+
 def make_client():
     api_key = os.getenv("CFBD_API_KEY")
     if not api_key:
@@ -11,11 +13,33 @@ def make_client():
     )
     return ApiClient(cfg)
 
-def get_apis(client=None):
+def get_apis(client=None, cache=False, offline=False, ttl=DEFAULT_TTL):
+    """Return the CFBD API objects, optionally behind the on-disk response cache.
+
+    ``offline`` implies ``cache`` and never needs an API key or network access.
+    """
+    if offline:
+        cache = True
+        client = client or ApiClient(Configuration())
     client = client or make_client()
-    return dict(
+    apis = dict(
         games=cfbd.GamesApi(client),
         stats=cfbd.StatsApi(client),
         betting=cfbd.BettingApi(client),
         teams=cfbd.TeamsApi(client),
     )
+    if cache:
+        apis = {name: CachedApi(api, name, ttl=ttl, offline=offline) for name, api in apis.items()}
+    return apis
+
+def add_cache_args(ap):
+    ap.add_argument("--no-cache", dest="cache", action="store_false",
+                    help="bypass the on-disk API response cache")
+    ap.add_argument("--offline", action="store_true",
+                    help="serve API responses from the cache only; fail on a cache miss")
+    ap.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600,
+                    help="hours before cached current-season responses are refetched")
+    return ap
+
+def apis_from_args(args):
+    return get_apis(cache=args.cache, offline=args.offline, ttl=args.cache_ttl * 3600)
@@ -0,0 +1,56 @@
+"""Minimal in-process task graph used by the backfill orchestrator.
+
+Each task is a callable that receives the results of its dependencies as
+positional arguments, in the order the dependencies were declared. Independent
+tasks run concurrently on a thread pool; a failed task marks everything
+downstream of it as skipped instead of aborting the graph.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TaskGraph:
+    def __init__(self):
+        self._tasks = {}
+
+    def add(self, name: str, fn, deps=()):
+        missing = [d for d in deps if d not in self._tasks]
+        if missing:
+            raise ValueError(f"task {name!r} depends on unknown task(s) {missing}")
+        self._tasks[name] = (fn, tuple(deps))
+        return self
+
+    def run(self, max_workers: int = 4) -> dict:
+        """Run every task; return ``results``, ``errors``, ``skipped`` and per-task ``timings``."""
+        results, errors, timings = {}, {}, {}
+        skipped = []
+        pending = dict(self._tasks)
+        running = {}
+
+        def timed(name, fn, args):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timings[name] = time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for name, (fn, deps) in list(pending.items()):
+                    if any(d in errors or d in skipped for d in deps):
+                        skipped.append(name)
+                        del pending[name]
+                    elif all(d in results for d in deps):
+                        args = [results[d] for d in deps]
+                        running[pool.submit(timed, name, fn, args)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        results[name] = fut.result()
+                    except Exception as e:
+                        errors[name] = e
+        return {"results": results, "errors": errors, "skipped": skipped, "timings": timings}
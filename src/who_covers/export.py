@@ -0,0 +1,104 @@
+"""Export processed frames in several formats through Arrow.
+
+The frame is converted to an Arrow table once and then written in each
+requested format:
+
+- ``parquet``: zstd-compressed Parquet with bounded row groups;
+- ``csv`` / ``csv.gz`` / ``csv.zst``: CSV encoded in row chunks on a thread
+  pool (pyarrow's CSV writer releases the GIL), each chunk compressed as its
+  own gzip member / zstd frame, so the file is still one valid stream;
+- ``arrow``: an uncompressed Arrow IPC file that can be memory-mapped.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+FORMATS = ("parquet", "csv", "csv.gz", "csv.zst", "arrow")
+CSV_CODECS = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+ROW_GROUP_ROWS = 64_000
+MIN_CHUNK_ROWS = 128
+
+
+def to_table(df: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _replace(path: Path, write):
+    """Write through a temporary file so readers never see a partial export."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def write_parquet(table: pa.Table, path: Path, level: int = None, row_group_size: int = ROW_GROUP_ROWS):
+    return _replace(path, lambda tmp: pq.write_table(table, tmp, compression="zstd", compression_level=level,
+                                                     row_group_size=row_group_size))
+
+
+def write_csv(table: pa.Table, path: Path, compression: str = None, level: int = None, threads: int = None,
+              chunk_rows: int = None):
+    """CSV with a header, optionally gzip/zstd compressed at ``level``.
+
+    By default rows are split into a few chunks per thread (at least ``MIN_CHUNK_ROWS`` each).
+    """
+    # string dictionaries are written as their values
+    table = table.cast(pa.schema([f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                                  for f in table.schema]))
+    if chunk_rows is None:
+        workers = threads or os.cpu_count() or 1
+        chunk_rows = max(MIN_CHUNK_ROWS, -(-table.num_rows // (4 * workers)))
+    starts = range(0, max(table.num_rows, 1), chunk_rows)
+
+    def encode(start):
+        buf = pa.BufferOutputStream()
+        pacsv.write_csv(table.slice(start, chunk_rows), buf,
+                        pacsv.WriteOptions(include_header=start == 0))
+        data = buf.getvalue()
+        if compression is None:
+            return data.to_pybytes()
+        # codecs keep stream state, so each chunk gets its own
+        return pa.Codec(compression, compression_level=level).compress(data, asbytes=True)
+
+    def write(tmp):
+        with ThreadPoolExecutor(threads) as pool, open(tmp, "wb") as fh:
+            for block in pool.map(encode, starts):
+                fh.write(block)
+
+    return _replace(path, write)
+
+
+def write_ipc(table: pa.Table, path: Path):
+    def write(tmp):
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    return _replace(path, write)
+
+
+def export(df: pd.DataFrame, stem: Path, formats=("parquet",), level: int = None, threads: int = None,
+           row_group_size: int = ROW_GROUP_ROWS) -> dict:
+    """Write ``df`` as ``<stem>.<format>`` for each format; returns {format: path}.
+
+    ``level`` is the compression level of the zstd/gzip formats (codec default if None).
+    """
+    stem = Path(stem)
+    table = to_table(df)
+    out = {}
+    for fmt in formats:
+        path = stem.with_name(f"{stem.name}.{fmt}")
+        if fmt == "parquet":
+            out[fmt] = write_parquet(table, path, level, row_group_size)
+        elif fmt in CSV_CODECS:
+            out[fmt] = write_csv(table, path, CSV_CODECS[fmt], level, threads)
+        elif fmt == "arrow":
+            out[fmt] = write_ipc(table, path)
+        else:
+            raise ValueError(f"unknown export format {fmt!r}; expected one of {FORMATS}")
+    return out
@@ -0,0 +1,209 @@
+"""Pre-game team form: rolling, exponentially weighted and season-to-date stats.
+
+Every team-game row gets, for each stat, the mean of the team's previous
+``WINDOWS`` games, an EWMA (half-life ``HALFLIFE`` games) and the season-to-date
+mean, all over games strictly before the row's game, so a row never sees its
+own box score. Form restarts each season; a postseason's form counts the same
+year's regular-season games (``history``) as earlier games.
+
+All teams and seasons are computed in one pass: rows are sorted by (team,
+season, kickoff) and every window, the EWMA included, is a difference of
+column-wise (weighted) cumulative sums. ``update_form`` keeps the stored ``team_form_<year>_<season>.parquet``
+files current: only the team-seasons with a new or changed game are recomputed.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from who_covers.build import LINE_COLUMNS, WIDE_BASE_COLUMNS, changed_games, game_digests, last_build, \
+    record_build
+from who_covers.io import processed_path, save_parquet
+
+WINDOWS = (3, 5)
+HALFLIFE = 3
+FORM_PARAMS = f"form windows={WINDOWS} halflife={HALFLIFE}"
+ORDER = ["start_date", "week", "game_id"]  # kickoff order within a team-season
+TEAM_COLUMNS = ["game_id", "season", "season_type", "week", "start_date", "team", "team_id", "side", "opponent"]
+# side fields of the wide layout that are not stats
+SIDE_FIELDS = {"team", "team_x", "team_y", "team_id", "team_conference", "conference", "points"}
+
+
+def form_key(df: pd.DataFrame) -> str:
+    """Integer ``team_id`` when every row carries one, else the team name."""
+    return "team_id" if "team_id" in df.columns and df["team_id"].notna().all() else "team"
+
+
+def team_games(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per team per game: ``TEAM_COLUMNS``, points_for/against, margin and float stats.
+
+    ``df`` is a games_wide frame (home_/away_ stats) or a team-level frame from
+    ``yearly_summary`` (one row per team).
+    """
+    if "home_team_x" in df.columns:
+        stats = [c[5:] for c in df.columns if c.startswith("home_") and c[5:] not in SIDE_FIELDS
+                 and f"away_{c[5:]}" in df.columns and pd.api.types.is_numeric_dtype(df[c])]
+        sides = []
+        for side, other in (("home", "away"), ("away", "home")):
+            sides.append(pd.DataFrame({
+                **{c: df[c] for c in TEAM_COLUMNS if c in df.columns},
+                "team": df[f"{side}_team_x"], "team_id": df.get(f"{side}_team_id"), "side": side,
+                "opponent": df[f"{other}_team_x"],
+                "points_for": df[f"{side}_points"], "points_against": df[f"{other}_points"],
+                **{s: df[f"{side}_{s}"] for s in stats},
+            }))
+        out = pd.concat(sides).sort_index(kind="stable").reset_index(drop=True)
+    else:
+        key = form_key(df)
+        home = (df[key] == df[f"home_{key}"]).to_numpy()
+        meta = set(WIDE_BASE_COLUMNS) | set(LINE_COLUMNS) | {"team_id", "team_id_adv"}
+        stats = [c for c in df.columns if c not in meta and pd.api.types.is_numeric_dtype(df[c])]
+        out = pd.DataFrame({
+            **{c: df[c] for c in TEAM_COLUMNS if c in df.columns},
+            "side": np.where(home, "home", "away"),
+            "opponent": np.where(home, df["away_team"], df["home_team"]),
+            "points_for": np.where(home, df["home_points"], df["away_points"]),
+            "points_against": np.where(home, df["away_points"], df["home_points"]),
+            **{s: df[s] for s in stats},
+        }).reset_index(drop=True)
+    if "team_id" in out.columns:
+        out["team_id"] = out["team_id"].astype("Int32")
+    stats = stat_columns(out)
+    out[stats] = out[stats].astype("float64")
+    out["margin"] = out["points_for"] - out["points_against"]
+    return out
+
+
+def stat_columns(df: pd.DataFrame) -> list:
+    """The per-game stat columns of a ``team_games`` frame."""
+    return [c for c in df.columns if c not in TEAM_COLUMNS and pd.api.types.is_numeric_dtype(df[c])
+            and not pd.api.types.is_bool_dtype(df[c])]
+
+
+def form(teams: pd.DataFrame, windows=WINDOWS, halflife: float = HALFLIFE) -> pd.DataFrame:
+    """Pre-game form of every row of a ``team_games`` frame.
+
+    Returns the identifying columns, ``games_before`` (the team's earlier games
+    this season) and, per stat, ``<stat>_last<N>``, ``<stat>_ewm`` and
+    ``<stat>_season`` as float32; NaN where no earlier game has the stat.
+    Stats without any value are skipped.
+    Rows are sorted by team, season and kickoff.
+    """
+    key = form_key(teams)
+    stats = [s for s in stat_columns(teams) if teams[s].notna().any()]
+    order = [c for c in ORDER if c in teams.columns]
+    df = teams.sort_values([key, "season"] + order, kind="mergesort").reset_index(drop=True)
+
+    n = len(df)
+    pos = np.arange(n)
+    group = df.groupby([key, "season"], sort=False).ngroup().to_numpy()
+    first = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    start = pos if n == 0 else first[np.searchsorted(first, pos, side="right") - 1]
+
+    x = df[stats].to_numpy(dtype="float64", na_value=np.nan)
+    seen = ~np.isnan(x)
+    x = np.where(seen, x, 0.0)
+    # EWMA weights grow by 1/decay per game into the season; they cancel in the ratio
+    weight = (0.5 ** (-1 / halflife)) ** (pos - start)[:, None]
+
+    def cumulative(a):
+        # row i holds the sum over rows < i, so rows [lo, pos) sum to c[pos] - c[lo]
+        return np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+
+    sums, counts = cumulative(x), cumulative(seen.astype("float64"))
+    wsums, wcounts = cumulative(x * weight), cumulative(seen * weight)
+
+    def prior_mean(lo, total=sums, k=counts):
+        total, k = total[pos] - total[lo], k[pos] - k[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(k > 0, total / k, np.nan)
+
+    blocks = {f"last{w}": prior_mean(np.maximum(start, pos - w)) for w in windows}
+    blocks["ewm"] = prior_mean(start, wsums, wcounts)
+    blocks["season"] = prior_mean(start)
+
+    ids = df[[c for c in TEAM_COLUMNS if c in df.columns]]
+    names = [f"{s}_{suffix}" for suffix in blocks for s in stats]
+    values = np.hstack(list(blocks.values())).astype("float32") if blocks else np.empty((n, 0), "float32")
+    feats = pd.DataFrame(values, columns=names)
+    return pd.concat([ids, pd.DataFrame({"games_before": pos - start}), feats], axis=1)
+
+
+def season_columns(frame: pd.DataFrame, rows: pd.DataFrame) -> list:
+    """``frame``'s identifying columns and the features of the stats that ``rows`` has values for."""
+    stats = {s for s in stat_columns(rows) if rows[s].notna().any()}
+    return [c for c in frame.columns if c in TEAM_COLUMNS or c == "games_before" or c.rsplit("_", 1)[0] in stats]
+
+
+def form_path(year: int, season: str) -> Path:
+    return processed_path(f"team_form_{year}_{season}.parquet")
+
+
+def _own_columns(rows: pd.DataFrame) -> pd.DataFrame:
+    # the season's own columns, so digests do not depend on which seasons were loaded with it
+    return rows[sorted(rows.columns[rows.notna().any()])]
+
+
+def update_form(teams: pd.DataFrame, season: str, full: bool = False, history: pd.DataFrame = None) -> dict:
+    """Bring the stored form of every season in a ``team_games`` frame up to date.
+
+    Per season, only the teams with a game that is new, removed or changed since
+    the last update are recomputed and upserted (all teams with ``full`` or when
+    the season has no stored form). One ``form`` pass covers all seasons.
+    ``history`` is a ``team_games`` frame of earlier games of the same seasons,
+    e.g. the regular season of a postseason: they count as prior games (and a
+    change to them updates the form) but get no form rows of their own.
+    Returns {year: teams recomputed, or None for a full season}.
+    """
+    key = form_key(teams)
+    history = teams.iloc[0:0] if history is None else history[~history["game_id"].isin(teams["game_id"])]
+    plan = {}
+    for year, rows in teams.groupby("season", sort=True):
+        year, path = int(year), form_path(int(year), season)
+        before = history[history["season"] == year]
+        digests = game_digests({"teams": _own_columns(rows), "history": _own_columns(before)})
+        previous = None if full or not path.exists() else last_build(path, FORM_PARAMS)
+        if previous is None:
+            plan[year] = (rows, before, None, None, digests)
+            continue
+        changed = changed_games(digests, previous)
+        if not changed:
+            print(f"{year} {season} form: up to date")
+            continue
+        existing = pd.read_parquet(path)
+        teams_hit = set(rows.loc[rows["game_id"].isin(changed), key]) | \
+            set(before.loc[before["game_id"].isin(changed), key]) | \
+            set(existing.loc[existing["game_id"].isin(changed), key])
+        plan[year] = (rows[rows[key].isin(teams_hit)], before[before[key].isin(teams_hit)], existing, teams_hit,
+                      digests)
+    if not plan:
+        return {}
+
+    fresh = form(pd.concat([f for rows, before, *_ in plan.values() for f in (rows, before) if not f.empty],
+                           ignore_index=True))
+    fresh = fresh[fresh["game_id"].isin(teams["game_id"])].reset_index(drop=True)
+    done = {}
+    for year, (_, _, existing, teams_hit, digests) in plan.items():
+        # seasons differ in their stat columns; each file keeps its own
+        season_rows = teams[teams["season"] == year]
+        cols = season_columns(fresh, season_rows)
+        part = fresh.loc[fresh["season"] == year, cols]
+        if existing is not None and set(part.columns) == set(existing.columns):
+            kept, part = existing[~existing[key].isin(teams_hit)], part[list(existing.columns)]
+            order = [key, "season"] + [c for c in ORDER if c in part.columns]
+            part = pd.concat([f for f in (kept, part) if not f.empty], ignore_index=True) \
+                .sort_values(order, kind="mergesort").reset_index(drop=True)
+        elif existing is not None:
+            # a stat appeared or disappeared: rebuild the whole season
+            season_history = history[history["season"] == year]
+            part = form(pd.concat([f for f in (season_rows, season_history) if not f.empty], ignore_index=True))
+            part = part.loc[part["game_id"].isin(season_rows["game_id"]), season_columns(part, season_rows)] \
+                .reset_index(drop=True)
+            teams_hit = None
+        path = form_path(year, season)
+        save_parquet(part, path)
+        record_build(path, digests, FORM_PARAMS)
+        done[year] = None if teams_hit is None else len(teams_hit)
+        print(f"{year} {season} form: " + ("rebuilt" if teams_hit is None else f"{len(teams_hit)} teams updated")
+              + f" -> {path} ({len(part)} rows)")
+    return done
@@ -1,32 +1,102 @@
-import pandas as pd
-
-def _flatten_ns(obj, ns: str, row: dict):
-    if not obj:
-        return
-    d = obj.to_dict() if hasattr(obj, "to_dict") else {}
-    for k, v in d.items():
-        if isinstance(v, dict):
-            for kk, vv in v.items():
-                row[f"{ns}_{k}_{kk}"] = vv
-        else:
-            row[f"{ns}_{k}"] = v
-
-def flatten_advanced_team_game_stats(records) -> pd.DataFrame:
-    rows = []
-    for a in records:
-        row = {"game_id": a.game_id, "team": a.team}
-        _flatten_ns(getattr(a, "offense", None), "off", row)
-        _flatten_ns(getattr(a, "defense", None), "def", row)
-        _flatten_ns(getattr(a, "special_teams", None), "st", row)
-        rows.append(row)
-    df = pd.DataFrame(rows).drop_duplicates(subset=["game_id", "team"])
-    for c in df.columns:
-        if c in ("game_id", "team"):
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+
+# column prefix per AdvancedGameStat side
+NAMESPACES = {"offense": "off", "defense": "def", "special_teams": "st"}
+
+
+def _model_fields(model):
+    """(attribute, alias, nested model or None) for each field of a cfbd model."""
+    out = []
+    for name, f in model.__fields__.items():
+        nested = f.type_ if hasattr(f.type_, "__fields__") else None
+        out.append((name, f.alias, nested))
+    return out
+
+
+@lru_cache(maxsize=None)
+def advanced_paths(model=None) -> tuple:
+    """Key paths of the advanced stat columns, learned once from the cfbd model.
+
+    Each entry is ``(column, ((attribute, alias), ...))``; column names match the
+    ``<ns>_<key>[_<subkey>]`` names the row-dict flattener produced.
+    """
+    if model is None:
+        from cfbd import AdvancedGameStat as model
+    paths = []
+    for side, _, side_model in _model_fields(model):
+        ns = NAMESPACES.get(side)
+        if ns is None or side_model is None:
             continue
-        # Attempt to convert to numeric; if conversion fails, keep original values.
-        try:
-            df[c] = pd.to_numeric(df[c])
-        except Exception:
-            # Leave column as-is (non-numeric)
-            pass
-    return df
+        for name, alias, nested in _model_fields(side_model):
+            if nested is None:
+                paths.append((f"{ns}_{alias}", ((side, side), (name, alias))))
+                continue
+            for leaf, leaf_alias, _ in _model_fields(nested):
+                paths.append((f"{ns}_{alias}_{leaf_alias}", ((side, side), (name, alias), (leaf, leaf_alias))))
+    return tuple(paths)
+
+
+def advanced_schema(paths=None) -> pa.Schema:
+    """Fixed Arrow schema: game_id, team, then every stat as float64 (nullable)."""
+    paths = advanced_paths() if paths is None else paths
+    return pa.schema([("game_id", pa.int64()), ("team", pa.string())]
+                     + [(col, pa.float64()) for col, _ in paths])
+
+
+def _step(obj, attr, alias):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        v = obj.get(alias)
+        return obj.get(attr) if v is None else v
+    return getattr(obj, attr, None)
+
+
+def flatten_advanced_team_game_stats(records, as_arrow: bool = False, paths=None):
+    """One row per (game_id, team) with a stable column set and dtypes.
+
+    Values are written straight into preallocated float64 columns along the
+    declared key paths, so every weekly or season frame has the same schema,
+    even when a stat is missing from every record. Duplicate (game_id, team)
+    records keep the first. With ``as_arrow`` a ``pyarrow.Table`` is returned.
+    """
+    paths = advanced_paths() if paths is None else paths
+    records = list(records or [])
+    game_ids = np.zeros(len(records), dtype=np.int64)
+    teams = np.empty(len(records), dtype=object)
+    values = np.full((len(paths), len(records)), np.nan)
+    # paths share their side and group objects; resolve each once per record
+    groups = {}
+    for i, (_, steps) in enumerate(paths):
+        groups.setdefault(steps[:-1], []).append((i, steps[-1]))
+
+    seen, n = set(), 0
+    for rec in records:
+        key = (_step(rec, "game_id", "gameId"), _step(rec, "team", "team"))
+        if key in seen:
+            continue
+        seen.add(key)
+        game_ids[n], teams[n] = key
+        for prefix, leaves in groups.items():
+            obj = rec
+            for attr, alias in prefix:
+                obj = _step(obj, attr, alias)
+            if obj is None:
+                continue
+            for i, (attr, alias) in leaves:
+                v = _step(obj, attr, alias)
+                if v is not None:
+                    values[i, n] = v
+        n += 1
+
+    schema = advanced_schema(paths)
+    table = pa.Table.from_arrays(
+        [pa.array(game_ids[:n]), pa.array(teams[:n], type=pa.string())]
+        + [pa.array(values[i, :n], from_pandas=True) for i in range(len(paths))],
+        schema=schema)
+    if as_arrow:
+        return table
+    return table.to_pandas()
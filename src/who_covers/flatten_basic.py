@@ -1,56 +1,196 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-def flatten_basic_team_game_stats(records) -> pd.DataFrame:
-    """Return long DF: (game_id, team, team_conference, stat_name, value)"""
-    out = []
+def _field(obj, key):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+def _get(obj, *keys):
+    """First non-empty value among ``keys``, reading dict keys or attributes."""
+    for k in keys:
+        v = _field(obj, k)
+        if v:
+            return v
+    return None
+
+def flatten_basic_columns(records) -> dict:
+    """Collect basic stat records into column lists plus per-team stat counts.
+
+    Values are left as the raw payload values; numeric coercion happens once per
+    column in ``flatten_basic_team_game_stats``.
+    """
+    game_ids, teams, team_ids, confs, counts = [], [], [], [], []
+    names, values = [], []
     for row in records:
         # Handle per-game payloads from GamesApi.get_game_team_stats
-        if hasattr(row, "id") and (hasattr(row, "teams") or (hasattr(row, "to_dict") and "teams" in row.to_dict())):
+        row_teams = getattr(row, "teams", None)
+        if row_teams is None and isinstance(row, dict):
+            row_teams = row.get("teams")
+        if hasattr(row, "id") and row_teams is not None:
             game_id = getattr(row, "id")
-            teams = row.to_dict().get("teams") if hasattr(row, "to_dict") else getattr(row, "teams", [])
-            for t in teams:
-                # t is a dict-like structure
-                team = t.get("team") or t.get("teamName")
-                conf = t.get("conference")
-                for stat in t.get("stats", []) or []:
+            for t in row_teams:
+                n0 = len(names)
+                for stat in _get(t, "stats") or []:
                     # stats entries look like {"category": <name>, "stat": <value>}
-                    name = stat.get("category") or stat.get("stat_name") or stat.get("stat")
-                    val = stat.get("stat") or stat.get("stat_value")
+                    name = _get(stat, "category", "stat_name", "stat")
                     if name is None:
                         continue
-                    out.append({
-                        "game_id": game_id,
-                        "team": team,
-                        "team_conference": conf,
-                        "stat_name": name,
-                        "value": pd.to_numeric(val, errors="coerce"),
-                    })
+                    names.append(name)
+                    values.append(_get(stat, "stat") or _field(stat, "stat_value"))
+                game_ids.append(game_id)
+                teams.append(_get(t, "team", "teamName"))
+                team_ids.append(_get(t, "team_id", "teamId"))
+                confs.append(_field(t, "conference"))
+                counts.append(len(names) - n0)
             continue
 
         # Fallback: handle TeamStat-like objects (season/team aggregates)
-        game_id = getattr(row, "game_id", None)
-        team = getattr(row, "team", None)
-        conf = getattr(row, "conference", None)
+        n0 = len(names)
         for cat in (getattr(row, "categories", None) or []):
             for stat in (getattr(cat, "types", None) or []):
                 name = getattr(stat, "stat", None)
-                val = getattr(stat, "stat_value", None)
                 if name is None:
                     continue
-                out.append({
-                    "game_id": game_id,
-                    "team": team,
-                    "team_conference": conf,
-                    "stat_name": name,
-                    "value": pd.to_numeric(val, errors="coerce"),
-                })
-    return pd.DataFrame(out)
-
-def pivot_basic(long_df: pd.DataFrame) -> pd.DataFrame:
+                names.append(name)
+                values.append(getattr(stat, "stat_value", None))
+        game_ids.append(getattr(row, "game_id", None))
+        teams.append(getattr(row, "team", None))
+        team_ids.append(getattr(row, "team_id", None))
+        confs.append(getattr(row, "conference", None))
+        counts.append(len(names) - n0)
+    return dict(game_id=game_ids, team=teams, team_id=team_ids, team_conference=confs, counts=counts,
+                stat_name=names, value=values)
+
+# Compound basic stats and the numeric columns they are split into. Each rule is
+# (parser, component names); parsers are regexes with one group per component.
+STAT_RULES = {
+    "completionAttempts": ("pair", ("completions", "passAttempts")),
+    "totalPenaltiesYards": ("pair", ("penalties", "penaltyYards")),
+    "thirdDownEff": ("pair", ("thirdDownConversions", "thirdDownAttempts")),
+    "fourthDownEff": ("pair", ("fourthDownConversions", "fourthDownAttempts")),
+    "possessionTime": ("clock", ("possessionSeconds",)),
+}
+_PARSERS = {
+    # "12-20" -> 12, 20
+    "pair": (r"^\s*(\d+)\s*-\s*(\d+)\s*$", lambda parts: [parts[0], parts[1]]),
+    # "32:10" -> 1930 seconds
+    "clock": (r"^\s*(\d+):(\d{1,2})\s*$", lambda parts: [parts[0] * 60 + parts[1]]),
+}
+
+def parse_compound_stats(long_df: pd.DataFrame, rules: dict = STAT_RULES) -> pd.DataFrame:
+    """Replace compound stat rows (raw strings) with one numeric row per component.
+
+    ``long_df`` is a long frame whose ``value`` column still holds the raw payload
+    strings. Each stat named in ``rules`` is parsed with one vectorized regex
+    extract per parser over the whole frame; its rows are replaced in place by the
+    component rows, e.g. completionAttempts "12-20" -> completions 12 and
+    passAttempts 20. Unparseable values become NaN components.
+    """
+    names = long_df["stat_name"]
+    kinds = names.map({name: kind for name, (kind, _) in rules.items()})
+    if kinds.isna().all():
+        return long_df
+    pieces = [long_df[kinds.isna()]]
+    for kind, (pattern, combine) in _PARSERS.items():
+        rows = long_df[kinds == kind]
+        if rows.empty:
+            continue
+        parts = rows["value"].astype(str).str.extract(pattern).astype("float64")
+        parts = [parts[c] for c in parts.columns]
+        component_names = rows["stat_name"].map({name: comps for name, (k, comps) in rules.items() if k == kind})
+        for i, values in enumerate(combine(parts)):
+            pieces.append(rows.assign(stat_name=component_names.str[i], value=values))
+    # component rows share their source row's index; a stable sort puts them back in place
+    out = pd.concat(pieces).sort_index(kind="stable")
+    return out.reset_index(drop=True)
+
+def _repeat(values, counts):
+    # expand one value per team into one value per stat row
+    return np.repeat(np.asarray(values, dtype=object), counts) if len(values) else np.asarray([], dtype=object)
+
+def flatten_basic_team_game_stats(records, as_arrow: bool = False):
+    """Return long DF: (game_id, team, team_id, team_conference, stat_name, value)
+
+    Compound stats in ``STAT_RULES`` are split into their numeric components
+    before coercion. With ``as_arrow`` the same columns are returned as a
+    ``pyarrow.Table``.
+    """
+    cols = flatten_basic_columns(records)
+    counts = np.asarray(cols["counts"], dtype=np.int64)
+    game_id = _repeat(cols["game_id"], counts)
+    if len(game_id) and not any(g is None for g in cols["game_id"]):
+        game_id = game_id.astype(np.int64)
+    df = pd.DataFrame({
+        "game_id": game_id,
+        "team": _repeat(cols["team"], counts),
+        # CFBD team id (nullable: season aggregates carry no id)
+        "team_id": pd.array(_repeat(cols["team_id"], counts), dtype="Int64"),
+        "team_conference": _repeat(cols["team_conference"], counts),
+        "stat_name": np.asarray(cols["stat_name"], dtype=object),
+        "value": np.asarray(cols["value"], dtype=object),
+    })
+    df = parse_compound_stats(df)
+    # one vectorized numeric coercion for the whole column
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    if df.empty:
+        df = pd.DataFrame()
+    if as_arrow:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df
+
+def _pivot_basic_array(long_df: pd.DataFrame, meta_cols: list) -> pd.DataFrame:
+    """Factorize (game_id, team) and stat_name and scatter values into a 2-D array.
+
+    Matches ``pivot_table(aggfunc="first")``: the first non-null value per cell
+    wins, rows are sorted by (game_id, team), stat columns by name, and rows or
+    columns without any non-null value are dropped. Metadata comes from each
+    key's first row, attached by position.
+    """
+    # sorted codes per column (-1 for missing); game/team codes combine into one row code
+    g_codes, games = pd.factorize(long_df["game_id"], sort=True)
+    t_codes, teams = pd.factorize(long_df["team"], sort=True)
+    s_codes, stat_names = pd.factorize(long_df["stat_name"], sort=True)
+    values = long_df["value"].to_numpy(dtype=np.float64, na_value=np.nan)
+    keyed = (g_codes >= 0) & (t_codes >= 0)
+    key = g_codes.astype(np.int64) * len(teams) + t_codes
+
+    # first non-null value per (row, stat) cell, by position
+    ok = np.flatnonzero(keyed & (s_codes >= 0) & ~np.isnan(values))
+    row_ids, r = np.unique(key[ok], return_inverse=True)
+    col_ids, c = np.unique(s_codes[ok], return_inverse=True)
+    _, first = np.unique(r * len(col_ids) + c, return_index=True)
+    grid = np.full((len(row_ids), len(col_ids)), np.nan)
+    grid[r[first], c[first]] = values[ok[first]]
+
+    stats = pd.DataFrame(grid, columns=pd.Index(stat_names[col_ids], name="stat_name"))
+    if pd.api.types.is_integer_dtype(long_df["value"]):
+        # pivot_table keeps integer columns that have no holes
+        for i in np.flatnonzero(~np.isnan(grid).any(axis=0)):
+            stats.isetitem(i, stats.iloc[:, i].astype(long_df["value"].dtype))
+    stats.insert(0, "team", teams[row_ids % len(teams)])
+    stats.insert(0, "game_id", games[row_ids // len(teams)])
+
+    if meta_cols:
+        # first row of each (game_id, team), looked up by its key
+        pos = np.flatnonzero(keyed)
+        keys, first_row = np.unique(key[pos], return_index=True)
+        meta = long_df[meta_cols].iloc[pos[first_row[np.searchsorted(keys, row_ids)]]]
+        stats = pd.concat([stats, meta.reset_index(drop=True)], axis=1)
+    return stats
+
+def pivot_basic(long_df: pd.DataFrame, method: str = "array") -> pd.DataFrame:
+    """Pivot long basic stats to one row per (game_id, team), keeping first values.
+
+    ``method="array"`` (default) scatters into a NumPy array; ``method="table"``
+    uses ``pivot_table``. Both give the same frame for numeric values.
+    """
     # Auto-detect metadata columns: anything except the pivot keys and stat/value
     reserved = {"game_id", "team", "stat_name", "value"}
     meta_cols = [c for c in long_df.columns if c not in reserved]
 
+    if method == "array" and pd.api.types.is_numeric_dtype(long_df["value"]):
+        return _pivot_basic_array(long_df, meta_cols)
+
     meta = None
     if meta_cols:
         meta = (long_df[["game_id", "team"] + meta_cols]
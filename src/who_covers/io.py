@@ -1,10 +1,21 @@
 from pathlib import Path
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 ROOT = Path(__file__).resolve().parents[2]  # project root
 DATA = ROOT / "data"
 RAW = DATA / "raw"
 PROCESSED = DATA / "processed"
+CACHE = DATA / "cache"
+MANIFEST = RAW / "_manifest"  # one JSON entry per raw partition
+LAKE = DATA / "lake"  # hive-partitioned datasets: <layer>/<dataset>/season_type=/year=/week=
 for p in (RAW, PROCESSED):
     p.mkdir(parents=True, exist_ok=True)
 
@@ -19,3 +30,317 @@ def save_parquet(df: pd.DataFrame, path: Path):
 
 def save_csv(df: pd.DataFrame, path: Path):
     df.to_csv(path, index=False)
+
+# --- raw partition manifest -------------------------------------------------
+
+def partition_name(dataset: str, year: int, season: str, week: int = None) -> str:
+    """Base name of a raw partition, e.g. ``basic_2024_regular`` or ``basic_2024_week3_regular``."""
+    if week is None:
+        return f"{dataset}_{year}_{season}"
+    return f"{dataset}_{year}_week{week}_{season}"
+
+def frame_hash(df: pd.DataFrame) -> str:
+    h = hashlib.sha256("\x1f".join(map(str, df.columns)).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def read_manifest_entry(name: str):
+    path = MANIFEST / f"{name}.json"
+    if not path.exists():
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+def load_manifest() -> pd.DataFrame:
+    if not MANIFEST.exists():
+        return pd.DataFrame()
+    entries = []
+    for path in sorted(MANIFEST.glob("*.json")):
+        with open(path) as fh:
+            entries.append(json.load(fh))
+    return pd.DataFrame(entries)
+
+def save_partition(df: pd.DataFrame, dataset: str, year: int, season: str, week: int = None,
+                   expected_ids=None, complete: bool = True, mirror: bool = True,
+                   compacted_weeks: dict = None) -> Path:
+    """Save a raw partition and record it in the manifest.
+
+    The parquet file is only rewritten when its content hash changed. A partition
+    is complete when ``complete`` holds and every id in ``expected_ids`` is present.
+    With ``mirror`` the frame is also written to the partitioned dataset.
+    """
+    name = partition_name(dataset, year, season, week)
+    path = raw_path(f"{name}.parquet")
+    digest = frame_hash(df)
+    prev = read_manifest_entry(name)
+    if not (prev and prev["hash"] == digest and path.exists()):
+        save_parquet(df, path)
+        if mirror:
+            write_partitioned(df, dataset, year, season, week)
+    elif mirror and not lake_partition_dir(dataset, year, season, week).exists():
+        write_partitioned(df, dataset, year, season, week)
+
+    ids = set(df["game_id"].dropna().astype(int)) if "game_id" in df.columns else set()
+    missing = sorted(set(int(i) for i in expected_ids) - ids) if expected_ids is not None else []
+    entry = {
+        "dataset": dataset,
+        "year": int(year),
+        "season": season,
+        "week": week,
+        "rows": len(df),
+        "game_ids": len(ids),
+        "missing_game_ids": missing,
+        "hash": digest,
+        "fetched_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "complete": bool(complete) and not missing,
+    }
+    if compacted_weeks is not None:
+        entry["compacted_weeks"] = compacted_weeks
+    MANIFEST.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST / f".{name}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(entry, fh, indent=1)
+    os.replace(tmp, MANIFEST / f"{name}.json")
+    return path
+
+def partition_status(dataset: str, year: int, season: str, week: int = None,
+                     max_age: dt.timedelta = None):
+    """Return why a partition needs refetching ("missing", "incomplete", "stale") or None."""
+    name = partition_name(dataset, year, season, week)
+    entry = read_manifest_entry(name)
+    if entry is None or not raw_path(f"{name}.parquet").exists():
+        return "missing"
+    if not entry["complete"]:
+        return "incomplete"
+    if max_age is not None:
+        age = dt.datetime.now(dt.timezone.utc) - dt.datetime.fromisoformat(entry["fetched_at"])
+        if age > max_age:
+            return "stale"
+    return None
+
+def years_to_refresh(dataset: str, years, season: str, max_age: dt.timedelta = None, force: bool = False) -> list:
+    todo = []
+    for yr in years:
+        reason = "forced" if force else partition_status(dataset, yr, season, max_age=max_age)
+        if reason:
+            todo.append(yr)
+        else:
+            print(f"{partition_name(dataset, yr, season)} is complete; skipping")
+    return todo
+
+def compact_weeks(dataset: str, year: int, season: str, expected_ids=None, complete: bool = True):
+    """Build a season partition from the season's weekly partitions.
+
+    Only weeks whose content hash changed since the last compaction are read: the
+    season file's rows for those weeks' games are replaced by the weekly rows and
+    the result is deduplicated on (game_id, team), or game_id for tables without a
+    team. The season partition is complete only if every weekly one is. Returns
+    the season file path, or None when the season has no weekly partitions.
+    """
+    manifest = load_manifest()
+    if manifest.empty or "week" not in manifest.columns:
+        return None
+    weekly = manifest[(manifest["dataset"] == dataset) & (manifest["year"] == int(year))
+                      & (manifest["season"] == season) & manifest["week"].notna()]
+    if weekly.empty:
+        return None
+    current = {str(int(wk)): h for wk, h in zip(weekly["week"], weekly["hash"])}
+
+    name = partition_name(dataset, year, season)
+    path = raw_path(f"{name}.parquet")
+    prev = read_manifest_entry(name) if path.exists() else None
+    done = (prev or {}).get("compacted_weeks", {})
+    changed = sorted((int(wk) for wk, h in current.items() if done.get(wk) != h))
+    if not changed and prev is not None and prev["complete"]:
+        return path
+
+    season_df = pd.read_parquet(path) if path.exists() else pd.DataFrame()
+    frames = [pd.read_parquet(raw_path(f"{partition_name(dataset, year, season, wk)}.parquet"))
+              for wk in changed]
+    frames = [f for f in frames if not f.empty]
+    if frames:
+        new = pd.concat(frames, ignore_index=True)
+        if "game_id" in season_df.columns:
+            season_df = season_df[~season_df["game_id"].isin(new["game_id"])]
+        season_df = pd.concat([season_df, new], ignore_index=True)
+    if "game_id" in season_df.columns:
+        keys = ["game_id", "team"] if "team" in season_df.columns else ["game_id"]
+        season_df = (season_df.drop_duplicates(subset=keys, keep="last")
+                     .sort_values(keys, kind="mergesort").reset_index(drop=True))
+
+    # weekly partitions are already in the partitioned dataset
+    return save_partition(season_df, dataset, year, season, expected_ids=expected_ids,
+                          complete=complete and bool(weekly["complete"].all()),
+                          mirror=False, compacted_weeks=current)
+
+def add_refresh_args(ap):
+    ap.add_argument("--force", action="store_true",
+                    help="refetch partitions even if the manifest says they are complete")
+    ap.add_argument("--max-age", type=float, default=None,
+                    help="days after which complete partitions are refetched anyway")
+    return ap
+
+def max_age_from_args(args):
+    return dt.timedelta(days=args.max_age) if args.max_age is not None else None
+
+# --- partitioned datasets ---------------------------------------------------
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("season_type", pa.string()), ("year", pa.int64()), ("week", pa.int64())]), flavor="hive")
+PARTITION_KEYS = ["season_type", "year", "week"]
+# a "both" frame is filed under each row's own season type
+SEASON_TYPES = ("regular", "postseason")
+
+def lake_root(dataset: str, layer: str = "raw") -> Path:
+    return LAKE / layer / dataset
+
+def lake_partition_dir(dataset: str, year: int, season: str, week: int = None, layer: str = "raw") -> Path:
+    """Directory of one partition; without ``week``, the whole season."""
+    path = lake_root(dataset, layer) / f"season_type={season}" / f"year={int(year)}"
+    return path if week is None else path / f"week={int(week)}"
+
+def _game_weeks(year: int, season: str) -> pd.Series:
+    """game_id -> week from the season's games partition (empty if not saved yet)."""
+    games = read_dataset("games", years=[year], season=season, columns=["game_id", "week"])
+    return games.drop_duplicates("game_id").set_index("game_id")["week"]
+
+def _row_season_types(df: pd.DataFrame, years) -> pd.Series:
+    """Each row's season type: its ``season_type`` column, else its game's in the games dataset."""
+    if "season_type" in df.columns:
+        kinds = df["season_type"]
+    elif "game_id" in df.columns:
+        games = read_dataset("games", years=years, columns=["game_id", "season_type"])
+        kinds = df["game_id"].map(games.drop_duplicates("game_id").set_index("game_id")["season_type"])
+    else:
+        kinds = pd.Series(None, index=df.index, dtype=object)
+    return kinds.where(kinds.isin(SEASON_TYPES))
+
+def _write_file(df: pd.DataFrame, directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".part-0.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, directory / "part-0.parquet")
+
+def _write_table(table: pa.Table, directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".part-0.{os.getpid()}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, directory / "part-0.parquet")
+
+def write_weeks(df: pd.DataFrame, dataset: str, season: str, layer: str = "raw") -> list:
+    """Replace every (year, week) partition that a multi-season frame has rows for.
+
+    The frame (with ``year`` and ``week`` columns) is converted to Arrow once and
+    sliced per partition; weeks it has no rows for are left alone. With season
+    "both" each row goes under its own season type (``season_type``, or its game's),
+    and under "both" only when that is unknown.
+    """
+    table = pa.Table.from_pandas(df.drop(columns=[c for c in PARTITION_KEYS if c in df.columns]),
+                                 preserve_index=False)
+    keys = df[["year", "week"]].reset_index(drop=True)
+    keys["season_type"] = season
+    if season == "both":
+        years = sorted(set(df["year"].astype(int)))
+        keys["season_type"] = _row_season_types(df, years).fillna("both").to_numpy()
+    groups = keys.groupby(["season_type", "year", "week"], sort=True).indices
+    paths = []
+    for (kind, yr, wk), rows in groups.items():
+        target = lake_partition_dir(dataset, yr, kind, wk, layer)
+        if target.exists():
+            shutil.rmtree(target)
+        _write_table(table.take(rows), target)
+        paths.append(target)
+    return paths
+
+def write_partitioned(df: pd.DataFrame, dataset: str, year: int, season: str, week: int = None,
+                      layer: str = "raw") -> Path:
+    """Write a frame into the dataset's hive partitions, replacing what was there.
+
+    With ``week`` only that week's partition is replaced. A season-wide frame is
+    split by its ``week`` column, or by the weeks of its game ids in the games
+    dataset; rows without a known week go directly under the year. Partition keys
+    live in the paths only and are dropped from the files.
+
+    A "both" frame is split by season type first (``season_type``, or its game's
+    in the games dataset), so regular-season and postseason rows never share a
+    partition; each season type in the frame replaces its own partitions and
+    rows of unknown type stay under "both". Returns the dataset root then.
+    """
+    if season == "both":
+        kinds = _row_season_types(df, [year])
+        for kind in SEASON_TYPES:
+            if (kinds == kind).any():
+                _write_season(df[kinds == kind], dataset, year, kind, week, layer)
+        _write_season(df[kinds.isna()], dataset, year, season, week, layer)
+        return lake_root(dataset, layer)
+    return _write_season(df, dataset, year, season, week, layer)
+
+def _write_season(df: pd.DataFrame, dataset: str, year: int, season: str, week: int = None,
+                  layer: str = "raw") -> Path:
+    target = lake_partition_dir(dataset, year, season, week, layer)
+    if target.exists():
+        shutil.rmtree(target)
+    data = df.drop(columns=[c for c in PARTITION_KEYS if c in df.columns])
+    if week is not None or df.empty:
+        if not df.empty:
+            _write_file(data, target)
+        return target
+    if "week" in df.columns:
+        weeks = df["week"]
+    elif "game_id" in df.columns:
+        weeks = df["game_id"].map(_game_weeks(year, season))
+    else:
+        weeks = pd.Series(pd.NA, index=df.index)
+    for wk, part in data.groupby(weeks.astype("Int64"), dropna=False, sort=True):
+        _write_file(part, target if pd.isna(wk) else target / f"week={int(wk)}")
+    return target
+
+def open_dataset(dataset: str, layer: str = "raw"):
+    """All partitions of a dataset as one ``pyarrow.dataset.Dataset`` (None if never written)."""
+    root = lake_root(dataset, layer)
+    if not root.exists():
+        return None
+    return ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+
+def dataset_filter(years=None, season: str = None, weeks=None, filter=None):
+    """Combine partition predicates (and an optional extra expression) into one filter.
+
+    Season "both" matches every season type.
+    """
+    expr = filter
+    for cond in (
+        ds.field("year").isin([int(y) for y in years]) if years is not None else None,
+        ds.field("season_type") == season if season not in (None, "both") else None,
+        ds.field("week").isin([int(w) for w in weeks]) if weeks is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return expr
+
+def read_dataset(dataset: str, years=None, season: str = None, weeks=None, columns=None,
+                 filter=None, layer: str = "raw") -> pd.DataFrame:
+    """Read a partitioned dataset with partition pruning and column pushdown.
+
+    ``years``/``season``/``weeks`` prune partitions by path, so files outside them
+    are never opened; ``filter`` is any extra ``pyarrow.dataset`` expression and
+    ``columns`` limits what is read from each file. Partition keys come back as
+    columns (season_type, year, week) unless ``columns`` leaves them out.
+    """
+    dset = open_dataset(dataset, layer)
+    if dset is None:
+        return pd.DataFrame(columns=columns)
+    expr = dataset_filter(years, season, weeks, filter)
+    # prune by partition path first; only the surviving files' footers are read to
+    # unify their schemas (e.g. weeks where a stat never occurred)
+    root = lake_root(dataset, layer)
+    keep = dataset_filter(years, season, weeks)
+    paths = [f.path for f in dset.get_fragments(filter=keep)] if keep is not None else dset.files
+    if not paths:
+        return pd.DataFrame(columns=columns if columns is not None else dset.schema.names)
+    pruned = ds.dataset(paths, format="parquet", partitioning=PARTITIONING, partition_base_dir=str(root))
+    schema = pa.unify_schemas([f.physical_schema for f in pruned.get_fragments()] + [PARTITIONING.schema],
+                              promote_options="permissive")
+    pruned = ds.dataset(paths, schema=schema, format="parquet", partitioning=PARTITIONING,
+                        partition_base_dir=str(root))
+    return pruned.to_table(columns=columns, filter=expr).to_pandas()
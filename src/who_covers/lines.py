@@ -0,0 +1,238 @@
+"""Betting lines: provider rows in one pass, vectorized consensus, and a provider-level
+line history with as-of (e.g. closing line) queries.
+"""
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from who_covers.io import RAW, save_parquet
+
+LINE_HISTORY = RAW / "line_history"
+
+SPREAD_KEYS = ("spread", "point_spread", "pointSpread", "line", "handicap")
+TOTAL_KEYS = ("overUnder", "over_under", "total", "ou")
+SPREAD_OPEN_KEYS = ("spreadOpen", "spread_open")
+TOTAL_OPEN_KEYS = ("overUnderOpen", "over_under_open")
+UPDATED_KEYS = ("last_updated", "lastUpdated", "updated")
+
+PROVIDER_COLUMNS = ["game_id", "provider", "spread", "total", "spread_open", "total_open", "last_updated"]
+
+
+def to_number(x):
+    if x is None:
+        return None
+    try:
+        # strip plus signs and unicode minus
+        s = str(x).strip().replace("\u2212", "-").replace("+", "")
+        return float(s)
+    except Exception:
+        return None
+
+
+def _as_dict(obj):
+    if isinstance(obj, dict):
+        return obj
+    if hasattr(obj, "to_dict"):
+        try:
+            return obj.to_dict()
+        except Exception:
+            pass
+    return {}
+
+
+def _first(d: dict, obj, keys):
+    for k in keys:
+        v = d.get(k)
+        if v is None:
+            v = getattr(obj, k, None)
+        if v is not None:
+            return v
+    return None
+
+
+def _game_id(rec):
+    gid = getattr(rec, "game_id", None)
+    if gid is None:
+        gid = getattr(rec, "id", None)
+    try:
+        return int(gid) if gid is not None else None
+    except Exception:
+        return None
+
+
+def provider_rows(lines, game_ids=None) -> pd.DataFrame:
+    """Flatten ``BettingApi.get_lines`` records into one row per (game, provider line).
+
+    Records whose game id is not in ``game_ids`` (when given) are dropped.
+    """
+    cols = {c: [] for c in PROVIDER_COLUMNS}
+    for rec in lines or []:
+        gid = _game_id(rec)
+        if gid is None or (game_ids is not None and gid not in game_ids):
+            continue
+        for bk in getattr(rec, "lines", None) or []:
+            bk_d = _as_dict(bk)
+            provider = _first(bk_d, bk, ("provider", "book", "source"))
+            # some providers nest an inner list of lines; otherwise the book is the line
+            inner = bk_d.get("lines") or getattr(bk, "lines", None) or [bk]
+            for ln in inner:
+                if ln is None:
+                    continue
+                ln_d = _as_dict(ln)
+                cols["game_id"].append(gid)
+                cols["provider"].append(provider or None)
+                cols["spread"].append(to_number(_first(ln_d, ln, SPREAD_KEYS)))
+                cols["total"].append(to_number(_first(ln_d, ln, TOTAL_KEYS)))
+                cols["spread_open"].append(to_number(_first(ln_d, ln, SPREAD_OPEN_KEYS)))
+                cols["total_open"].append(to_number(_first(ln_d, ln, TOTAL_OPEN_KEYS)))
+                cols["last_updated"].append(_first(ln_d, ln, UPDATED_KEYS) or _first(bk_d, bk, UPDATED_KEYS))
+    df = pd.DataFrame(cols)
+    for c in ("spread", "total", "spread_open", "total_open"):
+        df[c] = df[c].astype("float64")
+    df["game_id"] = df["game_id"].astype("int64")
+    return df
+
+
+def consolidate_lines(rows: pd.DataFrame) -> pd.DataFrame:
+    """Consensus per game: median spread/total, provider count/list and latest update."""
+    out_cols = ["game_id", "spread", "total", "num_providers", "providers_list", "last_updated", "provider"]
+    if rows.empty:
+        return pd.DataFrame(columns=out_cols)
+
+    g = rows.groupby("game_id", sort=True)
+    out = g[["spread", "total"]].median()
+    out["last_updated"] = g["last_updated"].max()
+
+    providers = (rows.loc[rows["provider"].notna(), ["game_id", "provider"]]
+                 .drop_duplicates()
+                 .sort_values(["game_id", "provider"]))
+    pg = providers.groupby("game_id")["provider"]
+    out["num_providers"] = pg.size().reindex(out.index, fill_value=0).astype("int64")
+    out["providers_list"] = pg.agg(",".join).reindex(out.index)
+    out["provider"] = "consensus"
+    return out.reset_index()[out_cols]
+
+
+# --- provider-level line history --------------------------------------------
+
+HISTORY_COLUMNS = PROVIDER_COLUMNS
+_LINE_VALUES = ["spread", "total", "spread_open", "total_open"]
+
+
+def line_history_path(year: int, season: str) -> Path:
+    return LINE_HISTORY / f"year={year}" / f"season_type={season}" / "lines.parquet"
+
+
+def append_line_history(rows: pd.DataFrame, year: int, season: str, observed_at=None,
+                        start_dates=None) -> pd.DataFrame:
+    """Merge a snapshot of provider rows into the season's line history.
+
+    CFBD lines carry no timestamp of their own, so rows without ``last_updated``
+    are stamped with ``observed_at`` (default: now), or with the game's kickoff
+    from ``start_dates`` ({game_id: start date}) when that is earlier: a line
+    fetched after kickoff is the closing line. A provider line is only stored
+    again when one of its values moved, and the partition is kept sorted by
+    (game_id, provider, last_updated).
+    """
+    observed_at = pd.Timestamp(observed_at or pd.Timestamp.now(tz="UTC"))
+    if observed_at.tzinfo is None:
+        observed_at = observed_at.tz_localize("UTC")
+    snap = rows.reindex(columns=HISTORY_COLUMNS).copy()
+    snap[_LINE_VALUES] = snap[_LINE_VALUES].astype("float64")
+    stamp = pd.Series(observed_at, index=snap.index)
+    if start_dates is not None:
+        kickoff = pd.to_datetime(snap["game_id"].map(start_dates), utc=True, errors="coerce")
+        stamp = stamp.mask(kickoff < observed_at, kickoff)
+    snap["last_updated"] = pd.to_datetime(snap["last_updated"], utc=True, errors="coerce").fillna(stamp)
+    snap["provider"] = snap["provider"].fillna("unknown")
+
+    path = line_history_path(year, season)
+    hist = pd.concat([pd.read_parquet(path), snap], ignore_index=True) if path.exists() else snap
+    hist = hist.sort_values(["game_id", "provider", "last_updated"], kind="mergesort")
+    # keep a row only where the provider's line differs from its previous observation
+    prev = hist.groupby(["game_id", "provider"])[_LINE_VALUES].shift()
+    same = ((hist[_LINE_VALUES] == prev) | (hist[_LINE_VALUES].isna() & prev.isna())).all(axis=1)
+    first = ~hist.duplicated(["game_id", "provider"])
+    hist = hist[first | ~same].reset_index(drop=True)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_parquet(hist, path)
+    return hist
+
+
+def load_line_history(years=None, season: str = None, game_ids=None) -> pd.DataFrame:
+    """Read provider line history, pruning partitions by year/season and rows by game id."""
+    if not LINE_HISTORY.exists():
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    dataset = ds.dataset(LINE_HISTORY, format="parquet", partitioning="hive")
+    expr = None
+    for cond in (
+        ds.field("year").isin(list(years)) if years is not None else None,
+        ds.field("season_type") == season if season is not None else None,
+        ds.field("game_id").isin([int(g) for g in game_ids]) if game_ids is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    df = dataset.to_table(filter=expr).to_pandas()
+    return df.sort_values(["game_id", "provider", "last_updated"], kind="mergesort").reset_index(drop=True)
+
+
+def lines_asof(history: pd.DataFrame, at, game_ids=None) -> pd.DataFrame:
+    """Each provider's line for each game as of a time.
+
+    ``at`` is a single timestamp or a DataFrame of (game_id, at) with one time per
+    game, e.g. kickoff. Returns one row per (game_id, provider) that had a line by
+    then, with the values of its latest observation at or before ``at``.
+    """
+    if isinstance(at, pd.DataFrame):
+        left = at[["game_id", "at"]].copy()
+    else:
+        ids = game_ids if game_ids is not None else history["game_id"].unique()
+        left = pd.DataFrame({"game_id": pd.Series(ids, dtype="int64"), "at": pd.Timestamp(at)})
+    left["at"] = pd.to_datetime(left["at"], utc=True)
+    # one probe per (game, provider) the history knows about
+    pairs = history[["game_id", "provider"]].drop_duplicates()
+    left = left.merge(pairs, on="game_id", how="inner").sort_values("at", kind="mergesort")
+    right = history.sort_values("last_updated", kind="mergesort")
+    out = pd.merge_asof(left, right, left_on="at", right_on="last_updated",
+                        by=["game_id", "provider"], direction="backward")
+    out = out.dropna(subset=["last_updated"])
+    return out.sort_values(["game_id", "provider"]).reset_index(drop=True)
+
+
+def closing_lines(history: pd.DataFrame, games: pd.DataFrame) -> pd.DataFrame:
+    """Provider lines as of kickoff, using the games table's ``start_date``."""
+    kick = games[["game_id", "start_date"]].rename(columns={"start_date": "at"})
+    return lines_asof(history, kick)
+
+
+def open_close(history: pd.DataFrame) -> pd.DataFrame:
+    """Opening vs closing spread/total per (game_id, provider) and the net move.
+
+    The opening value is the provider's reported open when present, otherwise its
+    first observed line; the close is its last observed line.
+    """
+    h = history.sort_values(["game_id", "provider", "last_updated"], kind="mergesort")
+    g = h.groupby(["game_id", "provider"], sort=False)
+    first, last = g.first(), g.last()
+    out = pd.DataFrame({
+        "spread_open": first["spread_open"].fillna(first["spread"]),
+        "spread_close": last["spread"],
+        "total_open": first["total_open"].fillna(first["total"]),
+        "total_close": last["total"],
+        "observations": g.size(),
+        "closed_at": last["last_updated"],
+    })
+    out["spread_move"] = out["spread_close"] - out["spread_open"]
+    out["total_move"] = out["total_close"] - out["total_open"]
+    return out.reset_index()
+
+
+def line_movement(history: pd.DataFrame) -> pd.DataFrame:
+    """Total absolute spread/total movement per (game_id, provider) across observations."""
+    h = history.sort_values(["game_id", "provider", "last_updated"], kind="mergesort")
+    steps = h.groupby(["game_id", "provider"], sort=False)[["spread", "total"]].diff().abs()
+    steps[["game_id", "provider"]] = h[["game_id", "provider"]]
+    out = steps.groupby(["game_id", "provider"], sort=False)[["spread", "total"]].sum()
+    return out.rename(columns={"spread": "spread_movement", "total": "total_movement"}).reset_index()
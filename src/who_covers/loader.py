@@ -0,0 +1,159 @@
+"""Load processed seasons for notebooks and models through an Arrow IPC cache.
+
+Each source Parquet file is decoded once into an uncompressed Arrow IPC file
+under ``data/cache/arrow``. Later loads memory-map that file instead of decoding
+the Parquet again. A cache file records the size and mtime of the source it was
+built from and is rebuilt as soon as the source changes.
+"""
+import json
+import os
+import re
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from who_covers.io import CACHE, PROCESSED
+
+STRUCTURED = PROCESSED / "structured"
+ARROW_CACHE = CACHE / "arrow"
+_SOURCE_KEY = b"who_covers.source"
+_YEAR = re.compile(r"(19|20)\d{2}")
+
+
+def season_files(path: Path = STRUCTURED) -> dict:
+    """Map season year -> Parquet file, keeping the first file found for each year."""
+    files = {}
+    for f in sorted(Path(path).glob("*.parquet")):
+        m = _YEAR.search(f.name)
+        if m:
+            files.setdefault(int(m.group(0)), f)
+    return files
+
+
+def _source_stamp(src: Path) -> dict:
+    st = src.stat()
+    return {"path": str(src.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _cache_path(src: Path) -> Path:
+    return ARROW_CACHE / src.resolve().parent.name / f"{src.stem}.arrow"
+
+
+def _open_cached(path: Path, stamp: dict):
+    """The memory-mapped table at ``path`` if it was built from ``stamp``'s source."""
+    if not path.exists():
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+    except (pa.ArrowInvalid, OSError):
+        return None
+    meta = reader.schema.metadata or {}
+    if json.loads(meta.get(_SOURCE_KEY, b"null")) != stamp:
+        return None
+    return reader.read_all()
+
+
+def read_season_table(src: Path, columns=None, cache: bool = True) -> pa.Table:
+    """Arrow table for one Parquet file, served zero-copy from the IPC cache."""
+    src = Path(src)
+    if not cache:
+        return pq.read_table(src, columns=columns)
+    stamp = _source_stamp(src)
+    path = _cache_path(src)
+    table = _open_cached(path, stamp)
+    if table is None:
+        table = pq.read_table(src)
+        meta = dict(table.schema.metadata or {})
+        meta[_SOURCE_KEY] = json.dumps(stamp).encode()
+        table = table.replace_schema_metadata(meta)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        table = _open_cached(path, stamp)
+    return table.select(columns) if columns is not None else table
+
+
+def _align_dictionaries(tables: list) -> list:
+    """Cast columns that are dictionary-encoded in any season to one dictionary type.
+
+    Seasons built with compact dtypes store names as dictionaries with the
+    smallest index type that fits; older seasons store plain strings.
+    """
+    kinds = {}
+    for t in tables:
+        for f in t.schema:
+            kinds.setdefault(f.name, set()).add(f.type)
+    targets = {}
+    for name, types in kinds.items():
+        dicts = [t for t in types if pa.types.is_dictionary(t)]
+        if dicts and len(types) > 1:
+            targets[name] = pa.dictionary(pa.int32(), dicts[0].value_type)
+    if not targets:
+        return tables
+    out = []
+    for t in tables:
+        for name, typ in targets.items():
+            i = t.schema.get_field_index(name)
+            if i >= 0 and t.schema.field(i).type != typ:
+                t = t.set_column(i, name, t.column(i).cast(typ))
+        out.append(t)
+    return out
+
+
+def _pandas_metadata(tables: list, combined: pa.Schema) -> dict:
+    """Schema metadata for the combined table, with pandas dtypes only where all seasons agree.
+
+    A column keeps its pandas entry (which restores e.g. Int16) from the latest
+    season whose Arrow type matches the combined type; a column whose seasons
+    differ (Int16 in one, float32 in another) converts from its Arrow type.
+    """
+    base, entries = None, {}
+    for t in tables:
+        meta = json.loads((t.schema.metadata or {}).get(b"pandas", b"null"))
+        if not meta:
+            continue
+        base = meta
+        for col in meta["columns"]:
+            name = col["name"]
+            i, j = t.schema.get_field_index(name), combined.get_field_index(name)
+            if i >= 0 and j >= 0 and t.schema.field(i).type == combined.field(j).type:
+                entries[name] = col
+    if base is None:
+        return {}
+    for t in tables:
+        for f in t.schema:
+            if f.name in entries and combined.field(f.name).type != f.type:
+                del entries[f.name]
+    base.update(index_columns=[], column_indexes=[],
+                columns=[entries[n] for n in combined.names if n in entries])
+    return {b"pandas": json.dumps(base).encode()}
+
+
+def load_seasons(path: Path = STRUCTURED, years=None, columns=None, as_dict: bool = False,
+                 cache: bool = True):
+    """Load processed seasons as one frame, or a ``{year: frame}`` dict with ``as_dict``.
+
+    ``path`` is a directory of per-season Parquet files (year in the file name).
+    ``years`` and ``columns`` restrict what is returned. Numeric columns without
+    nulls are zero-copy views of the mapped cache and therefore read-only;
+    ``.copy()`` a frame before assigning into its existing values.
+    """
+    files = season_files(path)
+    if years is not None:
+        wanted = {int(y) for y in years}
+        files = {yr: f for yr, f in files.items() if yr in wanted}
+    tables = {yr: read_season_table(f, columns, cache) for yr, f in sorted(files.items())}
+    if as_dict:
+        return {yr: t.to_pandas(split_blocks=True) for yr, t in tables.items()}
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    # seasons can differ in columns (stats that only exist in some years) and in dtypes
+    aligned = _align_dictionaries(list(tables.values()))
+    table = pa.concat_tables([t.replace_schema_metadata(None) for t in aligned], promote_options="permissive")
+    # pandas metadata restores extension dtypes such as Int16 where every season agrees
+    table = table.replace_schema_metadata(_pandas_metadata(aligned, table.schema))
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,114 @@
+"""Compact dtypes for the processed datasets.
+
+Each dataset has an ordered list of ``(pattern, dtype)`` rules matched against
+column names (first match wins). Team-level stat names are matched with or
+without a ``home_``/``away_`` prefix, so one rule set covers both the team-game
+tables and the wide game tables. Float columns that no rule names become
+float32; other columns keep their dtype.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+_SIDE = r"^(?:(?:home|away)_)?"
+
+# per-team counts from the basic box score (including compound stat components);
+# sacks and tacklesForLoss are not listed because half sacks make them fractional
+COUNT_STATS = [
+    "firstDowns", "totalYards", "netPassingYards", "rushingYards", "rushingAttempts", "rushingTDs",
+    "passingTDs", "turnovers", "fumblesLost", "interceptions", "interceptionYards", "interceptionTDs",
+    "tackles", "qbHurries", "passesDeflected", "defensiveTDs", "kickingPoints",
+    "totalFumbles", "fumblesRecovered", "passesIntercepted", "puntReturns", "puntReturnYards",
+    "puntReturnTDs", "kickReturns", "kickReturnYards", "kickReturnTDs", "completions", "passAttempts",
+    "penalties", "penaltyYards", "thirdDownConversions", "thirdDownAttempts", "fourthDownConversions",
+    "fourthDownAttempts", "possessionSeconds",
+]
+
+GAME_RULES = [
+    (r"^game_id$", "int64"),
+    (r"team_id$", "Int32"),
+    (r"^(season|week)$", "Int16"),
+    (r"^start_date$", None),
+    (r"^(season_type|venue|favorite|provider|home_ats|ou_result)$", "category"),
+    (_SIDE + r"(team|team_x|team_y)$", "category"),
+    (r"conference$", "category"),
+    (r"^(neutral_site|conference_game)$", "boolean"),
+    (_SIDE + r"points$|^point_diff$", "Int16"),
+    (_SIDE + "(" + "|".join(COUNT_STATS) + ")$", "Int16"),
+    # advanced stat counts: drives, plays and *YardsTotal
+    (_SIDE + r"(off|def)_(drives|plays|\w+YardsTotal)$", "Int16"),
+    (r"^num_providers$", "Int8"),
+]
+
+SCHEMAS = {
+    "games_wide": GAME_RULES,
+}
+
+
+def _to_int(s: pd.Series, dtype: str) -> pd.Series:
+    num = pd.to_numeric(s, errors="coerce")
+    vals = num.to_numpy(dtype="float64", na_value=np.nan)
+    finite = vals[~np.isnan(vals)]
+    info = np.iinfo(dtype.lower())
+    # fall back to float32 rather than truncate fractions or overflow
+    if len(finite) and ((finite != np.round(finite)).any() or finite.min() < info.min or finite.max() > info.max):
+        return num.astype("float32")
+    return num.astype(dtype)
+
+
+def column_dtypes(columns, dataset: str = "games_wide") -> dict:
+    """The registry dtype for each column (``None`` keeps the column as is)."""
+    rules = SCHEMAS[dataset]
+    out = {}
+    for c in columns:
+        out[c] = next((dtype for pattern, dtype in rules if re.search(pattern, c)), "default")
+    return out
+
+
+def apply_schema(df: pd.DataFrame, dataset: str = "games_wide") -> pd.DataFrame:
+    """Return ``df`` with the dataset's compact dtypes applied."""
+    out = {}
+    for c, dtype in column_dtypes(df.columns, dataset).items():
+        s = df[c]
+        if dtype == "default":
+            if pd.api.types.is_float_dtype(s):
+                s = s.astype("float32")
+        elif dtype == "category":
+            s = s.astype("category")
+        elif dtype == "boolean":
+            s = s.astype("boolean")
+        elif dtype in ("Int8", "Int16", "Int32"):
+            s = _to_int(s, dtype)
+        elif dtype is not None:
+            s = s.astype(dtype)
+        out[c] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def align_frames(frames, dataset: str = "games_wide") -> list:
+    """Give frames (e.g. one per season) the same columns and the same dtypes.
+
+    Columns are the union in first-seen order, filled with nulls where a frame
+    lacks them, and the registry dtypes are decided over all frames together, so
+    a column that is fractional in any season is float32 in every season and the
+    categorical columns share one set of categories.
+    """
+    frames = list(frames)
+    if not frames:
+        return []
+    columns = list(dict.fromkeys(c for f in frames for c in f.columns))
+    combined = apply_schema(pd.concat(frames, ignore_index=True)[columns], dataset)
+    bounds = np.cumsum([0] + [len(f) for f in frames])
+    return [combined.iloc[a:b].reset_index(drop=True) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Deep memory use (MB) by dtype before and after compaction, plus a total row."""
+    def by_dtype(df):
+        mem = df.memory_usage(deep=True, index=False)
+        return mem.groupby(df.dtypes.astype(str)).sum() / 1e6
+
+    rep = pd.concat({"before_mb": by_dtype(before), "after_mb": by_dtype(after)}, axis=1).fillna(0.0)
+    rep.loc["total"] = rep.sum()
+    return rep.round(2)
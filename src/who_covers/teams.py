@@ -0,0 +1,138 @@
+"""Persistent team dimension keyed by the CFBD team id.
+
+Three small tables under ``data/raw/teams``:
+
+- ``teams.parquet``: one row per team_id with its latest school name, mascot,
+  abbreviation, classification and conference;
+- ``team_aliases.parquet``: normalized alias -> team_id (school, abbreviation
+  and alternate names);
+- ``team_conferences.parquet``: the conference of each team_id in each season.
+
+CFBD ids never change, so team_id is stable across runs and seasons, and the
+fetch/build stages use it in place of team-name strings for joins.
+"""
+import pandas as pd
+
+from who_covers.io import RAW, save_parquet
+
+TEAMS_DIR = RAW / "teams"
+
+TEAM_COLUMNS = ["team_id", "school", "mascot", "abbreviation", "classification", "conference", "last_season"]
+
+
+def _path(name: str):
+    return TEAMS_DIR / f"{name}.parquet"
+
+
+def normalize_name(names: pd.Series) -> pd.Series:
+    """Alias key: trimmed, case-folded, single-spaced."""
+    return names.astype("string").str.strip().str.casefold().str.replace(r"\s+", " ", regex=True)
+
+
+def team_rows(teams, year: int) -> pd.DataFrame:
+    """One row per ``TeamsApi.get_teams`` record, with its alternate names as a list."""
+    rows = [{
+        "team_id": t.id,
+        "school": t.school,
+        "mascot": getattr(t, "mascot", None),
+        "abbreviation": getattr(t, "abbreviation", None),
+        "classification": getattr(t, "classification", None),
+        "conference": getattr(t, "conference", None),
+        "alternate_names": list(getattr(t, "alternate_names", None) or []),
+        "year": int(year),
+    } for t in teams or [] if getattr(t, "id", None) is not None]
+    return pd.DataFrame(rows, columns=TEAM_COLUMNS[:-1] + ["alternate_names", "year"])
+
+
+def _read(name: str, columns) -> pd.DataFrame:
+    path = _path(name)
+    return pd.read_parquet(path) if path.exists() else pd.DataFrame(columns=columns)
+
+
+def load_teams() -> pd.DataFrame:
+    return _read("teams", TEAM_COLUMNS)
+
+
+def load_team_aliases() -> pd.DataFrame:
+    return _read("team_aliases", ["alias", "team_id"])
+
+
+def load_team_conferences() -> pd.DataFrame:
+    return _read("team_conferences", ["team_id", "year", "conference"])
+
+
+def _upsert(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    # skip an empty (first-run) table so it does not decide the dtypes
+    return pd.concat([f for f in (existing, new) if not f.empty] or [new], ignore_index=True)
+
+
+def _save(df: pd.DataFrame, name: str):
+    TEAMS_DIR.mkdir(parents=True, exist_ok=True)
+    save_parquet(df.reset_index(drop=True), _path(name))
+
+
+def _add_aliases(pairs: pd.DataFrame):
+    """Merge (name, team_id) pairs into the alias table; existing aliases keep their id."""
+    pairs = pairs.dropna().assign(alias=lambda d: normalize_name(d["name"]))
+    aliases = _upsert(load_team_aliases(), pairs[["alias", "team_id"]])
+    aliases = aliases.dropna().drop_duplicates("alias", keep="first")
+    aliases["team_id"] = aliases["team_id"].astype("int64")
+    _save(aliases.sort_values("alias"), "team_aliases")
+
+
+def update_team_registry(rows: pd.DataFrame):
+    """Upsert ``team_rows`` output (any number of seasons) into the registry tables."""
+    if rows.empty:
+        return
+    rows = rows.sort_values("year", kind="mergesort")
+    latest = rows.drop_duplicates("team_id", keep="last").rename(columns={"year": "last_season"})
+    teams = _upsert(load_teams(), latest[TEAM_COLUMNS])
+    teams = teams.sort_values("last_season", kind="mergesort").drop_duplicates("team_id", keep="last")
+    teams["team_id"] = teams["team_id"].astype("int64")
+    _save(teams.sort_values("team_id"), "teams")
+
+    confs = _upsert(load_team_conferences(), rows[["team_id", "year", "conference"]])
+    confs = confs.drop_duplicates(["team_id", "year"], keep="last").astype({"team_id": "int64", "year": "int64"})
+    _save(confs.sort_values(["team_id", "year"]), "team_conferences")
+
+    names = rows[["team_id", "alternate_names"]].explode("alternate_names")
+    _add_aliases(pd.concat([
+        rows[["school", "team_id"]].rename(columns={"school": "name"}),
+        rows[["abbreviation", "team_id"]].rename(columns={"abbreviation": "name"}),
+        names.rename(columns={"alternate_names": "name"})[["name", "team_id"]],
+    ], ignore_index=True))
+
+
+def team_ids(names: pd.Series, aliases: pd.DataFrame = None) -> pd.Series:
+    """Map team names to team_id (nullable Int64; <NA> for unknown names)."""
+    aliases = load_team_aliases() if aliases is None else aliases
+    lookup = pd.Series(aliases["team_id"].to_numpy(), index=aliases["alias"].to_numpy())
+    return normalize_name(pd.Series(names)).map(lookup).astype("Int64")
+
+
+def attach_team_ids(df: pd.DataFrame, games=()) -> pd.DataFrame:
+    """Insert a ``team_id`` column after ``team``.
+
+    Names are resolved from the season's games first (their home/away ids are
+    CFBD ids), then through the alias registry.
+    """
+    known = {}
+    for g in games:
+        for side in ("home", "away"):
+            name, tid = getattr(g, side + "_team", None), getattr(g, side + "_id", None)
+            if name is not None and tid is not None:
+                known[name] = tid
+    ids = df["team"].map(known).astype("Int64")
+    if ids.isna().any():
+        ids = ids.fillna(team_ids(df["team"]))
+    out = df.drop(columns=["team_id"], errors="ignore")
+    out.insert(out.columns.get_loc("team") + 1, "team_id", ids)
+    return out
+
+
+def conference_on(team_id: pd.Series, year: pd.Series) -> pd.Series:
+    """Conference of each team in each season from the conference history."""
+    confs = load_team_conferences()
+    keys = pd.DataFrame({"team_id": pd.Series(team_id).astype("Int64"), "year": pd.Series(year).astype("Int64")})
+    merged = keys.merge(confs.astype({"team_id": "Int64", "year": "Int64"}), on=["team_id", "year"], how="left")
+    return pd.Series(merged["conference"].to_numpy(), index=keys.index)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from who_covers import ats
+from who_covers.ats import add_ats, ats_cube, ats_record, update_cube
+
+
+def _games():
+    return pd.DataFrame({
+        "game_id": [1, 2, 3, 4, 5], "season": [2018, 2019, 2019, 2020, 2020], "week": [1, 1, 2, 1, 2],
+        "home_team_x": ["A", "B", "C", "B", "A"], "away_team_x": ["B", "A", "A", "A", "C"],
+        "home_points": pd.array([28, 20, 17, 10, 30], "Int16"), "away_points": pd.array([21, 24, 14, 13, None], "Int16"),
+        "home_conference": ["SEC", "SEC", None, "SEC", "SEC"], "away_conference": ["SEC", "SEC", "SEC", "SEC", None],
+        "neutral_site": [False, False, True, False, False],
+        "spread": [-7.0, -3.5, 3.0, 3.0, np.nan], "total": [50.0, 44.0, 31.0, 20.5, 40.0],
+    })
+
+
+def test_add_ats_results():
+    out = add_ats(_games())
+    # home margins 7, -4, 3, -3 against spreads -7, -3.5, 3, 3
+    assert out["ats_margin"].tolist()[:4] == [0.0, -7.5, 6.0, 0.0]
+    assert out["home_ats"].astype(object).tolist()[:4] == ["push", "loss", "cover", "push"]
+    assert out["ou_result"].astype(object).tolist()[:4] == ["under", "push", "push", "over"]
+    assert out["home_ats"].isna().tolist()[4] and out["ou_result"].isna().tolist()[4]
+
+
+def test_cube_answers_record_queries():
+    cube = ats_cube(_games())
+    assert cube["games"].sum() == 8  # game 5 has no spread
+    # A away: underdog at B (cover), favorite at C on a neutral site (loss), favorite at B (push)
+    rec = ats_record(cube, team="A", side="away", since=2019)
+    assert rec[["games", "cover", "ats_loss", "ats_push"]].tolist() == [3, 1, 1, 1]
+    assert rec["cover_pct"] == 0.5
+    assert ats_record(cube, team="A", side="away", role="underdog", neutral_site=False)["cover"] == 1
+    assert ats_record(cube, team="A", role="favorite", neutral_site=True)[["games", "ats_loss"]].tolist() == [1, 1]
+    assert ats_record(cube, conference="SEC", role="favorite", until=2018)[["games", "ats_push"]].tolist() == [1, 1]
+    assert ats_record(cube, team="Z")["games"] == 0 and np.isnan(ats_record(cube, team="Z")["cover_pct"])
+
+
+def test_upcoming_games_with_a_line_are_not_counted():
+    games = _games()
+    games = pd.concat([games, games.iloc[[1]].assign(game_id=6, week=3)], ignore_index=True)
+    games.loc[5, ["home_points", "away_points"]] = pd.NA
+    cube = ats_cube(games)
+    assert cube["games"].sum() == 8
+    rec = ats_record(cube, team="A", side="away", role="underdog", since=2019)
+    assert rec[["games", "cover", "ats_push", "ats_loss"]].tolist() == [1, 1, 0, 0]
+
+
+def test_update_cube_replaces_only_given_seasons(tmp_path, monkeypatch):
+    monkeypatch.setattr(ats, "cube_path", lambda season: tmp_path / f"ats_cube_{season}.parquet")
+    games = _games()
+    update_cube(games, "regular")
+    games.loc[games["season"] == 2020, "spread"] = -3.0
+    cube = update_cube(games[games["season"] == 2020], "regular")
+    pd.testing.assert_frame_equal(cube, ats_cube(games))
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "ats_cube_regular.parquet"), cube)
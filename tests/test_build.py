@@ -0,0 +1,107 @@
+import pandas as pd
+
+from who_covers import build as build_mod
+from who_covers.build import SeasonBuild, materialize
+
+
+def _inputs():
+    games = pd.DataFrame({
+        "game_id": [1, 2], "season": [2024, 2024], "season_type": ["regular"] * 2, "week": [1, 1],
+        "start_date": ["2024-08-31", "2024-08-31"], "home_team": ["A", "C"], "away_team": ["B", "D"],
+        "home_points": [21, 10], "away_points": [14, 30], "home_conference": ["SEC", "ACC"],
+        "away_conference": ["SEC", "ACC"], "conference_game": [True, True], "neutral_site": [False, False],
+        "venue": ["X", "Y"], "home_team_id": [10, 30], "away_team_id": [20, 40],
+    })
+    # the advanced table spells one team differently; ids still match
+    basic = pd.DataFrame({"game_id": [1, 1, 2, 2], "team": ["A", "B", "C", "D"],
+                          "team_id": pd.array([10, 20, 30, 40], "Int64"), "team_conference": ["SEC"] * 4,
+                          "totalYards": [300, 250, 410, 380]})
+    adv = pd.DataFrame({"game_id": [1, 1, 2, 2], "team": ["A", "B", "C", "D St"],
+                        "team_id": pd.array([10, 20, 30, 40], "Int64"), "off_ppa": [0.1, 0.2, 0.3, 0.4]})
+    lines = pd.DataFrame({"game_id": [1, 2], "spread": [-3.5, 2.0], "total": [50.0, 61.5], "provider": ["x", "y"]})
+    return {"games": games, "basic": basic, "advanced": adv, "lines": lines}
+
+
+def test_products_share_one_team_frame():
+    build = SeasonBuild(2024, "regular", inputs=_inputs())
+    assert build.key == "team_id"
+    assert build.team["side"].tolist() == ["home", "away", "home", "away"]
+
+    team = build.team_level()
+    assert list(team.columns[:2]) == ["game_id", "team"] and len(team) == 4
+    assert team.loc[team["team"] == "D", "off_ppa"].item() == 0.4 and "spread" in team
+
+    game = build.game_level()
+    assert game[["home_totalYards", "away_totalYards", "away_off_ppa"]].values.tolist() == [[300, 250, 0.2],
+                                                                                            [410, 380, 0.4]]
+
+    wide = build.wide(with_lines=True)
+    assert list(wide.columns[16:]) == ["home_team_y", "home_team_conference", "home_totalYards", "away_team_y",
+                                       "away_team_conference", "away_totalYards", "home_team", "home_off_ppa",
+                                       "away_team", "away_off_ppa", "spread", "total"]
+    assert wide[["home_team_x", "away_team_y", "away_team"]].values.tolist() == [["A", "B", "B"], ["C", "D", "D St"]]
+    assert wide["spread"].tolist() == [-3.5, 2.0] and "team_id" not in wide
+
+
+def test_wide_on_team_names_keeps_each_tables_own_name():
+    inputs = {name: df.drop(columns=["team_id", "home_team_id", "away_team_id"], errors="ignore")
+              for name, df in _inputs().items()}
+    build = SeasonBuild(2024, "regular", inputs=inputs)
+    assert build.key == "team"
+    assert not set(build.team_level().columns) & {"team_basic", "team_adv"}
+
+    # "D" is only in basic and "D St" only in advanced: the advanced side of game 2 stays empty
+    wide = build.wide().set_index("game_id")
+    assert wide.loc[2, ["away_team_y", "away_totalYards"]].tolist() == ["D", 380]
+    assert wide.loc[2, ["away_team", "away_off_ppa"]].isna().all()
+
+    # and the other way around
+    inputs["basic"].loc[3, "team"], inputs["advanced"].loc[3, "team"] = "D St", "D"
+    wide = SeasonBuild(2024, "regular", inputs=inputs).wide().set_index("game_id")
+    assert wide.loc[2, ["away_team", "away_off_ppa"]].tolist() == ["D", 0.4]
+    assert wide.loc[2, ["away_team_y", "away_totalYards"]].isna().all()
+    assert wide.loc[1, ["away_team_y", "away_team"]].tolist() == ["B", "B"]
+
+
+def test_materialize_upserts_only_changed_games(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_mod, "BUILD_STATE", tmp_path / "_state")
+    path = tmp_path / "game.parquet"
+
+    def save(df, changed):
+        df.to_parquet(path, index=False)
+
+    first, changed = materialize(SeasonBuild(2024, "regular", inputs=_inputs()), path, SeasonBuild.game_level, save)
+    assert changed is None and len(first) == 2
+
+    inputs = _inputs()
+    inputs["basic"].loc[3, "totalYards"] = 999
+    projected = []
+
+    def project(build):
+        projected.append(sorted(build.inputs["games"]["game_id"]))
+        return build.game_level()
+
+    build = SeasonBuild(2024, "regular", inputs=inputs)
+    out, changed = materialize(build, path, project, save)
+    assert changed == {2} and projected == [[2]]
+    pd.testing.assert_frame_equal(out, build.game_level())
+    assert materialize(build, path, project, save)[1] == set() and len(projected) == 1
+
+
+def test_materialize_rebuilds_when_build_params_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_mod, "BUILD_STATE", tmp_path / "_state")
+    path = tmp_path / "wide.parquet"
+
+    def save(df, changed):
+        df.to_parquet(path, index=False)
+
+    build = SeasonBuild(2024, "regular", inputs=_inputs())
+    out, _ = materialize(build, path, lambda b: b.wide(False), save, params="with_lines=False")
+    assert "spread" not in out
+    # same inputs, but now with lines: not "up to date"
+    out, changed = materialize(build, path, lambda b: b.wide(True), save, params="with_lines=True")
+    assert changed is None and out["spread"].tolist() == [-3.5, 2.0]
+    assert materialize(build, path, lambda b: b.wide(True), save, params="with_lines=True")[1] == set()
+    # a product recorded by an older build version is rebuilt too
+    monkeypatch.setattr(build_mod, "BUILD_VERSION", build_mod.BUILD_VERSION + 1)
+    assert materialize(build, path, lambda b: b.wide(True), save, params="with_lines=True")[1] is None
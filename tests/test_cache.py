@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import cfbd
+import pytest
+
+from who_covers.cache import CachedApi, CacheMiss, season_end
+
+
+class FakeGamesApi:
+    def __init__(self):
+        self.calls = 0
+
+    def get_games(self, year, classification=None):
+        self.calls += 1
+        return [cfbd.Game.from_dict({
+            "id": 1, "season": year, "week": 1, "seasonType": "regular",
+            "startDate": "2019-09-01T00:00:00Z", "startTimeTBD": False, "completed": True,
+            "neutralSite": False, "conferenceGame": True, "homeId": 2, "homeTeam": "A",
+            "awayId": 3, "awayTeam": "B", "homePoints": 24, "awayPoints": 17,
+        })]
+
+
+def test_closed_season_served_from_cache_and_offline(tmp_path):
+    api = FakeGamesApi()
+    cached = CachedApi(api, "games", cache_dir=tmp_path, ttl=0)
+
+    first = cached.get_games(year=2019, classification="fbs")
+    second = cached.get_games(year=2019, classification="fbs")
+    assert api.calls == 1  # closed season ignores the ttl
+    assert second == first
+    assert isinstance(second[0], cfbd.Game)
+
+    offline = CachedApi(FakeGamesApi(), "games", cache_dir=tmp_path, offline=True)
+    assert offline.get_games(year=2019, classification="fbs")[0].home_points == 24
+    with pytest.raises(CacheMiss):
+        offline.get_games(year=2018, classification="fbs")
+
+
+def test_closed_season_entry_fetched_mid_season_is_refetched(tmp_path):
+    api = FakeGamesApi()
+    cached = CachedApi(api, "games", cache_dir=tmp_path, ttl=3600)
+    cached.get_games(year=2019, classification="fbs")
+    path, = tmp_path.glob("games/get_games/*.json.gz")
+
+    # backdate the entry into the 2019 season: it may be stale, so the ttl applies
+    with gzip.open(path, "rt") as fh:
+        payload = json.load(fh)
+    payload["fetched_at"] = season_end(2019).timestamp() - 30 * 86400
+    with gzip.open(path, "wt") as fh:
+        json.dump(payload, fh)
+    cached.get_games(year=2019, classification="fbs")
+    assert api.calls == 2
+
+    # the refetch happened after the season ended, so it is now kept for good
+    cached.get_games(year=2019, classification="fbs")
+    assert api.calls == 2
@@ -0,0 +1,18 @@
+from who_covers.dag import TaskGraph
+
+
+def test_failed_task_skips_dependents_only():
+    def boom(games):
+        raise RuntimeError("api down")
+
+    graph = TaskGraph()
+    graph.add("games", lambda: [1, 2, 3])
+    graph.add("basic", lambda g: len(g), deps=["games"])
+    graph.add("lines", boom, deps=["games"])
+    graph.add("build", lambda b, l: b, deps=["basic", "lines"])
+    out = graph.run()
+
+    assert out["results"] == {"games": [1, 2, 3], "basic": 3}
+    assert set(out["errors"]) == {"lines"}
+    assert out["skipped"] == ["build"]
+    assert set(out["timings"]) == {"games", "basic", "lines"}
@@ -0,0 +1,61 @@
+import pandas as pd
+import pyarrow.dataset as ds
+
+from who_covers import io
+
+
+def test_partitioned_dataset_round_trip_with_pruning(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "LAKE", tmp_path)
+    games = pd.DataFrame({"game_id": [1, 2, 3], "week": [1, 2, 2], "season_type": "regular", "home_team": list("ABC")})
+    io.write_partitioned(games, "games", 2023, "regular")
+    # no week column: weeks come from the games dataset
+    stats = pd.DataFrame({"game_id": [1, 1, 2, 3], "team": list("AXBC"), "yards": [100, 200, 300, 400]})
+    io.write_partitioned(stats, "advanced", 2023, "regular")
+    assert (io.lake_partition_dir("advanced", 2023, "regular", 2) / "part-0.parquet").exists()
+
+    # a later weekly file with an extra column replaces only its own week
+    io.write_partitioned(pd.DataFrame({"game_id": [4], "team": ["D"], "yards": [5], "sacks": [2.0]}),
+                         "advanced", 2023, "regular", week=3)
+
+    out = io.read_dataset("advanced", years=[2023], season="regular", weeks=[2, 3],
+                          columns=["game_id", "yards", "sacks", "week"])
+    assert list(out.columns) == ["game_id", "yards", "sacks", "week"]
+    assert sorted(out["game_id"]) == [2, 3, 4]
+    assert out.set_index("game_id").loc[4, "sacks"] == 2.0
+
+    big = io.read_dataset("advanced", filter=ds.field("yards") >= 300, columns=["game_id"])
+    assert sorted(big["game_id"]) == [2, 3]
+    assert io.read_dataset("advanced", years=[2019]).empty
+
+
+def test_write_weeks_replaces_only_the_weeks_in_the_frame(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "LAKE", tmp_path)
+    first = pd.DataFrame({"year": [2023, 2023, 2024], "week": [1, 2, 1], "game_id": [1, 2, 3], "team": list("ABC")})
+    assert len(io.write_weeks(first, "weekly_summary", "regular", layer="processed")) == 3
+    io.write_weeks(pd.DataFrame({"year": [2023], "week": [2], "game_id": [5], "team": ["E"]}),
+                   "weekly_summary", "regular", layer="processed")
+
+    out = io.read_dataset("weekly_summary", season="regular", layer="processed").sort_values("game_id")
+    assert out[["year", "week", "game_id"]].values.tolist() == [[2023, 1, 1], [2024, 1, 3], [2023, 2, 5]]
+
+
+def test_both_seasons_are_partitioned_by_each_rows_season_type(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "LAKE", tmp_path)
+    games = pd.DataFrame({"game_id": [1, 2, 3], "week": [1, 1, 2],
+                          "season_type": ["regular", "postseason", "regular"], "home_team": list("ABC")})
+    io.write_partitioned(games, "games", 2023, "both")
+    assert (io.lake_partition_dir("games", 2023, "postseason", 1) / "part-0.parquet").exists()
+    assert not io.lake_partition_dir("games", 2023, "both").exists()
+
+    out = io.read_dataset("games", years=[2023], season="both").sort_values("game_id")
+    assert out[["game_id", "season_type", "week"]].values.tolist() == [[1, "regular", 1], [2, "postseason", 1],
+                                                                      [3, "regular", 2]]
+    assert io.read_dataset("games", season="regular", weeks=[1])["game_id"].tolist() == [1]
+
+    # frames without a season_type column take their game's; weekly frames too
+    stats = pd.DataFrame({"game_id": [1, 2, 2], "team": list("ABX"), "yards": [100, 200, 300]})
+    io.write_partitioned(stats, "basic", 2023, "both", week=1)
+    io.write_weeks(stats.assign(year=2023, week=1), "weekly_summary", "both", layer="processed")
+    for read in (io.read_dataset("basic", season="postseason"),
+                 io.read_dataset("weekly_summary", season="postseason", layer="processed")):
+        assert read["game_id"].tolist() == [2, 2] and set(read["season_type"]) == {"postseason"}
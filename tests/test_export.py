@@ -0,0 +1,40 @@
+import gzip
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pytest
+
+from who_covers.export import export, write_csv
+
+
+def _frame(n=1000):
+    return pd.DataFrame({"game_id": range(n), "home_team": pd.Categorical(["A", "B"] * (n // 2)),
+                         "spread": [-3.5, None] * (n // 2), "note": ['say "hi", ok', None] * (n // 2)})
+
+
+def test_chunked_csv_is_one_stream(tmp_path):
+    df = _frame()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for suffix, compression in (("csv", None), ("csv.gz", "gzip"), ("csv.zst", "zstd")):
+        path = write_csv(table, tmp_path / f"out.{suffix}", compression, level=3, threads=4, chunk_rows=64)
+        back = pacsv.read_csv(path).to_pandas()
+        assert back["game_id"].tolist() == list(range(1000))
+        assert back["note"].iloc[0] == 'say "hi", ok' and back["spread"].isna().sum() == 500
+    # one header even though every chunk is its own gzip member
+    text = gzip.decompress((tmp_path / "out.csv.gz").read_bytes()).decode()
+    assert text.count('"game_id"') == 1
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "out.csv"), pd.read_csv(tmp_path / "out.csv.gz"))
+
+
+def test_export_formats_round_trip(tmp_path):
+    df = _frame()
+    paths = export(df, tmp_path / "games_wide", ["parquet", "arrow", "csv.zst"])
+    assert {f: p.name for f, p in paths.items()} == {"parquet": "games_wide.parquet", "arrow": "games_wide.arrow",
+                                                     "csv.zst": "games_wide.csv.zst"}
+    pd.testing.assert_frame_equal(pd.read_parquet(paths["parquet"]), df)
+    with pa.memory_map(str(paths["arrow"])) as src:
+        pd.testing.assert_frame_equal(pa.ipc.open_file(src).read_pandas(), df)
+    assert not list(tmp_path.glob(".*.tmp"))
+    with pytest.raises(ValueError):
+        export(df, tmp_path / "x", ["xlsx"])
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from who_covers import build as build_mod, features
+from who_covers.features import form, team_games, update_form
+
+
+def _wide(weeks=4):
+    # teams A-D; each week A plays B and C plays D, alternating home sides
+    rows = []
+    for wk in range(1, weeks + 1):
+        for gid, (h, a) in enumerate([("A", "B"), ("C", "D")] if wk % 2 else [("B", "A"), ("D", "C")]):
+            rows.append({"game_id": wk * 10 + gid, "season": 2024, "week": wk,
+                         "start_date": pd.Timestamp("2024-08-31", tz="UTC") + pd.Timedelta(weeks=wk),
+                         "home_team_x": h, "away_team_x": a, "home_points": 20 + wk, "away_points": 10 + gid,
+                         "home_team_id": ord(h), "away_team_id": ord(a),
+                         "home_totalYards": 300.0 + wk, "away_totalYards": np.nan if wk == 2 else 250.0,
+                         "home_team_y": h, "away_team_y": a})
+    return pd.DataFrame(rows)
+
+
+def test_form_counts_only_earlier_games():
+    teams = team_games(_wide())
+    assert len(teams) == 16 and {"points_for", "margin", "totalYards"} <= set(teams.columns)
+    out = form(teams, windows=(2,), halflife=1)
+    a = out[out["team"] == "A"].reset_index(drop=True)
+    assert a["games_before"].tolist() == [0, 1, 2, 3]
+    # A's yards by week: 301 (home), NaN (away), 303 (home), 250 (away)
+    assert np.isnan(a.loc[0, "totalYards_season"]) and np.isnan(a.loc[0, "totalYards_ewm"])
+    assert a["totalYards_season"].tolist()[1:] == [301.0, 301.0, 302.0]
+    assert a["totalYards_last2"].tolist()[1:] == [301.0, 301.0, 303.0]
+    # halflife 1: weights 1/4, 1/2, 1 for the three earlier games; the missing one still decays
+    assert np.isclose(a.loc[3, "totalYards_ewm"], (301 * 0.25 + 303) / 1.25)
+    assert "team_id" in out and out["team_id"].dtype == "Int32"
+
+
+def test_team_level_input_matches_wide():
+    wide = team_games(_wide())
+    level = wide.drop(columns=["side", "opponent", "points_for", "points_against", "margin"]).assign(
+        home_team=np.where(wide["side"] == "home", wide["team"], wide["opponent"]),
+        away_team=np.where(wide["side"] == "home", wide["opponent"], wide["team"]),
+        home_points=np.where(wide["side"] == "home", wide["points_for"], wide["points_against"]),
+        away_points=np.where(wide["side"] == "home", wide["points_against"], wide["points_for"]),
+        home_team_id=_wide().set_index("game_id").loc[wide["game_id"], "home_team_id"].to_numpy())
+    again = team_games(level)
+    pd.testing.assert_series_equal(again["margin"], wide["margin"])
+    assert (again["side"] == wide["side"]).all()
+
+
+def test_update_form_recomputes_only_changed_teams(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_mod, "BUILD_STATE", tmp_path / "_state")
+    monkeypatch.setattr(features, "form_path", lambda year, season: tmp_path / f"team_form_{year}_{season}.parquet")
+    full = team_games(_wide(4))
+    assert update_form(full[full["week"] < 4], "regular") == {2024: None}
+    # week 4 arrives, and one of A-B's week 3 stats is corrected
+    full.loc[(full["week"] == 3) & (full["team"] == "A"), "totalYards"] = 999.0
+    update = full[~((full["week"] == 4) & full["team"].isin(["C", "D"]))]
+    assert update_form(update, "regular") == {2024: 2}
+    stored = pd.read_parquet(tmp_path / "team_form_2024_regular.parquet")
+    pd.testing.assert_frame_equal(stored, form(update))
+    assert update_form(update, "regular") == {}
+
+
+def test_postseason_form_counts_the_regular_season(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_mod, "BUILD_STATE", tmp_path / "_state")
+    monkeypatch.setattr(features, "form_path", lambda year, season: tmp_path / f"team_form_{year}_{season}.parquet")
+    teams = team_games(_wide(5))
+    regular, bowls = teams[teams["week"] < 5], teams[teams["week"] == 5]
+
+    assert update_form(bowls, "postseason", history=regular) == {2024: None}
+    stored = pd.read_parquet(tmp_path / "team_form_2024_postseason.parquet")
+    expected = form(teams)
+    expected = expected[expected["week"] == 5].reset_index(drop=True)
+    pd.testing.assert_frame_equal(stored, expected[list(stored.columns)])
+    assert stored["games_before"].tolist() == [4] * 4 and stored["totalYards_season"].notna().all()
+
+    # a regular-season correction updates the postseason form of the teams that played it
+    regular = regular.copy()
+    regular.loc[(regular["week"] == 1) & (regular["team"] == "C"), "totalYards"] = 999.0
+    assert update_form(bowls, "postseason", history=regular) == {2024: 2}
+    stored = pd.read_parquet(tmp_path / "team_form_2024_postseason.parquet")
+    expected = form(pd.concat([regular, bowls], ignore_index=True))
+    pd.testing.assert_frame_equal(stored, expected[expected["week"] == 5].reset_index(drop=True)[list(stored.columns)])
+    assert update_form(bowls, "postseason", history=regular) == {}
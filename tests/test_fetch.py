@@ -0,0 +1,39 @@
+import time
+
+from who_covers.fetch import Fetcher
+
+
+class FakeApiError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def test_map_keeps_call_order_under_concurrency():
+    def slow_echo(week):
+        # later weeks finish first
+        time.sleep(0.01 * (5 - week))
+        return week
+
+    f = Fetcher(concurrency=5, rate=1000)
+    assert f.map(slow_echo, [dict(week=w) for w in range(1, 6)]) == [1, 2, 3, 4, 5]
+
+
+def test_retries_rate_limited_calls_and_returns_exceptions():
+    attempts = {"n": 0}
+
+    def flaky():
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise FakeApiError(429)
+        return "ok"
+
+    def broken():
+        raise FakeApiError(404)
+
+    f = Fetcher(concurrency=2, rate=1000, backoff=0.001)
+    assert f.call(flaky) == "ok"
+    assert attempts["n"] == 3
+
+    out = f.map(broken, [{}], return_exceptions=True)
+    assert isinstance(out[0], FakeApiError)
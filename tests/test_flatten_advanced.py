@@ -0,0 +1,37 @@
+import pyarrow as pa
+from cfbd import AdvancedGameStat
+
+from who_covers.flatten_advanced import advanced_schema, flatten_advanced_team_game_stats
+
+
+def make_rec(game_id, team, ppa, explosiveness=None):
+    side = {"plays": 60, "drives": 11, "ppa": ppa, "totalPPA": ppa * 60, "successRate": 0.45,
+            "explosiveness": explosiveness, "powerSuccess": None, "stuffRate": 0.2, "lineYards": 3.1,
+            "lineYardsTotal": 90, "secondLevelYards": 1.2, "secondLevelYardsTotal": 30,
+            "openFieldYards": 0.8, "openFieldYardsTotal": 20,
+            "standardDowns": {"ppa": 0.1, "successRate": 0.5, "explosiveness": 1.1},
+            "passingDowns": {"ppa": 0.2, "successRate": 0.3, "explosiveness": 1.4},
+            "passingPlays": {"ppa": 0.3, "totalPPA": 9.0, "successRate": 0.4, "explosiveness": 1.5},
+            "rushingPlays": {"ppa": 0.05, "totalPPA": 1.5, "successRate": 0.42,
+                             "explosiveness": 0.9}}
+    return AdvancedGameStat.from_dict({"gameId": game_id, "season": 2024, "seasonType": "regular", "week": 1,
+                                       "team": team, "opponent": "X", "offense": side,
+                                       "defense": dict(side, explosiveness=1.0, powerSuccess=0.5)})
+
+
+def test_flatten_advanced_has_stable_schema_and_keeps_first_duplicate():
+    recs = [make_rec(1, "TeamA", 0.25), make_rec(1, "TeamB", -0.1, 1.3), make_rec(1, "TeamA", 9.0)]
+
+    table = flatten_advanced_team_game_stats(recs, as_arrow=True)
+    assert table.schema == advanced_schema()
+    # a week without records still carries every column and dtype
+    assert flatten_advanced_team_game_stats([], as_arrow=True).schema == table.schema
+
+    df = flatten_advanced_team_game_stats(recs)
+    assert list(df["team"]) == ["TeamA", "TeamB"]
+    assert df.loc[0, "off_ppa"] == 0.25
+    assert df.loc[0, "off_passingPlays_successRate"] == 0.4
+    # stats absent from every record are null columns, not missing ones
+    assert df["off_powerSuccess"].isna().all()
+    assert df["off_explosiveness"].isna().tolist() == [True, False]
+    assert table.schema.field("off_plays").type == pa.float64()
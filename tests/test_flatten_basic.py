@@ -1,6 +1,8 @@
 import pandas as pd
 from types import SimpleNamespace
 
+from cfbd import GameTeamStats
+
 from who_covers.flatten_basic import flatten_basic_team_game_stats, pivot_basic
 
 
@@ -40,3 +42,58 @@ def test_flatten_and_pivot_preserves_metadata_and_rows():
     assert row_a["team_conference"] == "ConfA"
     # Numeric conversion should have taken place
     assert int(row_a["yards"]) == 120
+
+
+def test_flatten_game_team_stats_payload_coerces_values_per_column():
+    game = GameTeamStats.from_dict({"id": 7, "teams": [
+        {"teamId": 1, "team": "TeamA", "conference": "ConfA", "homeAway": "home", "points": 21,
+         "stats": [{"category": "totalYards", "stat": "350"}, {"category": "yardsPerPass", "stat": "6.5"}]},
+        {"teamId": 2, "team": "TeamB", "conference": None, "homeAway": "away", "points": 14,
+         "stats": [{"category": "totalYards", "stat": "280"}]},
+    ]})
+
+    long_df = flatten_basic_team_game_stats([game])
+    assert list(long_df.columns) == ["game_id", "team", "team_id", "team_conference", "stat_name", "value"]
+    assert list(long_df["team_id"]) == [1, 1, 2]
+    assert list(long_df["team"]) == ["TeamA", "TeamA", "TeamB"]
+    assert long_df["value"].dtype == "float64"
+    assert long_df["value"].tolist() == [350.0, 6.5, 280.0]
+
+    table = flatten_basic_team_game_stats([game], as_arrow=True)
+    assert table.num_rows == 3
+
+
+def test_pivot_array_matches_pivot_table_first_wins():
+    long_df = pd.DataFrame({
+        "game_id": [2, 2, 1, 1, 1, 1, 2],
+        "team": ["TeamB", "TeamB", "TeamA", "TeamA", "TeamA", "TeamB", "TeamB"],
+        "team_conference": ["ConfB", "ConfB", "ConfA", "ConfA", "ConfA", None, "ConfB"],
+        "stat_name": ["yards", "sacks", "yards", "yards", "sacks", "yards", "yards"],
+        # duplicate (1, TeamA, yards) keeps 120; NaN sack leaves a hole; late 999 is ignored
+        "value": [80.0, 3.0, 120.0, 130.0, float("nan"), 95.0, 999.0],
+    })
+
+    expected = pivot_basic(long_df, method="table")
+    out = pivot_basic(long_df, method="array")
+    pd.testing.assert_frame_equal(out, expected)
+    assert out.loc[out["team"] == "TeamA", "yards"].item() == 120.0
+
+
+def test_compound_stats_are_split_into_numeric_components():
+    game = GameTeamStats.from_dict({"id": 9, "teams": [
+        {"teamId": 1, "team": "TeamA", "conference": "ConfA", "homeAway": "home", "points": 28,
+         "stats": [{"category": "completionAttempts", "stat": "18-27"},
+                   {"category": "totalPenaltiesYards", "stat": "6-55"},
+                   {"category": "thirdDownEff", "stat": "5-12"},
+                   {"category": "possessionTime", "stat": "32:10"},
+                   {"category": "totalYards", "stat": "410"}]},
+    ]})
+
+    long_df = flatten_basic_team_game_stats([game])
+    got = dict(zip(long_df["stat_name"], long_df["value"]))
+    assert got == {"completions": 18, "passAttempts": 27, "penalties": 6, "penaltyYards": 55,
+                   "thirdDownConversions": 5, "thirdDownAttempts": 12, "possessionSeconds": 1930,
+                   "totalYards": 410}
+    # components stay where their source stat was
+    assert list(long_df["stat_name"])[:2] == ["completions", "passAttempts"]
+    assert "completionAttempts" not in set(long_df["stat_name"])
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from who_covers import lines
+
+
+def snapshot(spread_a, spread_b):
+    return pd.DataFrame({
+        "game_id": [1, 1, 2],
+        "provider": ["A", "B", "A"],
+        "spread": [spread_a, spread_b, 7.0],
+        "total": [50.0, 51.0, 44.0],
+        "spread_open": [-3.0, None, None],
+        "total_open": [None, None, None],
+        "last_updated": [None, None, None],
+    })
+
+
+def test_history_keeps_moves_and_answers_asof(tmp_path, monkeypatch):
+    monkeypatch.setattr(lines, "LINE_HISTORY", tmp_path)
+    t0, t1, t2 = (pd.Timestamp(f"2024-09-0{d} 12:00", tz="UTC") for d in (1, 3, 5))
+    lines.append_line_history(snapshot(-3.5, -4.0), 2024, "regular", observed_at=t0)
+    lines.append_line_history(snapshot(-3.5, -4.0), 2024, "regular", observed_at=t1)  # unchanged
+    lines.append_line_history(snapshot(-6.0, -4.0), 2024, "regular", observed_at=t2)  # A moved
+
+    hist = lines.load_line_history(years=[2024], season="regular")
+    assert len(hist) == 4  # 3 initial rows + A's move on game 1
+
+    kick = pd.DataFrame({"game_id": [1, 2], "at": [pd.Timestamp("2024-09-04", tz="UTC")] * 2})
+    asof = lines.lines_asof(hist, kick).set_index(["game_id", "provider"])
+    assert asof.loc[(1, "A"), "spread"] == -3.5
+    assert asof.loc[(2, "A"), "spread"] == 7.0
+
+    oc = lines.open_close(hist).set_index(["game_id", "provider"])
+    assert oc.loc[(1, "A"), "spread_open"] == -3.0
+    assert oc.loc[(1, "A"), "spread_close"] == -6.0
+    assert oc.loc[(1, "B"), "spread_move"] == 0.0
+
+    mv = lines.line_movement(hist).set_index(["game_id", "provider"])
+    assert mv.loc[(1, "A"), "spread_movement"] == 2.5
+
+
+def test_backfilled_lines_close_at_kickoff(tmp_path, monkeypatch):
+    monkeypatch.setattr(lines, "LINE_HISTORY", tmp_path)
+    kickoff = pd.Timestamp("2019-09-01 19:00", tz="UTC")
+    # a finished game's lines fetched years later are stamped at kickoff
+    lines.append_line_history(snapshot(-3.5, -4.0), 2019, "regular", observed_at=pd.Timestamp("2024-01-10", tz="UTC"),
+                              start_dates={1: kickoff, 2: "2019-09-07T16:00:00Z"})
+
+    hist = lines.load_line_history(years=[2019], season="regular")
+    games = pd.DataFrame({"game_id": [1, 2], "start_date": [kickoff, pd.Timestamp("2019-09-07 16:00", tz="UTC")]})
+    close = lines.closing_lines(hist, games).set_index(["game_id", "provider"])
+    assert close.loc[(1, "A"), "spread"] == -3.5
+    assert close.loc[(1, "B"), "spread"] == -4.0
+    assert close.loc[(2, "A"), "spread"] == 7.0
+    assert (close["last_updated"] <= close["at"]).all()
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from who_covers.lines import consolidate_lines, provider_rows
+
+
+def book(provider, spread, total):
+    return SimpleNamespace(provider=provider, spread=spread, over_under=total,
+                           spread_open=None, over_under_open=None)
+
+
+def test_consensus_is_median_across_providers():
+    lines = [
+        SimpleNamespace(id=1, lines=[book("B", -3.0, 50.0), book("A", -4.0, 52.0), book("C", "−5", None)]),
+        SimpleNamespace(id=2, lines=[book("A", 7.0, 44.5)]),
+        SimpleNamespace(id=99, lines=[book("A", 1.0, 40.0)]),  # not an FBS game
+    ]
+    rows = provider_rows(lines, game_ids={1, 2})
+    assert len(rows) == 4
+
+    out = consolidate_lines(rows).set_index("game_id")
+    assert list(out.index) == [1, 2]
+    assert out.loc[1, "spread"] == -4.0
+    assert out.loc[1, "total"] == 51.0
+    assert out.loc[1, "num_providers"] == 3
+    assert out.loc[1, "providers_list"] == "A,B,C"
+    assert out.loc[2, "provider"] == "consensus"
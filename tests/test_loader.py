@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+
+from who_covers import loader
+
+
+def test_load_seasons_caches_and_invalidates_on_source_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "ARROW_CACHE", tmp_path / "arrow")
+    src = tmp_path / "structured"
+    src.mkdir()
+    pd.DataFrame({"game_id": [1, 2], "home_points": [21, 14]}).to_parquet(src / "games_2023.parquet")
+    pd.DataFrame({"game_id": [3], "home_points": [7], "spread": [-3.5]}).to_parquet(src / "games_2024.parquet")
+
+    df = loader.load_seasons(src)
+    assert list(df["game_id"]) == [1, 2, 3]
+    assert df["spread"].isna().tolist() == [True, True, False]
+    cached = loader._cache_path(src / "games_2023.parquet")
+    assert cached.exists()
+
+    # a rewritten source is decoded again instead of served from the stale cache
+    pd.DataFrame({"game_id": [1, 2], "home_points": [28, 14]}).to_parquet(src / "games_2023.parquet")
+    st = os.stat(cached)
+    os.utime(src / "games_2023.parquet", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    seasons = loader.load_seasons(src, years=[2023], as_dict=True)
+    assert list(seasons) == [2023]
+    assert seasons[2023]["home_points"].tolist() == [28, 14]
+
+
+def test_load_seasons_with_dtypes_that_differ_by_season(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "ARROW_CACHE", tmp_path / "arrow")
+    src = tmp_path / "structured"
+    src.mkdir()
+    # compact dtypes are chosen per season: fractional yards fall back to float32
+    pd.DataFrame({"game_id": [1], "home_totalYards": pd.array([300.5], "float32"),
+                  "home_points": pd.array([21], "Int16")}).to_parquet(src / "games_2023.parquet")
+    pd.DataFrame({"game_id": [2], "home_totalYards": pd.array([410], "Int16"),
+                  "home_points": pd.array([None], "Int16")}).to_parquet(src / "games_2024.parquet")
+
+    df = loader.load_seasons(src)
+    assert df["home_totalYards"].tolist() == [300.5, 410.0] and df["home_totalYards"].dtype == "float32"
+    assert str(df["home_points"].dtype) == "Int16" and df["home_points"].isna().tolist() == [False, True]
+    assert list(df.index) == [0, 1]
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from who_covers import io
+
+
+def test_partition_status_tracks_completeness_and_skips_rewrites(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "RAW", tmp_path)
+    monkeypatch.setattr(io, "MANIFEST", tmp_path / "_manifest")
+    monkeypatch.setattr(io, "LAKE", tmp_path / "lake")
+    df = pd.DataFrame({"game_id": [1, 1, 2, 2], "team": ["A", "B", "C", "D"], "yards": [1, 2, 3, 4]})
+
+    assert io.partition_status("basic", 2024, "regular") == "missing"
+
+    # game 3 is final but has no stats yet -> incomplete
+    io.save_partition(df, "basic", 2024, "regular", expected_ids=[1, 2, 3])
+    assert io.partition_status("basic", 2024, "regular") == "incomplete"
+
+    path = io.save_partition(df, "basic", 2024, "regular", expected_ids=[1, 2])
+    assert io.partition_status("basic", 2024, "regular") is None
+    mtime = path.stat().st_mtime_ns
+
+    # identical content is not rewritten
+    io.save_partition(df.copy(), "basic", 2024, "regular", expected_ids=[1, 2])
+    assert path.stat().st_mtime_ns == mtime
+
+    entry = io.read_manifest_entry("basic_2024_regular")
+    assert entry["rows"] == 4 and entry["game_ids"] == 2
+
+
+def test_compact_weeks_replaces_only_changed_weeks(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "RAW", tmp_path)
+    monkeypatch.setattr(io, "MANIFEST", tmp_path / "_manifest")
+    monkeypatch.setattr(io, "LAKE", tmp_path / "lake")
+    week1 = pd.DataFrame({"game_id": [1, 1], "team": ["A", "B"], "yards": [10, 20]})
+    week2 = pd.DataFrame({"game_id": [2, 2], "team": ["C", "D"], "yards": [30, 40]})
+    io.save_partition(week1, "basic", 2024, "regular", week=1)
+    io.save_partition(week2, "basic", 2024, "regular", week=2, complete=False)
+
+    path = io.compact_weeks("basic", 2024, "regular", expected_ids=[1, 2])
+    season = pd.read_parquet(path)
+    assert list(season["team"]) == ["A", "B", "C", "D"]
+    assert io.partition_status("basic", 2024, "regular") == "incomplete"
+
+    # week 2 is restated: its game's rows are replaced, week 1 is not reread
+    io.save_partition(week2.assign(yards=[31, 41]), "basic", 2024, "regular", week=2)
+    (tmp_path / "basic_2024_week1_regular.parquet").unlink()
+    season = pd.read_parquet(io.compact_weeks("basic", 2024, "regular", expected_ids=[1, 2]))
+    assert list(season["yards"]) == [10, 20, 31, 41]
+    assert io.partition_status("basic", 2024, "regular") is None
+    assert io.read_manifest_entry("basic_2024_regular")["compacted_weeks"].keys() == {"1", "2"}
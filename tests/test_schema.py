@@ -0,0 +1,47 @@
+import pandas as pd
+
+from who_covers.schema import align_frames, apply_schema, memory_report
+
+
+def test_apply_schema_compacts_and_survives_parquet(tmp_path):
+    df = pd.DataFrame({
+        "game_id": [1, 2, 3],
+        "week": [1.0, 1.0, 2.0],
+        "home_team": ["A", "B", "A"],
+        "home_conference": ["SEC", "SEC", None],
+        "neutral_site": [False, True, False],
+        "home_points": [21.0, None, 35.0],
+        "home_totalYards": [350.0, 410.0, None],
+        "home_sacks": [2.5, 1.0, 0.0],
+        "home_off_ppa": [0.25, -0.1, 0.3],
+        "spread": [-3.5, 7.0, None],
+    })
+    out = apply_schema(df, "games_wide")
+    dtypes = out.dtypes.astype(str).to_dict()
+    assert dtypes["game_id"] == "int64"
+    assert dtypes["week"] == "Int16" and dtypes["home_points"] == "Int16" and dtypes["home_totalYards"] == "Int16"
+    assert dtypes["home_team"] == "category" and dtypes["home_conference"] == "category"
+    assert dtypes["neutral_site"] == "boolean"
+    assert dtypes["home_sacks"] == "float32" and dtypes["home_off_ppa"] == "float32" and dtypes["spread"] == "float32"
+    assert out["home_points"].isna().tolist() == [False, True, False]
+
+    out.to_parquet(tmp_path / "g.parquet", index=False)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "g.parquet"), out)
+    big = pd.concat([df] * 100, ignore_index=True)
+    assert apply_schema(big).memory_usage(deep=True).sum() < big.memory_usage(deep=True).sum() / 2
+    assert list(memory_report(df, out).columns) == ["before_mb", "after_mb"]
+
+
+def test_align_frames_unions_columns_and_dtypes():
+    a = apply_schema(pd.DataFrame({"game_id": [1, 2], "home_team": ["A", "B"], "home_sacks": [2.0, 1.0],
+                                   "home_kickReturns": [3.0, 1.0]}))
+    b = apply_schema(pd.DataFrame({"game_id": [3], "home_team": ["C"], "home_sacks": [1.5],
+                                   "home_puntReturns": [2.0]}))
+    out = align_frames([a, b])
+    assert [list(f.columns) for f in out] == [["game_id", "home_team", "home_sacks", "home_kickReturns",
+                                               "home_puntReturns"]] * 2
+    assert all((f.dtypes == out[0].dtypes).all() for f in out)
+    assert str(out[0]["home_sacks"].dtype) == "float32" and str(out[0]["home_kickReturns"].dtype) == "Int16"
+    assert out[1]["home_kickReturns"].isna().all() and out[0]["home_puntReturns"].isna().all()
+    assert list(out[0]["home_team"].cat.categories) == ["A", "B", "C"]
+    assert pd.concat(out, ignore_index=True)["home_team"].dtype == "category"
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from who_covers import teams
+
+
+def make_team(tid, school, conference, alt=()):
+    return SimpleNamespace(id=tid, school=school, mascot=None, abbreviation=school[:3].upper(),
+                           classification="fbs", conference=conference, alternate_names=list(alt))
+
+
+def test_registry_keeps_ids_aliases_and_conference_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(teams, "TEAMS_DIR", tmp_path)
+    teams.update_team_registry(teams.team_rows([make_team(8, "Utah", "Pac-12"), make_team(2, "Army", "FBS Independents")], 2022))
+    teams.update_team_registry(teams.team_rows([make_team(8, "Utah", "Big 12", alt=["Utah Utes"])], 2024))
+
+    dim = teams.load_teams().set_index("team_id")
+    assert dim.loc[8, "conference"] == "Big 12" and dim.loc[8, "last_season"] == 2024
+    assert dim.loc[2, "conference"] == "FBS Independents"
+    assert teams.conference_on(pd.Series([8, 8]), pd.Series([2022, 2024])).tolist() == ["Pac-12", "Big 12"]
+
+    ids = teams.team_ids(pd.Series(["utah  utes", "ARMY", "UTA", "Navy"]))
+    assert ids.tolist()[:3] == [8, 2, 8] and ids.isna().tolist() == [False, False, False, True]
+
+    # the season's games resolve names first, the registry fills the rest
+    games = [SimpleNamespace(home_team="Utah", home_id=8, away_team="Navy", away_id=726)]
+    stats = pd.DataFrame({"game_id": [1, 1, 2], "team": ["Utah", "Navy", "Army"], "ppa": [0.1, 0.2, 0.3]})
+    out = teams.attach_team_ids(stats, games)
+    assert list(out.columns) == ["game_id", "team", "team_id", "ppa"]
+    assert out["team_id"].tolist() == [8, 726, 2]